@@ -0,0 +1,96 @@
+# bench_export.py
+
+'''
+Wall time of exporting a book of synthetic sentence files to mp3 (or m4b with --format m4b), the old single-pass export against the segmented one.
+
+The single pass is what export_audiobook used to run: one ffmpeg concat of every sentence and pause, re-encoded on one core with the encoder arguments of the chosen format.  The segmented export is run_segmented_export with an empty export cache for each worker count, then once more with the cache from the last run, like a re-export after regenerating nothing.  The sentences are 2 second tones with a 0.5 second pause between them.  ffmpeg is taken from PATH unless given with --ffmpeg.  Run it from the package folder:
+
+    python benchmarks/bench_export.py
+    python benchmarks/bench_export.py --sentences 3000 --workers 1 2 4 8
+    python benchmarks/bench_export.py --format m4b
+'''
+
+import argparse
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from audiobook_export import CHUNK_ENCODINGS, run_segmented_export, write_concat_list
+
+SAMPLE_RATE = 24000
+SENTENCE_SECONDS = 2.0
+PAUSE_SECONDS = 0.5
+
+def time_segmented(ffmpeg, book_directory, audio_paths, output_path, workers, cache_directory, output_format):
+    start = time.perf_counter()
+    finished = run_segmented_export(ffmpeg, book_directory, audio_paths, "silence.wav", output_path, workers, cache_directory, cache_settings={"pause": PAUSE_SECONDS}, output_format=output_format)
+    elapsed = time.perf_counter() - start
+    if not finished:
+        raise RuntimeError("The segmented export did not finish")
+    return elapsed
+
+def time_single_pass(ffmpeg, book_directory, audio_paths, output_path, output_format):
+    entries = []
+    for audio_path in audio_paths:
+        if entries:
+            entries.append("silence.wav")
+        entries.append(audio_path)
+    list_path = os.path.join(book_directory, "file_list.txt")
+    write_concat_list(list_path, entries)
+    start = time.perf_counter()
+    subprocess.run([ffmpeg, '-y', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', list_path] + CHUNK_ENCODINGS[output_format]['encode_args'] + [output_path], check=True)
+    return time.perf_counter() - start
+
+def write_book(book_directory, sentence_count):
+    frames = int(SAMPLE_RATE * SENTENCE_SECONDS)
+    tone = array('h', (int(8000 * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE)) for i in range(frames))).tobytes()
+    audio_paths = []
+    for idx in range(sentence_count):
+        audio_path = f"audio_{idx}.wav"
+        write_wav(os.path.join(book_directory, audio_path), tone)
+        audio_paths.append(audio_path)
+    write_wav(os.path.join(book_directory, "silence.wav"), bytes(int(SAMPLE_RATE * PAUSE_SECONDS) * 2))
+    return audio_paths
+
+def write_wav(path, frames):
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(frames)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Single-pass against segmented export of synthetic sentence files.")
+    parser.add_argument("--sentences", type=int, default=1500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--ffmpeg", default=shutil.which("ffmpeg"))
+    parser.add_argument("--format", choices=sorted(CHUNK_ENCODINGS), default="mp3")
+    args = parser.parse_args(argv)
+    if not args.ffmpeg:
+        parser.error("ffmpeg was not found on PATH, pass it with --ffmpeg")
+    book_directory = tempfile.mkdtemp()
+    try:
+        audio_paths = write_book(book_directory, args.sentences)
+        hours = args.sentences * (SENTENCE_SECONDS + PAUSE_SECONDS) / 3600
+        print(f"{args.sentences} sentences, {hours:.1f} hours of audio")
+        single_pass = time_single_pass(args.ffmpeg, book_directory, audio_paths, os.path.join(book_directory, f"single_pass{CHUNK_ENCODINGS[args.format]['extension']}"), args.format)
+        print(f"single pass:              {single_pass:7.1f}s")
+        for workers in sorted(set(args.workers)):
+            cache_directory = os.path.join(book_directory, f"export_cache_{workers}")
+            elapsed = time_segmented(args.ffmpeg, book_directory, audio_paths, os.path.join(book_directory, f"segmented_{workers}.{args.format}"), workers, cache_directory, args.format)
+            print(f"segmented, {workers:>2} workers:    {elapsed:7.1f}s ({single_pass / elapsed:.1f}x)")
+        elapsed = time_segmented(args.ffmpeg, book_directory, audio_paths, os.path.join(book_directory, f"segmented_cached.{args.format}"), workers, cache_directory, args.format)
+        print(f"segmented, cached chunks: {elapsed:7.1f}s ({single_pass / elapsed:.1f}x)")
+    finally:
+        shutil.rmtree(book_directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
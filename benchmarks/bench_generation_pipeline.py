@@ -0,0 +1,105 @@
+# bench_generation_pipeline.py
+
+'''
+Wall time of generating a book with use_s2s enabled, with the TTS and S2S stages overlapped by the generation pipeline and run one after the other.
+
+The engines are replaced by stubs that sleep for a fixed time per sentence and write a short silent .wav, so the numbers only show the pipeline.  Overlapped, the time should drop from about sentences x (tts + s2s) toward sentences x max(tts, s2s).  Run it from the package folder, the app's requirements have to be installed:
+
+    python benchmarks/bench_generation_pipeline.py
+    python benchmarks/bench_generation_pipeline.py --sentences 100 --tts 0.05 --s2s 0.03
+'''
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import model
+import s2s_engines
+import tts_engines
+from model import AudiobookModel
+
+SAMPLE_RATE = 24000
+
+def install_stub_engines(tts_seconds, s2s_seconds):
+    def generate_audio(tts_engine, sentence, voice_parameters, tts_engine_name, audio_path):
+        time.sleep(tts_seconds)
+        write_silence(audio_path)
+        return True
+    def process_audio(s2s_engine, s2s_engine_name, input_audio_path, output_audio_path, parameters):
+        time.sleep(s2s_seconds)
+        shutil.copyfile(input_audio_path, output_audio_path)
+        return output_audio_path
+    tts_engines.generate_audio = generate_audio
+    tts_engines.load_tts_engine = lambda tts_engine_name, **kwargs: "stub tts"
+    s2s_engines.process_audio = process_audio
+    s2s_engines.load_s2s_engine = lambda s2s_engine_name, **kwargs: "stub s2s"
+
+def run_in_series(jobs, stages, final_stage):
+    # The same stages without the pipeline's threads, a stage that returns a list hands on every job in it
+    for job in jobs:
+        pending = [job]
+        for stage in stages:
+            results = [stage(item) for item in pending]
+            pending = [item for result in results for item in (result if isinstance(result, list) else [result]) if item is not None]
+        for job in pending:
+            final_stage(job)
+
+def time_generation(sentence_count, pipelined):
+    directory_path = tempfile.mkdtemp()
+    try:
+        text_audio_map = {
+            str(idx): {"sentence": f"Sentence {idx} .", "audio_path": "", "generated": False, "speaker_id": 1, "regen": False}
+            for idx in range(sentence_count)
+        }
+        with open(os.path.join(directory_path, "text_audio_map.json"), 'w', encoding='utf-8') as file:
+            json.dump(text_audio_map, file)
+        speakers = {"1": {"name": "Narrator", "color": "#FFFFFF", "settings": {"tts_engine": "xtts", "use_s2s": True, "s2s_engine": "RVC"}}}
+        with open(os.path.join(directory_path, "generation_settings.json"), 'w', encoding='utf-8') as file:
+            json.dump({"speakers": speakers}, file)
+        audiobook_model = AudiobookModel({"synthesis_cache": False, "generation_workers": 1})
+        original_run_pipeline = model.run_pipeline
+        if not pipelined:
+            model.run_pipeline = run_in_series
+        generated = []
+        try:
+            start = time.perf_counter()
+            audiobook_model.generate_audio_for_sentence_threaded(directory_path, False, False, lambda percent: None, lambda idx, sentence: generated.append(idx), lambda: False)
+            elapsed = time.perf_counter() - start
+        finally:
+            model.run_pipeline = original_run_pipeline
+        if generated != list(range(sentence_count)):
+            raise RuntimeError("Sentences were generated out of order or not at all")
+        return elapsed
+    finally:
+        shutil.rmtree(directory_path, ignore_errors=True)
+
+def write_silence(path, seconds=0.1):
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(bytes(int(SAMPLE_RATE * seconds) * 2))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generation with overlapped and serial TTS/S2S stages, using sleeping stub engines.")
+    parser.add_argument("--sentences", type=int, default=50)
+    parser.add_argument("--tts", type=float, default=0.04, help="Seconds the stub TTS engine takes per sentence")
+    parser.add_argument("--s2s", type=float, default=0.04, help="Seconds the stub S2S engine takes per sentence")
+    args = parser.parse_args(argv)
+    install_stub_engines(args.tts, args.s2s)
+    serial = time_generation(args.sentences, False)
+    pipelined = time_generation(args.sentences, True)
+    print(f"{args.sentences} sentences, tts {args.tts * 1000:.0f} ms, s2s {args.s2s * 1000:.0f} ms per sentence")
+    print(f"serial:    {serial:.2f}s (sum of the stages: {args.sentences * (args.tts + args.s2s):.2f}s)")
+    print(f"pipelined: {pipelined:.2f}s (slowest stage: {args.sentences * max(args.tts, args.s2s):.2f}s)")
+    print(f"speedup:   {serial / pipelined:.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# bench_map_journal.py
+
+'''
+Cost of saving text_audio_map after each generated sentence, as the book grows.
+
+Rewriting the whole indented text_audio_map.json (what save_text_audio_map did after every sentence) is compared with appending to the map journal.  The journal generates the whole book, so its time per sentence includes any compactions it triggers along the way.  A full rewrite only generates the last REWRITE_SAMPLE_SENTENCES sentences, it gets slow quickly.  Run it from the package folder:
+
+    python benchmarks/bench_map_journal.py
+    python benchmarks/bench_map_journal.py 1000 10000 40000
+'''
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from map_journal import MAP_FILE_NAME, TextAudioMapJournal
+
+DEFAULT_BOOK_SIZES = [1000, 5000, 20000, 40000]
+REWRITE_SAMPLE_SENTENCES = 50
+
+def book_map(sentence_count):
+    return {
+        str(idx): {
+            "sentence": f"This is sentence number {idx} of the benchmark book, about as long as an average one .",
+            "audio_path": "",
+            "generated": False,
+            "speaker_id": 1,
+            "regen": False,
+            "audio_id": idx
+        }
+        for idx in range(sentence_count)
+    }
+
+def generated_entry(text_audio_map, directory_path, idx):
+    entry = dict(text_audio_map[str(idx)])
+    entry.update(audio_path=os.path.join(directory_path, f"audio_{idx}.wav"), generated=True)
+    return entry
+
+def time_full_rewrite(text_audio_map, directory_path, rows):
+    map_path = os.path.join(directory_path, MAP_FILE_NAME)
+    start = time.perf_counter()
+    for idx in rows:
+        text_audio_map[str(idx)] = generated_entry(text_audio_map, directory_path, idx)
+        with open(map_path, 'w', encoding='utf-8') as file:
+            json.dump(text_audio_map, file, ensure_ascii=False, indent=4)
+    return time.perf_counter() - start
+
+def time_journal(text_audio_map, directory_path, rows):
+    journal = TextAudioMapJournal(directory_path)
+    journal.compact(text_audio_map)
+    compactions = 0
+    start = time.perf_counter()
+    for idx in rows:
+        key = str(idx)
+        text_audio_map[key] = generated_entry(text_audio_map, directory_path, idx)
+        journal.append(key, text_audio_map[key])
+        if journal.needs_compaction():
+            journal.compact(text_audio_map)
+            compactions += 1
+    elapsed = time.perf_counter() - start
+    journal.close()
+    return elapsed, compactions
+
+def main(argv):
+    book_sizes = [int(size) for size in argv] or DEFAULT_BOOK_SIZES
+    print(f"{'sentences':>10} {'full rewrite':>16} {'journal':>16} {'compactions':>12}")
+    for sentence_count in book_sizes:
+        rewrite_rows = range(max(sentence_count - REWRITE_SAMPLE_SENTENCES, 0), sentence_count)
+        directory_path = tempfile.mkdtemp()
+        try:
+            rewrite = time_full_rewrite(book_map(sentence_count), directory_path, rewrite_rows)
+            os.remove(os.path.join(directory_path, MAP_FILE_NAME))
+            journal, compactions = time_journal(book_map(sentence_count), directory_path, range(sentence_count))
+        finally:
+            shutil.rmtree(directory_path, ignore_errors=True)
+        print(f"{sentence_count:>10} {rewrite / len(rewrite_rows) * 1000:>13.3f} ms {journal / sentence_count * 1000:>13.3f} ms {compactions:>12}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
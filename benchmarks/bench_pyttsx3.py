@@ -0,0 +1,71 @@
+# bench_pyttsx3.py
+
+'''
+pyttsx3 sentences per second over a generated book of 5000 short lines.
+
+Three ways of generating the same lines are timed:
+    - per-sentence: pyttsx3.init() and runAndWait() for every sentence, like generate_with_pyttsx3 used to.
+    - persistent: the long-lived engine from load_tts_engine('pyttsx3'), one runAndWait() per sentence.
+    - batched: the long-lived engine with generate_audio_batch, BATCH_SIZE save_to_file calls per runAndWait() (generation_batch_size in settings.yaml).
+This uses the system's pyttsx3 driver (SAPI5, NSSpeechSynthesizer or espeak).  Run it from the package folder:
+
+    python benchmarks/bench_pyttsx3.py
+    python benchmarks/bench_pyttsx3.py --sentences 500
+'''
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import tts_engines
+
+BATCH_SIZE = 8
+BOOK_LINES = 5000
+VOICE_PARAMETERS = {'tts_engine': 'pyttsx3', 'rate': 180, 'volume': 100}
+
+def book_lines(count):
+    return [f"Line number {idx} of the generated book, read by the CPU fallback engine." for idx in range(count)]
+
+def generate_batched(lines, output_directory):
+    tts_engine = tts_engines.load_tts_engine('pyttsx3')
+    for start in range(0, len(lines), BATCH_SIZE):
+        batch = [(sentence, os.path.join(output_directory, f"batched_{start + offset}.wav")) for offset, sentence in enumerate(lines[start:start + BATCH_SIZE])]
+        tts_engines.generate_audio_batch(tts_engine, batch, VOICE_PARAMETERS, 'pyttsx3')
+
+def generate_per_sentence(lines, output_directory):
+    import pyttsx3
+    for idx, sentence in enumerate(lines):
+        engine = pyttsx3.init()
+        engine.setProperty('rate', VOICE_PARAMETERS['rate'])
+        engine.setProperty('volume', VOICE_PARAMETERS['volume'] / 100)
+        engine.save_to_file(sentence, os.path.join(output_directory, f"per_sentence_{idx}.wav"))
+        engine.runAndWait()
+        del engine
+
+def generate_persistent(lines, output_directory):
+    tts_engine = tts_engines.load_tts_engine('pyttsx3')
+    for idx, sentence in enumerate(lines):
+        tts_engines.generate_audio(tts_engine, sentence, VOICE_PARAMETERS, 'pyttsx3', os.path.join(output_directory, f"persistent_{idx}.wav"))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="pyttsx3 sentences per second, per-sentence engine vs persistent engine vs batched.")
+    parser.add_argument("--sentences", type=int, default=BOOK_LINES)
+    args = parser.parse_args(argv)
+    lines = book_lines(args.sentences)
+    output_directory = tempfile.mkdtemp()
+    try:
+        for name, generate in (("per-sentence", generate_per_sentence), ("persistent", generate_persistent), ("batched", generate_batched)):
+            start = time.perf_counter()
+            generate(lines, output_directory)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<13} {len(lines) / elapsed:8.1f} sentences/s ({elapsed:.1f}s)")
+    finally:
+        shutil.rmtree(output_directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
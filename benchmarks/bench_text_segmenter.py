@@ -0,0 +1,78 @@
+# bench_text_segmenter.py
+
+'''
+Sentence segmentation throughput in MB/s on a synthetic 50 MB corpus.
+
+The corpus is random prose with abbreviations, initials, ellipses and quoted dialogue, in paragraphs of one to six sentences.  The old load_sentences (split into paragraphs, then lines, with an any(c.isalpha()) scan per line) is timed against read_sentences with and without sentence splitting.  Run it from the package folder:
+
+    python benchmarks/bench_text_segmenter.py
+    python benchmarks/bench_text_segmenter.py --mb 10
+'''
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from text_segmenter import read_sentences
+
+WORDS = "the a of and to in he she it was said Mr. Dr. J. that with for on as his her they at by be this had not are but from or have an".split()
+
+def old_load_sentences(file_path):
+    # load_sentences and filter_paragraph from before text_segmenter
+    with open(file_path, 'r', encoding='utf-8') as file:
+        content = file.read()
+    sentences = []
+    for paragraph in content.split('\n\n'):
+        for line in paragraph.split('\n'):
+            line = line.strip()
+            if line and any(c.isalpha() for c in line):
+                sentences.append(line)
+    return sentences
+
+def write_corpus(path, size_bytes, seed=1):
+    rng = random.Random(seed)
+    written = 0
+    with open(path, 'w', encoding='utf-8') as file:
+        while written < size_bytes:
+            paragraph = []
+            for _ in range(rng.randint(1, 6)):
+                sentence = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 25)))
+                sentence = sentence[0].upper() + sentence[1:] + rng.choice(['.', '!', '?', '…'])
+                if rng.random() < 0.2:
+                    sentence = f'"{sentence}" she said.'
+                paragraph.append(sentence)
+            text = ' '.join(paragraph) + '\n' + ('\n' if rng.random() < 0.5 else '')
+            file.write(text)
+            written += len(text.encode('utf-8'))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sentence segmentation throughput on a synthetic corpus.")
+    parser.add_argument("--mb", type=float, default=50, help="Size of the corpus in MB")
+    args = parser.parse_args(argv)
+    fd, corpus_path = tempfile.mkstemp(suffix=".txt")
+    os.close(fd)
+    try:
+        write_corpus(corpus_path, int(args.mb * 1000 * 1000))
+        megabytes = os.path.getsize(corpus_path) / 1e6
+        print(f"corpus: {megabytes:.1f} MB")
+        runs = [
+            ("old load_sentences", lambda: len(old_load_sentences(corpus_path))),
+            ("lines", lambda: sum(1 for _ in read_sentences(corpus_path))),
+            ("split", lambda: sum(1 for _ in read_sentences(corpus_path, True))),
+            ("split, quote-aware", lambda: sum(1 for _ in read_sentences(corpus_path, True, True)))
+        ]
+        for name, run in runs:
+            start = time.perf_counter()
+            sentence_count = run()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<20} {megabytes / elapsed:7.1f} MB/s {sentence_count:>10} sentences")
+    finally:
+        os.remove(corpus_path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# audio_buffer.py
+
+'''
+In-memory audio passed between the generation stages.
+
+Engines that produce samples in memory (GPT-SoVITS, F5-TTS) return an AudioBuffer instead of writing a temporary .wav, the buffer is then handed to the s2s stage or written once next to the sentence's final audio file.  Engines that can only write files keep returning a path or True as before.
+
+A sentence's audio file is never written in place.  New audio goes to its staging_path and is swapped in with os.replace, so a file that is playing or being exported keeps its old contents until it's replaced as a whole.
+'''
+
+import os
+import shutil
+import tempfile
+
+class AudioBuffer:
+    def __init__(self, samples, sample_rate):
+        self.samples = samples
+        self.sample_rate = int(sample_rate)
+    def __repr__(self):
+        return f"AudioBuffer(frames={len(self.samples)}, sample_rate={self.sample_rate})"
+    @property
+    def duration(self):
+        return len(self.samples) / self.sample_rate
+    def write(self, path):
+        import soundfile as sf
+        sf.write(path, self.samples, self.sample_rate)
+        return path
+
+def copy_file(source_path, target_path):
+    # Copied next to the target and swapped in, the target never shares its inode with the source
+    temp_path = target_path + ".tmp"
+    shutil.copyfile(source_path, temp_path)
+    os.replace(temp_path, target_path)
+
+def discard_file(path):
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Could not remove temporary audio file {path}: {e}")
+
+def replace_file(source_path, target_path):
+    try:
+        os.replace(source_path, target_path)
+    except OSError:
+        # e.g. the source is in the temp folder on another drive
+        copy_file(source_path, target_path)
+        discard_file(source_path)
+
+def staging_path(path):
+    # Where new audio for path is written before it replaces path, the extension stays for engines that pick the format by it
+    base, extension = os.path.splitext(path)
+    return f"{base}.part{extension}"
+
+def temp_audio_path():
+    fd, path = tempfile.mkstemp(suffix='.wav')
+    os.close(fd)
+    return path
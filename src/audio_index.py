@@ -0,0 +1,169 @@
+# audio_index.py
+
+'''
+Per-sentence audio metadata, stored in text_audio_map.json next to each sentence's audio_path.
+
+When a sentence's audio is written (generation, regeneration) its wav is read once and the result is kept in the entry as "audio_info":
+
+    {"duration": 2.0, "sample_rate": 24000, "channels": 1, "sample_width": 2, "peak": 0.81, "rms": 0.12, "signature": "96044:1718000000000000000"}
+
+peak and rms are relative to full scale.  The signature is the file's size and modification time (the same one the export cache uses), info whose signature no longer matches the file, e.g. audio replaced outside the app, is read again instead of trusted.  Audio files are named after the sentence's stable audio_id rather than its row, so deleting sentences or updating the book only rekeys the map in place, no file is renamed, the signatures stay valid and the info stays with its entry.
+
+Integer PCM wav is read with the wave module.  Anything else (float or WAVE_FORMAT_EXTENSIBLE wav, e.g. from torchaudio, or AIFF from pyttsx3 on macOS) is read with soundfile, read_audio_format and read_audio_frames are shared with gapless playback for the same reason.
+
+AudioTimeline turns the stored durations into running offsets, so the length of the book and the start time of any sentence are known without opening a single audio file.
+'''
+
+import os
+import wave
+from array import array
+from bisect import bisect_right
+from operator import mul
+
+from audiobook_export import segment_signature
+from lossless_export import SegmentFormat
+
+AUDIO_INFO_KEY = "audio_info"
+# Bytes per sample of the soundfile subtypes, anything else is counted as 16 bit
+SOUNDFILE_SAMPLE_WIDTHS = {'PCM_S8': 1, 'PCM_U8': 1, 'PCM_16': 2, 'PCM_24': 3, 'PCM_32': 4, 'FLOAT': 4, 'DOUBLE': 8}
+
+class AudioTimeline:
+    '''
+    Start offsets of every sentence in the exported book, in seconds.  Sentences without audio or without audio_info take no time, missing counts the ones that have audio but no info.
+    '''
+    def __init__(self, text_audio_map, pause_duration=0.0):
+        self.keys = sorted(text_audio_map, key=lambda k: int(k))
+        self.positions = {key: position for position, key in enumerate(self.keys)}
+        self.starts = []
+        self.missing = 0
+        offset = 0.0
+        previous = False
+        for key in self.keys:
+            entry = text_audio_map[key]
+            info = entry.get(AUDIO_INFO_KEY) if entry.get('audio_path') else None
+            if entry.get('audio_path') and info is None:
+                self.missing += 1
+            if info is not None and previous:
+                # Export puts the pause between two sentences that both have audio
+                offset += pause_duration
+            self.starts.append(offset)
+            if info is not None:
+                offset += info['duration']
+                previous = True
+        self.duration = offset
+    def index_at(self, seconds):
+        # Key of the sentence playing at the given time of the exported book
+        if not self.keys:
+            return None
+        return self.keys[max(bisect_right(self.starts, seconds) - 1, 0)]
+    def start_of(self, idx):
+        return self.starts[self.positions[str(idx)]]
+
+def is_audio_info_current(info, audio_path):
+    if not info or not audio_path or not os.path.exists(audio_path):
+        return False
+    return info.get('signature') == segment_signature(audio_path)
+
+def load_soundfile(wave_error):
+    # soundfile reads what wave can't, without it the wave error stands
+    try:
+        import soundfile as sf
+    except ImportError:
+        raise wave_error
+    return sf
+
+def read_audio_format(audio_path):
+    '''
+    The SegmentFormat of an audio file, sample_width is the file's own.  Raises OSError, EOFError, wave.Error or RuntimeError (soundfile) when it can't be read.
+    '''
+    try:
+        with wave.open(audio_path, 'rb') as wav_file:
+            return SegmentFormat(wav_file.getframerate(), wav_file.getnchannels(), wav_file.getsampwidth())
+    except (EOFError, wave.Error) as e:
+        info = load_soundfile(e).info(audio_path)
+        return SegmentFormat(info.samplerate, info.channels, SOUNDFILE_SAMPLE_WIDTHS.get(info.subtype, 2))
+
+def read_audio_frames(audio_path):
+    '''
+    The SegmentFormat and PCM frames of an audio file.  Files wave can't read are converted to 16 bit by soundfile.  Raises like read_audio_format.
+    '''
+    try:
+        with wave.open(audio_path, 'rb') as wav_file:
+            segment_format = SegmentFormat(wav_file.getframerate(), wav_file.getnchannels(), wav_file.getsampwidth())
+            return segment_format, wav_file.readframes(wav_file.getnframes())
+    except (EOFError, wave.Error) as e:
+        samples, sample_rate = load_soundfile(e).read(audio_path, dtype='int16', always_2d=True)
+        return SegmentFormat(sample_rate, samples.shape[1], 2), samples.astype('<i2').tobytes()
+
+def read_audio_info(audio_path):
+    '''
+    Returns the audio_info dict for an audio file, None if it can't be read.
+    '''
+    try:
+        with wave.open(audio_path, 'rb') as wav_file:
+            sample_rate = wav_file.getframerate()
+            channels = wav_file.getnchannels()
+            sample_width = wav_file.getsampwidth()
+            frames = wav_file.getnframes()
+            peak, rms = sample_levels(wav_file.readframes(frames), sample_width)
+    except (wave.Error, EOFError) as e:
+        try:
+            sample_rate, channels, sample_width, frames, peak, rms = read_soundfile_levels(audio_path, e)
+        except (wave.Error, OSError, RuntimeError):
+            return None
+    except OSError:
+        return None
+    return {
+        "duration": frames / sample_rate if sample_rate else 0.0,
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "sample_width": sample_width,
+        "peak": round(peak, 6),
+        "rms": round(rms, 6),
+        "signature": segment_signature(audio_path)
+    }
+
+def read_soundfile_levels(audio_path, wave_error):
+    # Sample rate, channels, sample width, frames, peak and rms of a file wave couldn't read
+    sf = load_soundfile(wave_error)
+    info = sf.info(audio_path)
+    samples, sample_rate = sf.read(audio_path, dtype='float64', always_2d=True)
+    if samples.size:
+        peak = float(abs(samples).max())
+        rms = float((samples * samples).mean() ** 0.5)
+    else:
+        peak = rms = 0.0
+    return sample_rate, samples.shape[1], SOUNDFILE_SAMPLE_WIDTHS.get(info.subtype, 2), len(samples), peak, rms
+
+def sample_levels(data, sample_width):
+    # Peak and RMS relative to full scale
+    full_scale = float(1 << (sample_width * 8 - 1))
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    if np is not None:
+        if sample_width == 3:
+            raw = np.frombuffer(data[:len(data) - len(data) % 3], dtype=np.uint8).reshape(-1, 3)
+            samples = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int8).astype(np.int32) << 16))
+        elif sample_width == 1:
+            # 8 bit wav is unsigned
+            samples = np.frombuffer(data, dtype=np.uint8).astype(np.int32) - 128
+        else:
+            samples = np.frombuffer(data[:len(data) - len(data) % sample_width], dtype={2: np.int16, 4: np.int32}[sample_width])
+        if not samples.size:
+            return 0.0, 0.0
+        samples = samples.astype(np.float64)
+        return float(np.abs(samples).max()) / full_scale, float(np.sqrt(np.mean(samples * samples))) / full_scale
+    if sample_width == 3:
+        samples = [int.from_bytes(data[i:i + 3], 'little', signed=True) for i in range(0, len(data) - 2, 3)]
+    elif sample_width == 1:
+        samples = [value - 128 for value in data]
+    else:
+        samples = array({2: 'h', 4: 'i'}[sample_width])
+        samples.frombytes(data[:len(data) - len(data) % sample_width])
+    if not len(samples):
+        return 0.0, 0.0
+    peak = max(max(samples), -min(samples))
+    rms = (sum(map(mul, samples, samples)) / len(samples)) ** 0.5
+    return peak / full_scale, rms / full_scale
@@ -0,0 +1,457 @@
+# audiobook_export.py
+
+'''
+Segmented, incremental export of the combined audiobook.
+
+The sentence files are split into contiguous chunks, every chunk is encoded to mp3 by its own ffmpeg process (up to "export_workers" at once) and the encoded chunks are joined with a stream copy into the exported file.  The pause between sentences is written into the chunk lists, the one across a chunk boundary goes at the start of the next chunk, so the result has the same timing as a single-pass export.
+
+Encoded chunks are kept in the export cache folder next to the exported audiobooks and listed in its manifest.json.  A chunk's key is a hash of the signatures (size and modification time) of its sentence files, whether it starts with a pause and the pause/encoding settings, so a re-export only encodes the chunks whose sentences changed and joins the rest straight from the cache.  Chunks of other formats and pause lengths have keys (and files) of their own and stay cached alongside, switching back and forth doesn't encode the book again.  Once the cache grows past its size budget the least recently used chunks are removed, modification times serve as the LRU clock and every export touches the chunks it joins.  Chunk boundaries are content-defined: a chunk ends after a sentence whose signature hashes to a boundary, so regenerating, inserting or deleting a sentence only changes the chunks right around it instead of shifting every chunk after it.
+
+M4B exports encode the chunks to AAC (ADTS) and mux them into an mp4 container in the join step, together with a chapter list.  Chapter times are the summed durations of the sentence files and pauses before each chapter, placed where the join put every chunk.
+
+Every encoded chunk starts with the encoder delay and ends padded to a whole frame, a stream copy join would add both at every chunk boundary and the book would drift away from the timing of a single-pass export (and from AudioTimeline).  The join drops whole frames of silence around every chunk boundary instead, as many as the joined file is behind at that point: from the end of the chunk before it (encoder padding and the silence its last sentence ends with) and from the start of the chunk after it (encoder delay, pause and the silence its first sentence starts with).  The frames are counted from the mp3/ADTS frame headers and cut with ffmpeg's subfile protocol, nothing gets decoded or re-encoded.
+
+Progress is read from the "-progress" output of every ffmpeg process and weighted by the duration of its chunk.  A stop request terminates the running ffmpeg processes and removes the partial files, chunks that were already finished stay cached for the next export.
+'''
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import wave
+from array import array
+from collections import deque
+from chapters import write_chapter_metadata
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from subprocess import Popen, PIPE, CalledProcessError
+from tempfile import TemporaryFile
+
+EXPORT_CACHE_FOLDER_NAME = ".export_cache"
+MANIFEST_NAME = "manifest.json"
+DEFAULT_CHUNK_SENTENCES = 100
+DEFAULT_CACHE_MAX_BYTES = 2048 * 1024 * 1024
+# The chunks are joined by the final mux, which writes the one Xing/LAME header for the whole file
+CHUNK_ENCODE_ARGS = ['-write_xing', '0']
+# Per export format: extension and encoder arguments of the cached chunks, muxer arguments of the join and the samples of silence the encoder (LAME's delay plus the decoder's, AAC priming) puts in front of every chunk.
+# 64k AAC is the usual audiobook rate for speech.  The fast coder without perceptual noise substitution and temporal noise shaping keeps m4b export close to mp3 speed, both cost more encoding time than they add at speech bitrates
+CHUNK_ENCODINGS = {
+    'mp3': {'extension': '.mp3', 'encode_args': CHUNK_ENCODE_ARGS, 'join_args': [], 'encoder_delay': 1105},
+    'm4b': {'extension': '.aac', 'encode_args': ['-c:a', 'aac', '-aac_coder', 'fast', '-aac_pns', '0', '-aac_tns', '0', '-b:a', '64k', '-f', 'adts'], 'join_args': ['-bsf:a', 'aac_adtstoasc', '-f', 'ipod'], 'encoder_delay': 1024}
+}
+ADTS_SAMPLE_RATES = [96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050, 16000, 12000, 11025, 8000, 7350]
+# Layer III bitrates (kbit/s) of MPEG-1 and MPEG-2/2.5 and sample rates per version id of the frame header
+MP3_BITRATES = {1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320], 2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]}
+MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+# Samples at either end of a sentence below this share of full scale count as silence, looked for in its first and last MAX_EDGE_SILENCE seconds
+SILENCE_THRESHOLD = 0.001
+MAX_EDGE_SILENCE = 1.0
+# Byte offsets of this many frames at the end of every chunk are kept in the manifest, for the join to cut its padding without reading the whole chunk
+TAIL_FRAMES = 64
+ENCODED_FIELDS = ('samples', 'sample_rate', 'frame_samples', 'tail_offsets')
+
+def audio_duration(path):
+    # Only the wav header is read, anything else counts as 0 and progress falls back to whole chunks
+    try:
+        with wave.open(path, 'rb') as wav_file:
+            return wav_file.getnframes() / wav_file.getframerate()
+    except (wave.Error, EOFError, OSError):
+        return 0.0
+
+def chunk_key(signatures, leading_pause, cache_settings, encode_args=CHUNK_ENCODE_ARGS):
+    payload = json.dumps({
+        "segments": signatures,
+        "leading_pause": leading_pause,
+        "settings": cache_settings,
+        "encode_args": encode_args
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def edge_silence(path, limit=MAX_EDGE_SILENCE):
+    '''
+    Returns the seconds of silence a wav starts and ends with, both at most limit.  Only 16 bit wavs are looked at, anything else has none.
+    '''
+    try:
+        with wave.open(path, 'rb') as wav_file:
+            if wav_file.getsampwidth() != 2:
+                return 0.0, 0.0
+            sample_rate = wav_file.getframerate()
+            channels = wav_file.getnchannels()
+            frames = wav_file.getnframes()
+            length = min(frames, int(limit * sample_rate))
+            head = array('h', wav_file.readframes(length))
+            wav_file.setpos(frames - length)
+            tail = array('h', wav_file.readframes(length))
+    except (wave.Error, EOFError, OSError):
+        return 0.0, 0.0
+    if sys.byteorder == 'big':
+        head.byteswap()
+        tail.byteswap()
+    threshold = int(32768 * SILENCE_THRESHOLD)
+    leading = next((index for index, sample in enumerate(head) if abs(sample) > threshold), len(head))
+    trailing = next((index for index, sample in enumerate(reversed(tail)) if abs(sample) > threshold), len(tail))
+    return leading // channels / sample_rate, trailing // channels / sample_rate
+
+def encoded_frames(path):
+    '''
+    Yields (byte offset, samples, sample rate) of every frame of an mp3 (layer III) or ADTS file, read from the frame headers.  A leading ID3v2 tag is skipped.
+    '''
+    with open(path, 'rb') as file:
+        header = file.read(10)
+        offset = 0
+        if len(header) == 10 and header[:3] == b'ID3':
+            offset = 10 + ((header[6] & 0x7F) << 21 | (header[7] & 0x7F) << 14 | (header[8] & 0x7F) << 7 | (header[9] & 0x7F))
+        while True:
+            file.seek(offset)
+            header = file.read(7)
+            if len(header) < 7 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+                return
+            layer = (header[1] >> 1) & 0x03
+            if layer == 0:
+                sample_rate = ADTS_SAMPLE_RATES[(header[2] >> 2) & 0x0F]
+                frame_length = ((header[3] & 0x03) << 11) | (header[4] << 3) | (header[5] >> 5)
+                samples = ((header[6] & 0x03) + 1) * 1024
+            else:
+                version = (header[1] >> 3) & 0x03
+                bitrate_index = header[2] >> 4
+                rate_index = (header[2] >> 2) & 0x03
+                if layer != 1 or version == 1 or rate_index == 3 or bitrate_index in (0, 15):
+                    return
+                sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+                samples = 1152 if version == 3 else 576
+                frame_length = samples // 8 * MP3_BITRATES[1 if version == 3 else 2][bitrate_index] * 1000 // sample_rate + ((header[2] >> 1) & 0x01)
+            if frame_length < 7:
+                return
+            yield offset, samples, sample_rate
+            offset += frame_length
+
+def encoded_length(path):
+    '''
+    Returns the ENCODED_FIELDS of an encoded chunk: its samples, sample rate, samples per frame and the byte offsets of its last TAIL_FRAMES frames followed by the file size.
+    '''
+    samples = 0
+    sample_rate = 0
+    frame_samples = 0
+    tail_offsets = deque(maxlen=TAIL_FRAMES)
+    for offset, frame_samples, sample_rate in encoded_frames(path):
+        samples += frame_samples
+        tail_offsets.append(offset)
+    return {"samples": samples, "sample_rate": sample_rate, "frame_samples": frame_samples, "tail_offsets": list(tail_offsets) + [os.path.getsize(path)]}
+
+def frame_offset(path, frame):
+    # Byte offset of the given frame, the end of the file if it has fewer
+    for index, (offset, _, _) in enumerate(encoded_frames(path)):
+        if index == frame:
+            return offset
+    return os.path.getsize(path)
+
+def load_manifest(cache_directory):
+    manifest_path = os.path.join(cache_directory, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            return json.load(file).get("chunks", {})
+    except (OSError, ValueError):
+        # A damaged manifest only costs a full re-encode
+        return {}
+
+def plan_chunks(signatures, target_size=DEFAULT_CHUNK_SENTENCES):
+    '''
+    Returns (start, end) index ranges.  A chunk ends after a sentence whose signature hash is 0 modulo target_size, but never holds fewer than a quarter or more than four times target_size sentences.
+    '''
+    target_size = max(1, target_size)
+    min_size = max(1, target_size // 4)
+    max_size = target_size * 4
+    chunks = []
+    start = 0
+    for position, signature in enumerate(signatures):
+        size = position - start + 1
+        boundary = int.from_bytes(hashlib.sha1(signature.encode("utf-8")).digest()[:4], "big") % target_size == 0
+        if size >= max_size or (size >= min_size and boundary):
+            chunks.append((start, position + 1))
+            start = position + 1
+    if start < len(signatures):
+        chunks.append((start, len(signatures)))
+    return chunks
+
+def run_ffmpeg(cmd, processes, lock, cancelled, on_progress=None, should_stop_callback=None):
+    '''
+    Runs ffmpeg with its progress read from stdout.  stderr goes to a temporary file, a pipe that isn't read while stdout is could fill up and block ffmpeg.  should_stop_callback is checked on every progress line, for runs nothing else is watching.
+    '''
+    with TemporaryFile('w+', encoding='utf-8', errors='replace') as error_file:
+        with lock:
+            if cancelled.is_set():
+                return False
+            process = Popen(cmd + ['-progress', 'pipe:1', '-nostats'], stdout=PIPE, stderr=error_file, universal_newlines=True)
+            processes.append(process)
+        try:
+            for line in process.stdout:
+                if should_stop_callback is not None and should_stop_callback():
+                    terminate(processes, lock, cancelled)
+                # out_time_ms is in microseconds as well, older ffmpeg builds only have that one
+                if on_progress is not None and line.startswith(('out_time_us=', 'out_time_ms=')):
+                    value = line.split('=', 1)[1].strip()
+                    if value.isdigit():
+                        on_progress(int(value) / 1_000_000)
+            process.wait()
+        finally:
+            process.stdout.close()
+            with lock:
+                processes.remove(process)
+        if cancelled.is_set():
+            return False
+        if process.returncode != 0:
+            error_file.seek(0)
+            print(error_file.read())
+            raise CalledProcessError(process.returncode, cmd)
+    return True
+
+def run_segmented_export(ffmpeg, list_directory, audio_paths, silence_path, output_path, workers, cache_directory, cache_settings=None, chunk_sentences=DEFAULT_CHUNK_SENTENCES, progress_callback=None, should_stop_callback=None, output_format='mp3', segment_durations=None, chapters=None, title=None, cache_max_bytes=DEFAULT_CACHE_MAX_BYTES):
+    '''
+    Returns True once output_path is written, False if it was stopped through should_stop_callback.  Paths in the concat lists are written as given, relative ones are resolved from list_directory.  cache_settings holds everything besides the sentence files that changes the encoded audio (pause length, sample format), cache_max_bytes the size budget of the export cache.  progress_callback gets a percentage and is called from the encoding threads.
+
+    segment_durations is the known duration of every sentence file, missing ones are read from the wav header.  For m4b, chapters is a list of (index into audio_paths, title).
+    '''
+    encoding = CHUNK_ENCODINGS[output_format]
+    os.makedirs(cache_directory, exist_ok=True)
+    signatures = [segment_signature(os.path.join(list_directory, audio_path)) for audio_path in audio_paths]
+    chunks = []
+    for start, end in plan_chunks(signatures, chunk_sentences):
+        leading_pause = start > 0 and bool(silence_path)
+        key = chunk_key(signatures[start:end], leading_pause, cache_settings, encoding['encode_args'])
+        entries = []
+        for audio_path in audio_paths[start:end]:
+            if silence_path and (entries or leading_pause):
+                entries.append(silence_path)
+            entries.append(audio_path)
+        chunks.append({
+            "key": key,
+            "entries": entries,
+            "start": start,
+            "end": end,
+            "leading_pause": leading_pause,
+            "segments": end - start,
+            "path": os.path.abspath(os.path.join(cache_directory, f"{key}{encoding['extension']}"))
+        })
+    manifest = load_manifest(cache_directory)
+    dirty = []
+    for chunk in chunks:
+        entry = manifest.get(chunk['key'])
+        if entry is None or not os.path.exists(chunk['path']):
+            dirty.append(chunk)
+        else:
+            # Joined again, so it's the most recently used
+            os.utime(chunk['path'])
+            if all(name in entry for name in ENCODED_FIELDS):
+                chunk.update({name: entry[name] for name in ENCODED_FIELDS})
+    print(f"Export: {len(chunks) - len(dirty)} of {len(chunks)} chunks reused from the cache, encoding {len(dirty)}")
+
+    silence_duration = audio_duration(os.path.join(list_directory, silence_path)) if silence_path else 0.0
+    for chunk in dirty:
+        chunk['duration'] = sum(silence_duration if entry == silence_path else audio_duration(os.path.join(list_directory, entry)) for entry in chunk['entries'])
+    total_duration = sum(chunk['duration'] for chunk in dirty)
+
+    base_name = os.path.splitext(os.path.basename(output_path))[0]
+    temp_paths = []
+    processes = []
+    lock = threading.Lock()
+    cancelled = threading.Event()
+    chunk_progress = {}
+    finished_count = [0]
+    reported = [-1]
+
+    def report(chunk, seconds):
+        chunk_progress[chunk['key']] = min(seconds, chunk['duration'])
+        if progress_callback is None:
+            return
+        if total_duration > 0:
+            done = sum(chunk_progress.values()) / total_duration
+        else:
+            done = finished_count[0] / len(dirty)
+        # The join step takes the last percent
+        percent = min(int(done * 99), 99)
+        if percent != reported[0]:
+            reported[0] = percent
+            progress_callback(percent)
+
+    def encode(chunk):
+        list_path = os.path.join(list_directory, f"{base_name}_chunk_{chunk['key'][:16]}.txt")
+        base_path, extension = os.path.splitext(chunk['path'])
+        part_path = f"{base_path}.part{extension}"
+        with lock:
+            temp_paths.extend([list_path, part_path])
+        write_concat_list(list_path, chunk['entries'])
+        cmd = [ffmpeg, '-y', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', list_path] + encoding['encode_args'] + [part_path]
+        if not run_ffmpeg(cmd, processes, lock, cancelled, lambda seconds: report(chunk, seconds)):
+            return False
+        chunk.update(encoded_length(part_path))
+        # Only complete chunks get their final name, so a stopped export never leaves a broken chunk in the cache
+        os.replace(part_path, chunk['path'])
+        with lock:
+            finished_count[0] += 1
+        report(chunk, chunk['duration'])
+        return True
+
+    try:
+        if dirty:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(dirty))), thread_name_prefix="export-chunk") as executor:
+                futures = [executor.submit(encode, chunk) for chunk in dirty]
+                pending = set(futures)
+                while pending:
+                    done, pending = wait(pending, timeout=0.2, return_when=FIRST_EXCEPTION)
+                    failed = any(future.exception() is not None for future in done)
+                    if failed or (should_stop_callback is not None and should_stop_callback()):
+                        terminate(processes, lock, cancelled)
+                        for future in pending:
+                            future.cancel()
+                        break
+                for future in futures:
+                    if future.done() and not future.cancelled() and future.exception() is not None:
+                        raise future.exception()
+        if cancelled.is_set() or (should_stop_callback is not None and should_stop_callback()):
+            cancelled.set()
+            return False
+        join_list_path = os.path.join(list_directory, f"{base_name}_chunks.txt")
+        temp_paths.append(join_list_path)
+        durations = [
+            duration if duration is not None else audio_duration(os.path.join(list_directory, audio_path))
+            for duration, audio_path in zip(segment_durations or [None] * len(audio_paths), audio_paths)
+        ]
+        source_start = 0.0
+        for index, chunk in enumerate(chunks):
+            if 'samples' not in chunk:
+                # Cached by an export that didn't record its length
+                chunk.update(encoded_length(chunk['path']))
+            chunk['source_start'] = source_start
+            chunk['source_duration'] = sum(durations[chunk['start']:chunk['end']]) + silence_duration * (len(chunk['entries']) - chunk['segments'])
+            source_start += chunk['source_duration']
+            chunk['leading_silence'] = silence_duration if chunk['leading_pause'] else 0.0
+            chunk['trailing_silence'] = 0.0
+            if index > 0:
+                chunk['leading_silence'] += edge_silence(os.path.join(list_directory, audio_paths[chunk['start']]))[0]
+            if index < len(chunks) - 1:
+                chunk['trailing_silence'] = edge_silence(os.path.join(list_directory, audio_paths[chunk['end'] - 1]))[1]
+        total = trim_chunks(chunks, encoding['encoder_delay'])
+        entries = []
+        for chunk in chunks:
+            if chunk['skip_frames'] or chunk['cut_frames']:
+                start_offset = frame_offset(chunk['path'], chunk['skip_frames'])
+                entries.append(f"subfile,,start,{start_offset},end,{chunk['tail_offsets'][-1 - chunk['cut_frames']]},,:{chunk['path']}")
+            else:
+                entries.append(chunk['path'])
+        # ADTS has no timestamps, without its real duration the concat demuxer guesses one from the bitrate and leaves gaps between chunks
+        chunk_durations = [(chunk['samples'] - (chunk['skip_frames'] + chunk['cut_frames']) * chunk['frame_samples']) / chunk['sample_rate'] for chunk in chunks] if encoding['extension'] == '.aac' else None
+        write_concat_list(join_list_path, entries, chunk_durations)
+        cmd = [ffmpeg, '-y', '-v', 'error', '-protocol_whitelist', 'file,subfile', '-f', 'concat', '-safe', '0', '-i', join_list_path]
+        if chapters is not None:
+            metadata_path = os.path.join(list_directory, f"{base_name}_chapters.txt")
+            temp_paths.append(metadata_path)
+            starts = segment_start_times(chunks, durations, silence_duration)
+            write_chapter_metadata(metadata_path, title, [(starts[position], chapter_title) for position, chapter_title in chapters], total)
+            cmd += ['-i', metadata_path, '-map', '0:a', '-map_metadata', '1', '-map_chapters', '1']
+        cmd += ['-c', 'copy'] + encoding['join_args'] + [output_path]
+        if not run_ffmpeg(cmd, processes, lock, cancelled, should_stop_callback=should_stop_callback):
+            return False
+        if progress_callback is not None:
+            progress_callback(100)
+        return True
+    finally:
+        for path in temp_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        if cancelled.is_set() and os.path.exists(output_path):
+            os.remove(output_path)
+        # Also after a stop or an error, whatever got encoded is reused next time
+        save_manifest(cache_directory, [chunk for chunk in chunks if os.path.exists(chunk['path'])], cache_max_bytes)
+
+def save_manifest(cache_directory, chunks, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+    '''
+    Adds chunks to the manifest and removes the least recently used chunk files once the cache is larger than max_bytes, never one of chunks.  Files the manifest doesn't list (like the partial files of an export that crashed) and entries whose file is gone are dropped as well.
+    '''
+    manifest = load_manifest(cache_directory)
+    for chunk in chunks:
+        manifest[chunk['key']] = {"file": os.path.basename(chunk['path']), "segments": chunk['segments'], **{name: chunk[name] for name in ENCODED_FIELDS if name in chunk}}
+    listed = {entry['file'] for entry in manifest.values()}
+    files = []
+    for entry in os.scandir(cache_directory):
+        if not entry.is_file() or entry.name == MANIFEST_NAME:
+            continue
+        if entry.name in listed:
+            files.append(entry)
+        else:
+            os.remove(entry.path)
+    keep = {os.path.basename(chunk['path']) for chunk in chunks}
+    total_bytes = sum(entry.stat().st_size for entry in files)
+    existing = set()
+    for entry in sorted(files, key=lambda entry: entry.stat().st_mtime):
+        if entry.name not in keep and total_bytes > max_bytes:
+            total_bytes -= entry.stat().st_size
+            os.remove(entry.path)
+        else:
+            existing.add(entry.name)
+    manifest = {"chunks": {key: entry for key, entry in manifest.items() if entry['file'] in existing}}
+    manifest_path = os.path.join(cache_directory, MANIFEST_NAME)
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=4)
+    os.replace(temp_path, manifest_path)
+
+def segment_signature(path):
+    # Size and modification time instead of a content hash, so checking a whole book doesn't read gigabytes of audio
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def segment_start_times(chunks, durations, silence_duration):
+    '''
+    Returns the start time of every sentence in the joined file, counted from where trim_chunks placed the start of its chunk.
+    '''
+    starts = [0.0] * len(durations)
+    for chunk in chunks:
+        local = chunk['output_start']
+        for position in range(chunk['start'], chunk['end']):
+            if position > chunk['start'] or chunk['leading_pause']:
+                local += silence_duration
+            starts[position] = local
+            local += durations[position]
+    return starts
+
+def terminate(processes, lock, cancelled):
+    with lock:
+        cancelled.set()
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+
+def trim_chunks(chunks, encoder_delay):
+    '''
+    Sets how many whole frames every chunk drops from its start ('skip_frames') and its end ('cut_frames') in the join and where the start of its source ends up in the joined file ('output_start'), returns the joined file's duration.  chunks need the ENCODED_FIELDS of their encoded file, 'source_start' and 'source_duration', their place in a single-pass export, and the seconds of 'leading_silence' and 'trailing_silence' of their source.
+
+    The first chunk keeps its encoder delay.  At every later boundary the join drops as many frames as it is behind the single-pass timing (rounded), first the silent ones at the end of the chunk before, then the ones at the start of the chunk after, less the one frame the decoder starts on whose overlap with the dropped frame has to be silent too.  What a boundary can't drop is made up at the next ones, so the error doesn't add up over the book.
+    '''
+    output = 0.0
+    previous = None
+    for chunk in chunks:
+        sample_rate = chunk['sample_rate'] or 1
+        frame = chunk['frame_samples'] or 1
+        chunk['skip_frames'] = 0
+        chunk['cut_frames'] = 0
+        if previous is not None:
+            behind = max(0, round((output - chunk['source_start']) * sample_rate / frame))
+            padding = previous['samples'] - encoder_delay - previous['source_duration'] * sample_rate
+            previous['cut_frames'] = max(0, min(behind, int((padding + previous['trailing_silence'] * sample_rate) // frame), len(previous['tail_offsets']) - 1))
+            output -= previous['cut_frames'] * frame / sample_rate
+            chunk['skip_frames'] = max(0, min(behind - previous['cut_frames'], int((encoder_delay + chunk['leading_silence'] * sample_rate) // frame) - 1))
+        chunk['output_start'] = output + (encoder_delay - chunk['skip_frames'] * frame) / sample_rate
+        output += (chunk['samples'] - chunk['skip_frames'] * frame) / sample_rate
+        previous = chunk
+    return output
+
+def write_concat_list(list_path, entries, durations=None):
+    with open(list_path, 'w', encoding='utf-8') as file:
+        for index, entry in enumerate(entries):
+            # Single quotes inside a quoted concat entry are written as '\''
+            escaped = entry.replace("'", "'\\''")
+            file.write(f"file '{escaped}'\n")
+            if durations is not None:
+                file.write(f"duration {durations[index]:.6f}\n")
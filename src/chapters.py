@@ -0,0 +1,66 @@
+# chapters.py
+
+'''
+Chapter detection for M4B export.
+
+A sentence starts a chapter when its text_audio_map entry has a "chapter" key (a title, or true to use the sentence itself as the title), or when its text matches "chapter_pattern" from configs/settings.yaml, a case-insensitive regular expression.  An empty pattern leaves only the explicit markers.  A heading without audio marks the next sentence that has audio, since only those end up in the exported file.
+
+The chapters are written as an ffmetadata file which ffmpeg muxes into the M4B as chapter atoms.
+'''
+
+import re
+
+DEFAULT_CHAPTER_PATTERN = r'^\s*(chapter|part|book|prologue|epilogue)\b'
+MAX_TITLE_LENGTH = 80
+
+def chapter_title(text):
+    title = " ".join(str(text).split())
+    if len(title) > MAX_TITLE_LENGTH:
+        title = title[:MAX_TITLE_LENGTH - 3].rstrip() + "..."
+    return title
+
+def escape_metadata(value):
+    # ffmetadata escapes '=', ';', '#', '\' and newlines with a backslash
+    return re.sub(r'([=;#\\\n])', r'\\\1', value)
+
+def find_chapters(entries, pattern=DEFAULT_CHAPTER_PATTERN, opening_title=None):
+    '''
+    entries are text_audio_map entries in book order.  Returns (position, title) pairs, where position counts only the entries with audio, in the order they are exported.  When the first chapter doesn't start at the beginning, an opening chapter titled opening_title is added.
+    '''
+    matcher = re.compile(pattern, re.IGNORECASE) if pattern else None
+    chapters = []
+    pending_title = None
+    position = 0
+    for entry in entries:
+        marker = entry.get('chapter')
+        if marker:
+            title = chapter_title(entry['sentence'] if marker is True else marker)
+        elif matcher is not None and matcher.search(entry['sentence']):
+            title = chapter_title(entry['sentence'])
+        else:
+            title = None
+        if title is not None and pending_title is None:
+            pending_title = title
+        if not entry.get('audio_path'):
+            continue
+        if pending_title is not None:
+            chapters.append((position, pending_title))
+            pending_title = None
+        position += 1
+    if chapters and chapters[0][0] != 0 and opening_title:
+        chapters.insert(0, (0, chapter_title(opening_title)))
+    return chapters
+
+def write_chapter_metadata(path, title, chapters, duration):
+    '''
+    chapters are (start seconds, title) pairs in order, each one ends where the next one starts and the last one at duration.
+    '''
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(";FFMETADATA1\n")
+        if title:
+            file.write(f"title={escape_metadata(title)}\n")
+        for position, (start, chapter) in enumerate(chapters):
+            end = chapters[position + 1][0] if position + 1 < len(chapters) else duration
+            file.write("[CHAPTER]\nTIMEBASE=1/1000\n")
+            file.write(f"START={int(round(start * 1000))}\nEND={int(round(max(end, start) * 1000))}\n")
+            file.write(f"title={escape_metadata(chapter)}\n")
@@ -0,0 +1,239 @@
+# cli.py
+
+'''
+Headless entry point for rendering audiobooks without a display, e.g. on a render box or under a job scheduler.  It drives AudiobookModel directly and never imports PySide6, run it from the package folder like the app:
+
+    python src/cli.py ingest input_text_files/book.txt --name "My Book" --tts-engine pyttsx3 --set rate=180
+    python src/cli.py generate "audiobooks/My Book"
+    python src/cli.py continue "audiobooks/My Book"
+    python src/cli.py regen "audiobooks/My Book"
+    python src/cli.py export "audiobooks/My Book" --format m4b --pause 0.5
+
+ingest creates the audiobook folder from a text file, with a single Narrator speaker using the engine's defaults from configs/tts_config.json (or the speakers of a generation_settings.json given with --speakers).  generate starts over, it refuses to overwrite audio that was already generated unless --overwrite is given, continue picks up where generation stopped and regen only generates the sentences flagged for regeneration.
+
+Progress is written to stdout as one JSON object per line:
+    {"event": "started", "command": "generate", "directory": "audiobooks/My Book"}
+    {"event": "sentence", "index": 12, "sentence": "..."}
+    {"event": "progress", "percent": 40}
+    {"event": "finished", "command": "generate", "directory": "audiobooks/My Book"}
+    {"event": "stopped", "command": "generate"}
+    {"event": "error", "command": "generate", "message": "..."}
+Everything else the model, the engines or ffmpeg print goes to stderr, so stdout can be parsed as is.  SIGINT and SIGTERM stop the job after the sentence or export chunk in progress, a second one aborts right away.
+
+Exit codes: 0 finished, 1 failed, 2 bad arguments, 130 stopped.
+'''
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import sys
+import traceback
+
+if os.path.exists("runtime"):
+    # Same as controller.py, the packaged runtime needs the script folder on sys.path
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+
+import yaml
+
+import tts_engines
+from model import AudiobookModel
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_STOPPED = 130
+EXPORT_FORMATS = ["mp3", "m4b", "wav", "flac"]
+GLOBAL_SETTINGS_PATH = os.path.join('configs', "settings.yaml")
+TTS_CONFIG_PATH = os.path.join('configs', "tts_config.json")
+
+class EventWriter:
+    '''
+    Writes the JSON progress lines.  Progress is only written when the percentage changed.
+    '''
+    def __init__(self, stream):
+        self.stream = stream
+        self.last_percent = None
+    def emit(self, event, **fields):
+        self.stream.write(json.dumps({'event': event, **fields}, ensure_ascii=False) + "\n")
+        self.stream.flush()
+    def progress(self, percent):
+        if percent != self.last_percent:
+            self.last_percent = percent
+            self.emit('progress', percent=percent)
+    def sentence(self, idx, sentence):
+        self.emit('sentence', index=idx, sentence=sentence)
+
+class StopFlag:
+    '''
+    Set by SIGINT/SIGTERM, passed to the model as should_stop_callback.
+    '''
+    def __init__(self):
+        self.stopped = False
+    def __call__(self):
+        return self.stopped
+    def install(self):
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signal_number, self.on_signal)
+    def on_signal(self, signal_number, frame):
+        self.stopped = True
+        print(f"Received signal {signal_number}, stopping after the current step", file=sys.stderr)
+        # A second signal aborts right away
+        signal.signal(signal_number, signal.SIG_DFL)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Generate and export audiobooks without the GUI.  Progress is written to stdout as JSON lines.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ingest = subparsers.add_parser("ingest", help="Create an audiobook folder from a text file")
+    ingest.add_argument("text_file")
+    ingest.add_argument("--name", help="Audiobook name, the text file's name by default")
+    ingest.add_argument("--output-dir", default="audiobooks", help="Folder the audiobook folder is created in")
+    ingest.add_argument("--speakers", help="generation_settings.json to take the speakers and their voice settings from")
+    ingest.add_argument("--tts-engine", default="pyttsx3", help="Engine of the default Narrator speaker")
+    ingest.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="Voice setting of the Narrator speaker, can be repeated")
+    ingest.add_argument("--overwrite", action="store_true", help="Replace an existing audiobook with the same name")
+    generate = subparsers.add_parser("generate", help="Generate every sentence")
+    generate.add_argument("directory")
+    generate.add_argument("--overwrite", action="store_true", help="Start over even if audio was already generated")
+    continue_parser = subparsers.add_parser("continue", help="Generate the sentences that don't have audio yet")
+    continue_parser.add_argument("directory")
+    regen = subparsers.add_parser("regen", help="Regenerate the sentences flagged for regeneration")
+    regen.add_argument("directory")
+    export = subparsers.add_parser("export", help="Export the audiobook")
+    export.add_argument("directory")
+    export.add_argument("--format", default="mp3", choices=EXPORT_FORMATS)
+    export.add_argument("--pause", type=float, default=0.0, help="Pause between sentences in seconds")
+    return parser
+
+def check_audiobook_directory(directory_path):
+    if not os.path.exists(os.path.join(directory_path, "text_audio_map.json")):
+        raise FileNotFoundError(f"{directory_path} is not a valid Audiobook Directory.")
+
+def continue_audiobook(model, args, events, should_stop):
+    return generate_audio(model, args.directory, True, False, events, should_stop)
+
+def default_speaker_settings(tts_engine_name, overrides):
+    # The engine's parameter defaults, like the voice settings panel starts out with
+    with open(TTS_CONFIG_PATH, 'r', encoding='utf-8') as f:
+        tts_config = json.load(f)
+    engine_config = next((engine for engine in tts_config.get('tts_engines', []) if engine['name'].lower() == tts_engine_name.lower()), None)
+    if engine_config is None:
+        raise ValueError(f"Unknown TTS engine: {tts_engine_name}")
+    settings = {'tts_engine': engine_config['name'], 'use_s2s': False}
+    for param in engine_config.get('parameters', []):
+        if 'default' in param:
+            settings[param['attribute']] = param['default']
+    for override in overrides:
+        key, separator, value = override.partition("=")
+        if not separator:
+            raise ValueError(f"--set expects KEY=VALUE, got '{override}'")
+        try:
+            settings[key] = json.loads(value)
+        except json.JSONDecodeError:
+            settings[key] = value
+    return settings
+
+def export_audiobook(model, args, events, should_stop):
+    check_audiobook_directory(args.directory)
+    output_filename = model.export_audiobook(args.directory, args.pause, events.progress, should_stop, args.format)
+    if output_filename is None:
+        return None
+    return {'output': os.path.join(args.directory, "exported_audiobooks", output_filename)}
+
+def generate_audio(model, directory_path, is_continue, is_regen_only, events, should_stop):
+    check_audiobook_directory(directory_path)
+    model.generate_audio_for_sentence_threaded(directory_path, is_continue, is_regen_only, events.progress, events.sentence, should_stop)
+    if should_stop():
+        return None
+    return {}
+
+def generate_audiobook(model, args, events, should_stop):
+    check_audiobook_directory(args.directory)
+    if not args.overwrite:
+        model.load_text_audio_map(args.directory)
+        if any(entry['generated'] for entry in model.text_audio_map.values()):
+            raise ValueError("Audio was already generated for this audiobook, use continue to pick up where it stopped or --overwrite to start over.")
+    return generate_audio(model, args.directory, False, False, events, should_stop)
+
+def ingest_text_file(model, args, events, should_stop):
+    if not os.path.isfile(args.text_file):
+        raise FileNotFoundError(f"Text file not found: {args.text_file}")
+    book_name = args.name or os.path.splitext(os.path.basename(args.text_file))[0]
+    directory_path = os.path.join(args.output_dir, book_name)
+    if os.path.exists(directory_path):
+        if not args.overwrite:
+            raise FileExistsError(f"An audiobook named '{book_name}' already exists in {args.output_dir}, use --overwrite to replace it.")
+        shutil.rmtree(directory_path)
+    if args.speakers:
+        speakers = model.load_json(args.speakers).get('speakers', {})
+        if not speakers:
+            raise ValueError(f"No speakers found in {args.speakers}")
+        speakers = {int(k): v for k, v in speakers.items()}
+    else:
+        speakers = {1: {'name': 'Narrator', 'color': '#FFFFFF', 'settings': default_speaker_settings(args.tts_engine, args.set)}}
+    sentences = model.load_sentences(args.text_file)
+    os.makedirs(directory_path)
+    shutil.copy2(args.text_file, os.path.join(directory_path, "original_text_file.txt"))
+    model.create_audio_text_map(directory_path, sentences)
+    model.create_book_text_file(directory_path)
+    model.save_text_audio_map(directory_path)
+    model.update_speakers(speakers)
+    model.save_generation_settings(directory_path)
+    return {'directory': directory_path, 'sentences': len(sentences)}
+
+def load_global_settings():
+    if os.path.exists(GLOBAL_SETTINGS_PATH):
+        with open(GLOBAL_SETTINGS_PATH, 'r', encoding='utf-8') as file:
+            return yaml.safe_load(file) or {}
+    return {}
+
+def main(argv=None):
+    try:
+        args = build_parser().parse_args(argv)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else EXIT_USAGE
+    # JSON lines keep the real stdout, everything printed by the model or the engines is sent to stderr
+    sys.stdout.flush()
+    events = EventWriter(os.fdopen(os.dup(sys.stdout.fileno()), 'w', buffering=1, encoding='utf-8'))
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    should_stop = StopFlag()
+    should_stop.install()
+    tts_engines.configure_espeak()
+    model = AudiobookModel(load_global_settings())
+    directory_path = getattr(args, 'directory', None)
+    events.emit('started', command=args.command, **({'directory': directory_path} if directory_path else {}))
+    try:
+        result = run_command(model, args, events, should_stop)
+    except Exception as e:
+        traceback.print_exc()
+        events.emit('error', command=args.command, message=str(e))
+        return EXIT_FAILED
+    if result is None:
+        events.emit('stopped', command=args.command)
+        return EXIT_STOPPED
+    if directory_path:
+        result.setdefault('directory', directory_path)
+    events.emit('finished', command=args.command, **result)
+    return EXIT_OK
+
+def regen_audiobook(model, args, events, should_stop):
+    return generate_audio(model, args.directory, False, True, events, should_stop)
+
+def run_command(model, args, events, should_stop):
+    '''
+    Runs a parsed command.  Returns the fields of the finished event, or None when it was stopped.
+    '''
+    commands = {
+        'ingest': ingest_text_file,
+        'generate': generate_audiobook,
+        'continue': continue_audiobook,
+        'regen': regen_audiobook,
+        'export': export_audiobook
+    }
+    return commands[args.command](model, args, events, should_stop)
+
+if __name__ == '__main__':
+    sys.exit(main())
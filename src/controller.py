@@ -1,8 +1,16 @@
 # controller.py 
  
 import sys 
+
+# Installed before anything else is imported so every import gets timed
+startup_profiler = None
+if '--profile-startup' in sys.argv:
+    from startup_profile import ImportProfiler
+    startup_profiler = ImportProfiler()
+    startup_profiler.install()
+
 from PySide6.QtWidgets import QApplication, QMessageBox 
-from PySide6.QtCore import QThread, Signal, QObject
+from PySide6.QtCore import QThread, Signal, QObject, QTimer
 import os
 import shutil
 import time
@@ -16,20 +24,12 @@ if os.path.exists("runtime"):
     if script_dir not in sys.path:
         sys.path.insert(0, script_dir)
         
-try:
-    import styletts2
-    espeak_path = os.path.join(os.path.dirname(__file__), '..', 'espeak NG')
-    espeak_library = os.path.join(os.path.dirname(__file__), '..', 'espeak NG', 'libespeak-ng.dll')
-    espeak_data_path = os.path.join(espeak_path, 'espeak-ng-data')
-    os.environ['PHONEMIZER_ESPEAK_PATH'] = espeak_path
-    os.environ['PHONEMIZER_ESPEAK_LIBRARY'] = espeak_library
-    os.environ['ESPEAK_DATA_PATH'] = espeak_data_path    
-except:
-    # Styletts2 not installed, so espeak not added to path
-    pass
+import tts_engines
+tts_engines.configure_espeak()
 
 from model import AudiobookModel
 from view import AudiobookMakerView
+from map_changes import DELETED, GENERATED
 
 
 class AudioGenerationWorker(QThread):
@@ -108,19 +108,51 @@ class RegenerateAudioWorker(QThread):
                 s2s_validated = False
         else:
             s2s_validated = False
-        new_audio_temp_path = self.model.generate_audio_proxy(self.selected_sentence, self.combined_parameters, s2s_validated)
+        new_audio_temp_path = self.model.generate_audio_proxy(self.selected_sentence, self.combined_parameters, s2s_validated, output_path=self.new_audio_path)
         if not new_audio_temp_path:
             self.error_signal.emit("Failed to generate new audio.")
             return
 
-        # Move new audio file to old path
-        shutil.move(new_audio_temp_path, self.new_audio_path)
+        # Move new audio file to old path, unless the engine already wrote it there
+        if os.path.abspath(new_audio_temp_path) != os.path.abspath(self.new_audio_path):
+            shutil.move(new_audio_temp_path, self.new_audio_path)
 
         # Emit finished signal
         print(f"regeneration id: {self.speaker_id}")
 
         self.finished_signal.emit(self.new_audio_path, self.speaker_id)
 
+class ExportAudiobookWorker(QThread):
+    progress_signal = Signal(int)
+    finished_signal = Signal(str)  # Exported file name, empty if the export was stopped
+    error_signal = Signal(str)
+
+    def __init__(self, model, directory_path, pause_duration, export_format="mp3"):
+        super().__init__()
+        self.model = model
+        self.directory_path = directory_path
+        self.pause_duration = pause_duration
+        self.export_format = export_format
+        self._stop_requested = False
+
+    def run(self):
+        try:
+            output_filename = self.model.export_audiobook(self.directory_path, self.pause_duration, self.report_progress, self.should_stop, self.export_format)
+        except Exception as e:
+            traceback.print_exc()
+            self.error_signal.emit(str(e))
+            return
+        self.finished_signal.emit(output_filename or "")
+
+    def stop(self):
+        self._stop_requested = True
+
+    def should_stop(self):
+        return self._stop_requested
+
+    def report_progress(self, progress):
+        self.progress_signal.emit(progress)
+
 class AudiobookController:
     def __init__(self):
         self.app = QApplication(sys.argv)
@@ -130,11 +162,15 @@ class AudiobookController:
         self.view_word_replacer = None
         self.current_sentence_idx = 0
         self.tts_engine = None
-        self.view.audio_finished_signal.connect(self.on_audio_finished)
-        self.playing_sequence = False
-        self.current_audio_index = 0
         self.current_audiobook_directory = None
         self.is_generating = False
+        # Edits are saved together a moment after the last one, see map_changes
+        self.save_timer = QTimer()
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(int(self.global_settings.get('map_save_delay_ms', 1000)))
+        self.save_timer.timeout.connect(self.flush_map_changes)
+        self.model.add_map_listener(self.on_map_changed)
+        self.app.aboutToQuit.connect(self.flush_map_changes)
 
         
         self.debug = self.global_settings.get('debug_mode', False)  # Set this to True to enable debugging mode
@@ -146,6 +182,9 @@ class AudiobookController:
         self.populate_initial_data()
 
         self.view.show()
+        if startup_profiler is not None:
+            # Runs on the first event loop iteration, once the window is actually up
+            QTimer.singleShot(0, startup_profiler.report)
         sys.exit(self.app.exec())
 
     def allow_speaker_assignment(self, position):
@@ -171,19 +210,15 @@ class AudiobookController:
         speaker_id, speaker_name = self.view.get_current_speaker_attributes()
         self.view.assign_speaker_to_selected(speaker_id, speaker_name)
         # Update model accordingly
-        selected_rows = self.view.tableWidget.selectionModel().selectedRows(0)
+        selected_rows = self.view.table_view.selectionModel().selectedRows(0)
         for index in selected_rows:
             row = index.row()
             self.assign_speaker_to_sentence(row, speaker_id)
     def assign_speaker_to_sentence(self, idx, speaker_id):
         self.model.assign_speaker_to_sentence(idx, speaker_id)
-        if self.current_audiobook_directory:
-            self.model.save_text_audio_map(self.current_audiobook_directory)
-        else:
-            # Handle the case where the audiobook directory is not set
-            pass
 
     def check_and_reset_for_new_text_file(self, action_description):
+        self.flush_map_changes()
         if self.model.filepath or self.model.text_audio_map:
             proceed = self.view.ask_question(
                 action_description,
@@ -219,8 +254,6 @@ class AudiobookController:
             return #stop erasure
         
         self.model.reset_regen_in_text_audio_map()
-        self.model.save_text_audio_map(self.current_audiobook_directory)
-        self.update_table_with_sentences()
     def connect_signals(self):
         # Connect view signals to controller methods
         self.view.clear_regen_requested.connect(self.clear_regen_checkboxes)
@@ -246,7 +279,7 @@ class AudiobookController:
         self.view.speakers_updated.connect(self.on_speakers_updated)
         self.view.start_generation_requested.connect(self.start_generation)
         self.view.stop_generation_requested.connect(self.stop_generation)
-        self.view.tableWidget.customContextMenuRequested.connect(self.allow_speaker_assignment)
+        self.view.table_view.customContextMenuRequested.connect(self.allow_speaker_assignment)
         self.view.text_item_changed.connect(self.update_sentence)
         self.view.toggle_delete_action_requested.connect(self.toggle_delete_column)
         self.view.tts_engine_changed.connect(self.on_tts_engine_changed)
@@ -264,6 +297,8 @@ class AudiobookController:
         if not self.current_audiobook_directory:
             self.popup_load_audiobook()
             return
+        # The worker reads the map from disk
+        self.flush_map_changes()
         
         # Attempt to load the text file
         text_file_path = os.path.join(self.current_audiobook_directory, "book_text.txt")
@@ -363,41 +398,28 @@ class AudiobookController:
         self.view.stop_audio()
 
         rows_list = self.view.get_deletion_checkboxes()
-        self.model.delete_sentences(rows_list)
-        self.model.save_text_audio_map(self.current_audiobook_directory)
-        self.model.create_book_text_file(self.current_audiobook_directory)
-        self.update_table_with_sentences()
+        self.model.delete_sentences(rows_list, self.current_audiobook_directory)
+        self.update_audiobook_runtime()
                 
     def export_audiobook(self):
         directory_path = self.view.get_existing_directory("Select an Audiobook Directory")
         if not directory_path:
             return  # Exit the function if no directory was selected
+        self.flush_map_changes()
 
         pause_duration = self.view.get_pause_between_sentences()
-        try:
-            output_filename = self.model.export_audiobook(directory_path, pause_duration)
-            self.view.show_message("Success", f"Combined audiobook saved as {output_filename}", icon=QMessageBox.Information)
-        except FileNotFoundError as e:
-            self.view.show_message("Error", str(e), icon=QMessageBox.Warning)
-    def extract_text(self, idx: int, concat_sentences:bool, length_search_text: int) -> str:
-        text = self.model.text_audio_map[str(idx)]['sentence']
-        if concat_sentences:
-            additional_text =  ""
-            offset = 1
-            while len(additional_text) < length_search_text and idx+offset < len(self.model.text_audio_map):
-                text_at_offset = self.model.text_audio_map[str(idx+offset)]['sentence']
-                if len(text_at_offset) < length_search_text:
-                    additional_text += text_at_offset
-                    length_search_text -= len(text_at_offset)
-                else:
-                    additional_text += text_at_offset[:length_search_text - 1]
-                    ## adding only so much to the sentence, that the search result can be found only if it overlaps with the sentence border.
-                    ## and not if it is completely within the next sentence
-                    break
-                offset += 1
-            text += additional_text
-        return text.lower()
-
+        # Exporting runs in the background, the stop button cancels it like it stops generation
+        self.worker = ExportAudiobookWorker(self.model, directory_path, pause_duration, self.view.get_export_format())
+        self.worker.progress_signal.connect(self.view.set_progress)
+        self.worker.finished_signal.connect(self.on_export_finished)
+        self.worker.error_signal.connect(self.on_export_error)
+        self.worker.start()
+        self.view.on_enable_stop_button()
+        self.view.disable_buttons()
+    def flush_map_changes(self):
+        self.save_timer.stop()
+        if self.current_audiobook_directory and self.model.has_pending_map_changes():
+            self.model.flush_map_changes(self.current_audiobook_directory)
     def load_existing_audiobook(self):
         if not self.check_and_reset_for_new_text_file('Load Existing Audiobook'):
             return
@@ -463,9 +485,17 @@ class AudiobookController:
         else:
             pass
 
-    def on_audio_finished(self):
-        if self.playing_sequence:
-            self.play_next_audio_in_sequence()
+    def on_export_error(self, error_message):
+        self.view.enable_buttons()
+        self.view.on_disable_stop_button()
+        self.view.show_message("Error", error_message, icon=QMessageBox.Warning)
+    def on_export_finished(self, output_filename):
+        self.view.enable_buttons()
+        self.view.on_disable_stop_button()
+        if output_filename:
+            self.view.show_message("Success", f"Combined audiobook saved as {output_filename}", icon=QMessageBox.Information)
+        else:
+            self.view.show_message("Export Stopped", "The export was stopped, no audiobook file was saved.", icon=QMessageBox.Information)
     def on_font_size_changed(self, font_size):
         self.view.update_font_size_from_slider(font_size)
         settings_dict = {'font_size': font_size}
@@ -480,20 +510,23 @@ class AudiobookController:
         self.is_generating = True
         self.view.on_enable_stop_button()
         self.view.disable_buttons()
+    def on_map_changed(self, kind, first_row, last_row):
+        # Only the changed rows are repainted
+        if kind == DELETED:
+            self.view.remove_table_rows(first_row, last_row)
+        else:
+            self.view.refresh_table_rows(first_row, last_row)
+        if self.model.has_pending_map_changes():
+            self.save_timer.start()
     def on_regeneration_error(self, error_message):
         self.view.show_message("Error", error_message, icon=QMessageBox.Warning)
     def on_regeneration_finished(self, map_key, new_audio_path, speaker_id):
         # Update the text_audio_map with the new audio path and speaker_id
         self.model.text_audio_map[map_key]['audio_path'] = new_audio_path
         self.model.text_audio_map[map_key]['speaker_id'] = speaker_id
-
-        # Update the table row's background color to match the new speaker
-        self.view.set_row_speaker_color(int(map_key), speaker_id)
-
-        book_name = self.view.audiobook_label.text()
-        directory_path = os.path.join("audiobooks", book_name)
-        # Save the updated map back to the file
-        self.model.save_text_audio_map(directory_path)
+        self.model.record_audio_info(map_key)
+        # Repaints the row with the new speaker's color, the entry is saved with the next flush_map_changes
+        self.model.notify_map_change(GENERATED, [int(map_key)])
         print("Regeneration complete")
     def on_s2s_engine_changed(self, s2s_engine_name):
         # You can perform additional actions here if needed
@@ -507,12 +540,8 @@ class AudiobookController:
         # Save the updated generation settings
         self.save_generation_settings()
     def on_sentence_generated(self, idx, sentence):
-        row_position = int(idx)
-        item = self.model.text_audio_map[str(row_position)]
-        speaker_id = item.get('speaker_id', 1)
-        speaker_name = self.model.get_speaker_name(speaker_id)
-        self.view.add_table_item(row_position, sentence, speaker_name)
-        # self.view.resize_table()
+        # The generation run journals its own entries
+        self.model.notify_map_change(GENERATED, [int(idx)], persist=False)
     def on_test_word_finished(self, audio_path):
         self.view.play_audio(audio_path)
     def on_tts_engine_changed(self, speakers):
@@ -522,35 +551,18 @@ class AudiobookController:
     def pause_audio(self):
         self.view.pause_audio()
     def play_all_from_selected(self):
-        if self.view.tableWidget.rowCount() == 0:
+        if self.view.get_table_row_count() == 0:
             return
 
-        selected_row = self.view.get_selected_table_row()
-        if selected_row >= 0:
-            self.current_audio_index = selected_row
-        else:
-            self.current_audio_index = 0
-
-        self.playing_sequence = True
-        self.play_next_audio_in_sequence()
-    def play_next_audio_in_sequence(self):
-        while True:
-            map_key = str(self.current_audio_index)
-            if map_key in self.model.text_audio_map and self.model.text_audio_map[map_key]["generated"]:
-                audio_path = self.model.text_audio_map[map_key]['audio_path']
-                self.view.play_audio(audio_path)
-                self.view.select_table_row(self.current_audio_index)
-                self.current_audio_index += 1
-                break
-            else:
-                # No generated audio at this index, check next
-                if self.current_audio_index >= len(self.model.text_audio_map):
-                    # Reached end of sentences
-                    self.playing_sequence = False
-                    self.current_audio_index = 0
-                    break
-                else:
-                    self.current_audio_index += 1
+        selected_row = max(self.view.get_selected_table_row(), 0)
+        # Every generated sentence from the selected one on, played back to back with the export pause between them
+        segments = []
+        for row in range(selected_row, len(self.model.text_audio_map)):
+            entry = self.model.text_audio_map.get(str(row))
+            if entry and entry["generated"] and entry['audio_path']:
+                segments.append((row, entry['audio_path']))
+        if segments:
+            self.view.play_sequence(segments, self.view.get_pause_between_sentences())
     def play_selected_audio(self):
         selected_row = self.view.get_selected_table_row()
         if selected_row == -1:
@@ -584,7 +596,6 @@ class AudiobookController:
     
     def regen_checkbox_toggled(self, row, state):
         self.model.change_regen_state(row, state)
-        self.model.save_text_audio_map(self.current_audiobook_directory)
     def regenerate_audio_for_sentence(self):
         selected_row = self.view.get_selected_table_row()
         if selected_row == -1:
@@ -641,6 +652,8 @@ class AudiobookController:
         if not self.current_audiobook_directory:
             self.popup_load_audiobook()
             return
+        # The worker reads the map from disk
+        self.flush_map_changes()
         
         is_continue = False
         is_regen_only = True
@@ -681,26 +694,10 @@ class AudiobookController:
     def search_sentences(self, start_idx:int, forward:bool, search_text:str, concat_sentences:bool):
         if not search_text:
             return
-        length_search_text = len(search_text)
-        search_text = search_text.lower()
-        if forward:
-            for idx in range(start_idx + 1, len(self.model.text_audio_map)):
-                if search_text in self.extract_text(idx, concat_sentences, length_search_text):
-                    self.view.select_table_row(idx)
-                    return
-            for idx in range(0, start_idx):
-                if search_text in self.extract_text(idx, concat_sentences, length_search_text):
-                    self.view.select_table_row(idx)
-                    return
-        else:
-            for idx in range(start_idx - 1, -1, -1):
-                if search_text in self.extract_text(idx, concat_sentences, length_search_text):
-                    self.view.select_table_row(idx)
-                    return
-            for idx in range(len(self.model.text_audio_map)-1, start_idx, -1):
-                if search_text in self.extract_text(idx, concat_sentences, length_search_text):
-                    self.view.select_table_row(idx)
-                    return
+        # With concat_sentences a match may start in a sentence and run into the following ones
+        idx = self.model.get_search_index().find(start_idx, forward, search_text, concat_sentences)
+        if idx is not None:
+            self.view.select_table_row(idx)
     def set_background_image(self): 
         file_name = self.view.get_open_file_name("", "", "Image Files (*.png *.jpg *.jpeg);;All Files (*)") 
         if file_name: 
@@ -731,6 +728,7 @@ class AudiobookController:
         self.update_table_with_sentences()
         self.view.enable_speaker_menu()
     def start_generation(self):
+        self.flush_map_changes()
         if hasattr(self.model, 'filepath') and self.model.filepath:
             if not self.current_audiobook_directory:
                 directory_path = self.create_audiobook_directory()
@@ -822,9 +820,13 @@ class AudiobookController:
         continue_wr = self.view.ask_question("Word Replacement", "This will begin word replacement for all items in the list, meaning all instances found in the audiobook will be replaced\n\nProceed?", default_button=QMessageBox.No)
         if not continue_wr:
             return
-        self.model.replace_words_from_list(replacement_list_path, extra)
-        self.model.save_text_audio_map(self.current_audiobook_directory)
-        self.update_table_with_sentences()
+        rule_counts, changed_sentences = self.model.replace_words_from_list(replacement_list_path, extra)
+        for orig_word, count in rule_counts.most_common():
+            print(f"Word replacement: {orig_word} replaced {count} times")
+        summary = f"{sum(rule_counts.values())} replacements made by {len(rule_counts)} rules, {changed_sentences} sentences marked for regeneration."
+        # The busiest rules, the full list is printed to the console
+        details = "\n".join(f"{orig_word}: {count}" for orig_word, count in rule_counts.most_common(15))
+        self.view.show_message("Word Replacement", f"{summary}\n\n{details}" if details else summary)
     def stop_generation(self):
         if hasattr(self, 'worker') and self.worker.isRunning():
             self.worker.stop()
@@ -876,24 +878,21 @@ class AudiobookController:
             
         except Exception as e:
             self.view.show_message("Error", f"An error occurred: {str(e)}", icon=QMessageBox.Warning)
+    def update_audiobook_runtime(self):
+        # Only recorded durations are used, audio files aren't opened to refresh the table
+        timeline = self.model.get_audio_timeline()
+        self.view.set_audiobook_runtime(timeline.duration, timeline.missing)
     def update_sentence(self, row, new_text):
+        # The row is repainted and saved through on_map_changed
         self.model.update_sentence_in_text_audio_map(row, new_text)
-        self.model.save_text_audio_map(self.current_audiobook_directory)
-        self.model.create_book_text_file(self.current_audiobook_directory)
-        self.update_table_with_sentences()
     def update_speakers(self, speakers):
         self.model.update_speakers(speakers)
         self.view.update_speaker_selection_combo()
 
     def update_table_with_sentences(self):
-        self.view.clear_table()
-        total_sentences = len(self.model.text_audio_map)
-        self.view.tableWidget.setRowCount(total_sentences)  # Set the total number of rows upfront
-        for idx_str in sorted(self.model.text_audio_map.keys(), key=lambda x: int(x)):
-            sentence, row_position, speaker_id, speaker_name, regen_state = self.model.get_map_keys_and_values(idx_str)
-            self.view.add_table_item(row_position, sentence, speaker_name, regen_state)
-            self.view.set_row_speaker_color(row_position, speaker_id)
-        self.view.resize_table()
+        # The table reads rows from text_audio_map as they're painted, nothing is copied into it
+        self.view.set_table_sentences(self.model.text_audio_map, self.model.get_speaker_name)
+        self.update_audiobook_runtime()
     def upload_requested(self, mode, save_items):
         try:
             self.model.process_upload_items(mode, save_items)
@@ -0,0 +1,130 @@
+# engine_pool.py
+
+'''
+Keeps several loaded tts/s2s engines resident instead of a single one per kind.
+
+Engines are keyed by their kind ("tts"/"s2s"), the engine name and the values of that engine's load-time parameters ("stage": "load" in configs/tts_config.json or configs/s2s_config.json).  Inference-time parameters are passed with every sentence instead, so changing a speed or temperature slider doesn't reload anything.  Speakers that share a voice model share the loaded engine, and switching back to a speaker that was used before doesn't reload its weights from disk.
+
+The size of each engine is estimated from the process memory (and CUDA memory, when torch is in use) before and after it was loaded.  Once the resident engines go past "engine_pool_max_mb" or "engine_pool_max_vram_mb" the least recently used ones are dropped.  The engines acquired last for each kind are never evicted, since the current speaker still needs them.
+'''
+
+import gc
+import json
+import sys
+import time
+from collections import OrderedDict
+
+class EnginePool:
+    def __init__(self, max_bytes, max_vram_bytes, tts_config=None, s2s_config=None):
+        self.max_bytes = max_bytes
+        self.max_vram_bytes = max_vram_bytes
+        self.engine_attributes = {}
+        for kind, config in (("tts", tts_config or {}), ("s2s", s2s_config or {})):
+            for engine in config.get(f'{kind}_engines', []):
+                # Parameters without a stage are treated as load-time, reloading too often is safer than reusing a wrong model
+                self.engine_attributes[(kind, engine['name'].lower())] = [param['attribute'] for param in engine.get('parameters', []) if param.get('stage', 'load') == 'load']
+        # key -> (engine, ram bytes, vram bytes), least recently used first
+        self.engines = OrderedDict()
+        self.current = {}
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+        self.resident_bytes = 0
+        self.resident_vram_bytes = 0
+    def acquire(self, kind, engine_name, parameters, loader):
+        key = self.key_for(kind, engine_name, parameters)
+        self.current[kind] = key
+        if key in self.engines:
+            self.engines.move_to_end(key)
+            self.hits += 1
+            return self.engines[key][0]
+        ram_before, vram_before = memory_in_use()
+        start = time.perf_counter()
+        try:
+            engine = loader(engine_name, **parameters)
+        except Exception as e:
+            if not is_out_of_memory(e) or not self.engines:
+                raise
+            # Make room by dropping everything that isn't in use and try once more
+            print(f"Out of memory loading {engine_name}, unloading idle engines and retrying")
+            self.evict(force=True)
+            ram_before, vram_before = memory_in_use()
+            engine = loader(engine_name, **parameters)
+        self.load_seconds += time.perf_counter() - start
+        if engine is None:
+            return None
+        ram_after, vram_after = memory_in_use()
+        ram_bytes = max(ram_after - ram_before, 0)
+        vram_bytes = max(vram_after - vram_before, 0)
+        self.engines[key] = (engine, ram_bytes, vram_bytes)
+        self.resident_bytes += ram_bytes
+        self.resident_vram_bytes += vram_bytes
+        self.loads += 1
+        self.evict()
+        return engine
+    def clear(self):
+        self.engines.clear()
+        self.current.clear()
+        self.resident_bytes = 0
+        self.resident_vram_bytes = 0
+        release_memory()
+    def evict(self, force=False):
+        in_use = set(self.current.values())
+        evicted = False
+        for key in list(self.engines):
+            if not force and self.resident_bytes <= self.max_bytes and self.resident_vram_bytes <= self.max_vram_bytes:
+                break
+            if key in in_use:
+                continue
+            _, ram_bytes, vram_bytes = self.engines.pop(key)
+            self.resident_bytes -= ram_bytes
+            self.resident_vram_bytes -= vram_bytes
+            self.evictions += 1
+            evicted = True
+            print(f"Unloaded {key[1]} {key[0]} engine to stay within the engine memory budget")
+        if evicted:
+            release_memory()
+    def key_for(self, kind, engine_name, parameters):
+        engine_name = engine_name.lower()
+        attributes = self.engine_attributes.get((kind, engine_name))
+        if attributes is None:
+            # Unknown engine, any parameter could matter
+            relevant = parameters
+        else:
+            relevant = {attribute: parameters.get(attribute) for attribute in attributes}
+        return (kind, engine_name, json.dumps(relevant, sort_keys=True, default=str))
+    def stats(self):
+        return {
+            "resident": len(self.engines),
+            "hits": self.hits,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "load_seconds": round(self.load_seconds, 2),
+            "resident_bytes": self.resident_bytes,
+            "resident_vram_bytes": self.resident_vram_bytes,
+            "max_bytes": self.max_bytes,
+            "max_vram_bytes": self.max_vram_bytes
+        }
+
+def is_out_of_memory(error):
+    return isinstance(error, MemoryError) or type(error).__name__ == "OutOfMemoryError"
+
+def memory_in_use():
+    try:
+        import psutil
+        ram = psutil.Process().memory_info().rss
+    except ImportError:
+        ram = 0
+    vram = 0
+    # Only look at CUDA when an engine already imported torch, the pool shouldn't pull it in by itself
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        vram = torch.cuda.memory_allocated()
+    return ram, vram
+
+def release_memory():
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
@@ -0,0 +1,288 @@
+# gapless_playback.py
+
+'''
+Gapless "Play All from Selected".
+
+Playing the book used to create a new QMediaPlayer and QAudioOutput for every sentence and only start the next file once the previous one had reported EndOfMedia, which left a gap after every sentence.  GaplessPlayer plays the sentence files as one continuous stream through a single QAudioSink instead, the sink is kept between runs as long as the format stays the same:
+    - a decoder thread reads the upcoming sentence files ahead of playback into a buffer of up to PREFETCH_SECONDS of audio, converted to the stream's format (16 bit, with the sample rate and channel count of the first sentence).  Files the wave module can't read, float or WAVE_FORMAT_EXTENSIBLE .wav or AIFF, are decoded with soundfile, see audio_index.  The export pause between sentences is written into the stream as silence, so proofing sounds like the exported book.
+    - the sink pulls from that buffer through SegmentStreamDevice.  Should the decoder ever fall behind, the sink is given silence instead of a short read, which would stop it.
+    - the stream records at which byte each sentence starts, the sink's processed time tells which one is being heard and segment_started is emitted for it, so the table keeps highlighting the sentence that's playing.
+'''
+
+import threading
+import wave
+from bisect import bisect_right
+from collections import deque
+
+from PySide6.QtCore import QIODevice, QObject, QTimer, Signal
+from PySide6.QtMultimedia import QAudio, QAudioFormat, QAudioSink, QMediaDevices
+
+from audio_index import read_audio_format, read_audio_frames
+from lossless_export import SegmentFormat
+
+PREFETCH_SECONDS = 10
+FIRST_SEGMENT_TIMEOUT = 2.0
+POSITION_POLL_MS = 50
+STREAM_SAMPLE_WIDTH = 2
+
+class SegmentStream:
+    '''
+    PCM stream of a list of (row, audio_path) segments, decoded ahead by a background thread.  read() is called from the sink's side.
+    '''
+    def __init__(self, segments, pause_duration, stream_format, prefetch_seconds=PREFETCH_SECONDS):
+        self.segments = list(segments)
+        self.pause_duration = pause_duration
+        self.stream_format = stream_format
+        self.frame_size = stream_format.channels * stream_format.sample_width
+        self.bytes_per_second = stream_format.sample_rate * self.frame_size
+        self.pause = bytes(int(round(pause_duration * stream_format.sample_rate)) * self.frame_size)
+        self.max_buffered_bytes = max(int(prefetch_seconds * stream_format.sample_rate) * self.frame_size, self.frame_size)
+        # [segment, data, offset], segment is None for the pauses
+        self.chunks = deque()
+        self.buffered_bytes = 0
+        self.condition = threading.Condition()
+        self.decoding = True
+        self.closed = False
+        self.position = 0
+        self.starts = []
+        self.started_segments = []
+        self.underrun_bytes = 0
+        self.thread = threading.Thread(target=self.decode, daemon=True)
+    def available_bytes(self):
+        # While decoding, read() is never short
+        with self.condition:
+            if self.decoding and not self.closed:
+                return max(self.buffered_bytes, self.max_buffered_bytes)
+            return self.buffered_bytes
+    @property
+    def finished(self):
+        with self.condition:
+            return not self.decoding and not self.chunks
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.chunks.clear()
+            self.condition.notify_all()
+    def decode(self):
+        try:
+            queued = False
+            for segment in self.segments:
+                with self.condition:
+                    while not self.closed and self.buffered_bytes >= self.max_buffered_bytes:
+                        self.condition.wait()
+                    if self.closed:
+                        return
+                data = decode_segment(segment[1], self.stream_format)
+                if data is None:
+                    continue
+                with self.condition:
+                    if self.closed:
+                        return
+                    if queued and self.pause:
+                        self.chunks.append([None, memoryview(self.pause), 0])
+                        self.buffered_bytes += len(self.pause)
+                    self.chunks.append([segment, memoryview(data), 0])
+                    self.buffered_bytes += len(data)
+                    queued = True
+                    self.condition.notify_all()
+        finally:
+            with self.condition:
+                self.decoding = False
+                self.condition.notify_all()
+    def read(self, max_bytes):
+        '''
+        Up to max_bytes of the stream, padded with silence while the decoder is behind.  Returns b"" once every segment was read.
+        '''
+        max_bytes -= max_bytes % self.frame_size
+        parts = []
+        size = 0
+        with self.condition:
+            while size < max_bytes and self.chunks:
+                chunk = self.chunks[0]
+                segment, data, offset = chunk
+                if offset == 0 and segment is not None:
+                    self.starts.append(self.position + size)
+                    self.started_segments.append(segment)
+                take = min(len(data) - offset, max_bytes - size)
+                parts.append(data[offset:offset + take])
+                size += take
+                if offset + take == len(data):
+                    self.chunks.popleft()
+                else:
+                    chunk[2] = offset + take
+            self.buffered_bytes -= size
+            self.condition.notify_all()
+            if size < max_bytes and self.decoding and not self.closed:
+                gap = max_bytes - size
+                parts.append(bytes(gap))
+                size += gap
+                self.underrun_bytes += gap
+            self.position += size
+        return b"".join(parts)
+    def remaining_segments(self, segment):
+        # The segments after the given one, to continue playback from there
+        position = self.segments.index(segment) if segment in self.segments else -1
+        return self.segments[position + 1:]
+    def segment_at(self, position):
+        # The (row, audio_path) segment playing at a byte position of the stream
+        with self.condition:
+            index = bisect_right(self.starts, position) - 1
+            return self.started_segments[index] if index >= 0 else None
+    def start(self):
+        self.thread.start()
+        # The sink starts pulling right away, it would begin with silence if the first sentence wasn't decoded yet
+        with self.condition:
+            self.condition.wait_for(lambda: self.chunks or not self.decoding, timeout=FIRST_SEGMENT_TIMEOUT)
+
+class SegmentStreamDevice(QIODevice):
+    def __init__(self, stream, parent=None):
+        super().__init__(parent)
+        self.stream = stream
+    def bytesAvailable(self):
+        return self.stream.available_bytes() + super().bytesAvailable()
+    def isSequential(self):
+        return True
+    def readData(self, max_size):
+        return self.stream.read(max_size)
+    def writeData(self, data):
+        return -1
+
+class GaplessPlayer(QObject):
+    segment_started = Signal(int, str)
+    finished = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.sink = None
+        self.sink_format = None
+        self.stream = None
+        self.device = None
+        self.current_segment = None
+        self.position_timer = QTimer(self)
+        self.position_timer.setInterval(POSITION_POLL_MS)
+        self.position_timer.timeout.connect(self.update_position)
+
+    def is_playing(self):
+        return self.stream is not None
+
+    def on_state_changed(self, state):
+        # The sink only goes idle for good once the whole stream was played
+        if state == QAudio.IdleState and self.stream is not None and self.stream.finished:
+            self.stop()
+            self.finished.emit()
+
+    def play(self, segments, pause_duration):
+        '''
+        Plays the (row, audio_path) segments back to back with pause_duration seconds between them.  Returns False, after emitting finished, when none of them can be read.
+        '''
+        self.stop()
+        stream_format = playback_format(audio_path for _, audio_path in segments)
+        if stream_format is None:
+            self.finished.emit()
+            return False
+        if self.sink is None or self.sink_format != stream_format:
+            if self.sink is not None:
+                self.sink.deleteLater()
+            audio_format = QAudioFormat()
+            audio_format.setSampleRate(stream_format.sample_rate)
+            audio_format.setChannelCount(stream_format.channels)
+            audio_format.setSampleFormat(QAudioFormat.Int16)
+            self.sink = QAudioSink(QMediaDevices.defaultAudioOutput(), audio_format, self)
+            self.sink.stateChanged.connect(self.on_state_changed)
+            self.sink_format = stream_format
+        self.stream = SegmentStream(segments, pause_duration, stream_format)
+        self.stream.start()
+        self.device = SegmentStreamDevice(self.stream, self)
+        self.device.open(QIODevice.ReadOnly)
+        self.sink.start(self.device)
+        self.position_timer.start()
+        return True
+
+    def skip(self):
+        # Continues with the sentence after the one playing, e.g. when its audio is about to be replaced
+        if self.stream is None:
+            return
+        remaining = self.stream.remaining_segments(self.current_segment)
+        pause_duration = self.stream.pause_duration
+        if remaining:
+            self.play(remaining, pause_duration)
+        else:
+            self.stop()
+            self.finished.emit()
+
+    def stop(self):
+        self.position_timer.stop()
+        stream = self.stream
+        self.stream = None
+        self.current_segment = None
+        if stream is not None:
+            stream.close()
+            self.sink.stop()
+        if self.device is not None:
+            self.device.close()
+            self.device.deleteLater()
+            self.device = None
+
+    def toggle_pause(self):
+        if self.sink is None or self.stream is None:
+            return
+        if self.sink.state() == QAudio.SuspendedState:
+            self.sink.resume()
+        else:
+            self.sink.suspend()
+
+    def update_position(self):
+        if self.stream is None:
+            return
+        played = int(self.sink.processedUSecs() * self.stream.bytes_per_second / 1000000)
+        segment = self.stream.segment_at(played)
+        if segment is not None and segment != self.current_segment:
+            self.current_segment = segment
+            self.segment_started.emit(*segment)
+
+def convert_pcm(data, segment_format, stream_format):
+    '''
+    Converts PCM frames to stream_format, which is always 16 bit.  Channels are mixed down to mono and copied up to the stream's count, the sample rate is converted by linear interpolation, good enough for proofing.
+    '''
+    import numpy as np
+    width = segment_format.sample_width
+    if width == 1:
+        # 8 bit wav is unsigned
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = ((raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)) << 8 >> 8).astype(np.float32) / float(1 << 23)
+    else:
+        samples = np.frombuffer(data, dtype='<i2' if width == 2 else '<i4').astype(np.float32) / float(1 << (8 * width - 1))
+    samples = samples.reshape(-1, segment_format.channels)
+    if segment_format.channels != stream_format.channels:
+        samples = np.repeat(samples.mean(axis=1, keepdims=True), stream_format.channels, axis=1)
+    if segment_format.sample_rate != stream_format.sample_rate and len(samples):
+        frames = int(round(len(samples) * stream_format.sample_rate / segment_format.sample_rate))
+        positions = np.arange(frames) * (segment_format.sample_rate / stream_format.sample_rate)
+        source = np.arange(len(samples))
+        samples = np.stack([np.interp(positions, source, samples[:, channel]) for channel in range(samples.shape[1])], axis=1)
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+
+def decode_segment(audio_path, stream_format):
+    '''
+    The PCM frames of a sentence file in stream_format, or None when it can't be read.
+    '''
+    try:
+        segment_format, data = read_audio_frames(audio_path)
+    except (OSError, EOFError, RuntimeError, wave.Error) as e:
+        print(f"Skipping {audio_path} in playback: {e}")
+        return None
+    if segment_format == stream_format:
+        return data
+    return convert_pcm(data, segment_format, stream_format)
+
+def playback_format(audio_paths):
+    # 16 bit with the sample rate and channels of the first readable file
+    for audio_path in audio_paths:
+        try:
+            file_format = read_audio_format(audio_path)
+        except (OSError, EOFError, RuntimeError, wave.Error):
+            continue
+        return SegmentFormat(file_format.sample_rate, file_format.channels, STREAM_SAMPLE_WIDTH)
+    return None
@@ -0,0 +1,94 @@
+# generation_pipeline.py
+
+'''
+Staged producer/consumer pipeline used for audio generation.
+
+Every stage except the last runs on its own thread and hands its jobs to the next stage through a bounded queue, so while the s2s engine converts sentence N the tts engine can already work on sentence N+1.  The final stage runs on the calling thread, which keeps the text_audio_map updates and progress callbacks where they were before.
+
+A stage may also return a list of jobs, e.g. a first stage that takes batches of jobs from the iterator, each one is handed to the next stage on its own.  Jobs are processed strictly in order.  Stopping is done by the job iterator simply running out: whatever is already in flight is still finished.  An exception in any stage aborts the whole pipeline and is re-raised on the calling thread.
+'''
+
+import queue
+import threading
+
+DEFAULT_QUEUE_SIZE = 2
+_DONE = object()
+
+def run_pipeline(jobs, stages, final_stage, queue_size=DEFAULT_QUEUE_SIZE):
+    abort = threading.Event()
+    errors = []
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+
+    def put(q, item):
+        while not abort.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q):
+        while not abort.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def hand_on(out_queue, result):
+        for job in result if isinstance(result, list) else [result]:
+            if job is not None and not put(out_queue, job):
+                return False
+        return True
+
+    def source(stage, out_queue):
+        try:
+            for job in jobs:
+                if abort.is_set():
+                    break
+                if not hand_on(out_queue, stage(job)):
+                    break
+        except BaseException as e:
+            errors.append(e)
+            abort.set()
+        finally:
+            put(out_queue, _DONE)
+
+    def relay(stage, in_queue, out_queue):
+        try:
+            while True:
+                job = get(in_queue)
+                if job is _DONE:
+                    break
+                if not hand_on(out_queue, stage(job)):
+                    break
+        except BaseException as e:
+            errors.append(e)
+            abort.set()
+        finally:
+            put(out_queue, _DONE)
+
+    threads = []
+    for i, stage in enumerate(stages):
+        if i == 0:
+            target, args = source, (stage, queues[0])
+        else:
+            target, args = relay, (stage, queues[i - 1], queues[i])
+        thread = threading.Thread(target=target, args=args, name=f"generation-stage-{i}", daemon=True)
+        threads.append(thread)
+        thread.start()
+    try:
+        while True:
+            job = get(queues[-1])
+            if job is _DONE:
+                break
+            final_stage(job)
+    except BaseException as e:
+        errors.append(e)
+        abort.set()
+    finally:
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
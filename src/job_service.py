@@ -0,0 +1,357 @@
+# job_service.py
+
+'''
+Local job queue service for generating several audiobooks without keeping a GUI open for each one.
+
+    python src/job_service.py [--host 127.0.0.1] [--port 8765] [--queue-file jobs/job_queue.json]
+
+Jobs name an audiobook folder and an action (generate, continue, regen or export, the same as the cli.py commands) and are run one at a time, in the order they were submitted, by a single scheduler thread.  The scheduler keeps one AudiobookModel for all jobs, so its engine pool keeps the engines loaded between jobs and the next book with the same voice doesn't load them again.
+
+The queue is saved to the queue file on every change.  When the service is stopped (Ctrl+C or SIGTERM) the running job is stopped after its current sentence and put back in the queue, and it's picked up again on the next start, a generate job that was interrupted is resumed like continue instead of starting over.
+
+The API is plain JSON over HTTP and only listens on localhost by default:
+    POST /jobs                    {"directory": "audiobooks/My Book", "action": "generate", "overwrite": false}
+                                  {"directory": "audiobooks/My Book", "action": "export", "format": "m4b", "pause": 0.5}
+    GET  /jobs                    all jobs
+    GET  /jobs/<id>               one job, with its status, progress (percent) and the number of sentences generated
+    POST /jobs/<id>/cancel        removes a queued job or stops the running one after its current sentence
+    GET  /status                  the running job, the number of queued jobs and the engine pool's stats
+
+e.g. curl -X POST localhost:8765/jobs -d '{"directory": "audiobooks/My Book", "action": "continue"}'
+'''
+
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from argparse import Namespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cli
+import tts_engines
+from model import AudiobookModel
+
+QUEUED = 'queued'
+RUNNING = 'running'
+FINISHED = 'finished'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+JOB_ACTIONS = ['generate', 'continue', 'regen', 'export']
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_FILE = os.path.join('jobs', "job_queue.json")
+
+class JobQueue:
+    '''
+    The jobs of the service, in submission order, saved to queue_file on every change.  All access goes through the lock, the HTTP handlers and the scheduler run on different threads.
+    '''
+    def __init__(self, queue_file):
+        self.queue_file = queue_file
+        self.jobs = {}
+        self.next_id = 1
+        self.condition = threading.Condition()
+        self.load()
+    def cancel(self, job_id):
+        '''
+        Cancels a queued job right away, a running one is only flagged and stopped by the scheduler.  Returns the job, or None if it doesn't exist.
+        '''
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job['status'] == QUEUED:
+                job['status'] = CANCELLED
+                job['finished'] = time.time()
+                self.save()
+            elif job['status'] == RUNNING:
+                job['cancel_requested'] = True
+                self.save()
+            return dict(job)
+    def get(self, job_id):
+        with self.condition:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+    def list(self):
+        with self.condition:
+            return [dict(job) for job in self.jobs.values()]
+    def load(self):
+        if not os.path.exists(self.queue_file):
+            return
+        with open(self.queue_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for job in data.get('jobs', []):
+            if job['status'] == RUNNING:
+                # The service was stopped during this job, it's run again from where it got to
+                job['status'] = QUEUED
+                job['resumed'] = True
+            self.jobs[job['id']] = job
+        self.next_id = max(data.get('next_id', 1), max(self.jobs, default=0) + 1)
+    def next_job(self, should_stop):
+        '''
+        Blocks until a job is queued, marks it running and returns it.  Returns None once should_stop() is true.
+        '''
+        with self.condition:
+            while not should_stop():
+                job = next((job for job in self.jobs.values() if job['status'] == QUEUED), None)
+                if job is not None:
+                    job.update(status=RUNNING, started=time.time(), progress=0, cancel_requested=False)
+                    self.save()
+                    return dict(job)
+                self.condition.wait(timeout=1.0)
+            return None
+    def running_job(self):
+        with self.condition:
+            return next((dict(job) for job in self.jobs.values() if job['status'] == RUNNING), None)
+    def queued_count(self):
+        with self.condition:
+            return sum(1 for job in self.jobs.values() if job['status'] == QUEUED)
+    def save(self):
+        # Written next to the queue file and swapped in, a crash while saving leaves the previous queue
+        queue_dir = os.path.dirname(self.queue_file)
+        if queue_dir and not os.path.exists(queue_dir):
+            os.makedirs(queue_dir)
+        temp_path = self.queue_file + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'next_id': self.next_id, 'jobs': list(self.jobs.values())}, f, ensure_ascii=False, indent=4)
+        os.replace(temp_path, self.queue_file)
+    def submit(self, directory_path, action, options):
+        with self.condition:
+            job = {
+                'id': self.next_id,
+                'directory': directory_path,
+                'action': action,
+                'options': options,
+                'status': QUEUED,
+                'progress': 0,
+                'sentences_generated': 0,
+                'output': None,
+                'error': None,
+                'resumed': False,
+                'cancel_requested': False,
+                'created': time.time(),
+                'started': None,
+                'finished': None
+            }
+            self.jobs[job['id']] = job
+            self.next_id += 1
+            self.save()
+            self.condition.notify_all()
+            return dict(job)
+    def update(self, job_id, **fields):
+        with self.condition:
+            self.jobs[job_id].update(fields)
+            self.save()
+    def wake(self):
+        with self.condition:
+            self.condition.notify_all()
+
+class JobEvents:
+    '''
+    Progress callbacks of a running job, in place of cli.EventWriter.  The queue is only saved when the percentage changed.
+    '''
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.job_id = job_id
+        self.last_percent = None
+        self.sentences_generated = 0
+    def progress(self, percent):
+        if percent != self.last_percent:
+            self.last_percent = percent
+            self.queue.update(self.job_id, progress=percent, sentences_generated=self.sentences_generated)
+    def sentence(self, idx, sentence):
+        self.sentences_generated += 1
+
+class JobScheduler(threading.Thread):
+    '''
+    Runs the queued jobs one after another with the same model, so the engines it loaded stay in its engine pool for the next job.
+    '''
+    def __init__(self, queue, model):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.model = model
+        self.current_job_id = None
+        self._stop_requested = False
+    def run(self):
+        while True:
+            job = self.queue.next_job(self.should_stop)
+            if job is None:
+                return
+            self.current_job_id = job['id']
+            try:
+                self.run_job(job)
+            finally:
+                self.current_job_id = None
+    def run_job(self, job):
+        job_id = job['id']
+        events = JobEvents(self.queue, job_id)
+        def should_stop():
+            return self._stop_requested or self.queue.get(job_id)['cancel_requested']
+        print(f"Job {job_id}: {job['action']} {job['directory']}")
+        try:
+            result = cli.run_command(self.model, job_arguments(job), events, should_stop)
+        except Exception as e:
+            traceback.print_exc()
+            self.queue.update(job_id, status=FAILED, error=str(e), finished=time.time(), sentences_generated=events.sentences_generated)
+            return
+        if result is None and not self.queue.get(job_id)['cancel_requested']:
+            # Stopped because the service is shutting down, the job runs again on the next start
+            self.queue.update(job_id, status=QUEUED, resumed=True, sentences_generated=events.sentences_generated)
+            return
+        if result is None:
+            self.queue.update(job_id, status=CANCELLED, finished=time.time(), sentences_generated=events.sentences_generated)
+            return
+        self.queue.update(job_id, status=FINISHED, progress=100, output=result.get('output'), finished=time.time(), sentences_generated=events.sentences_generated)
+    def should_stop(self):
+        return self._stop_requested
+    def stop(self):
+        self._stop_requested = True
+        self.queue.wake()
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    # Set on the server by serve()
+    @property
+    def queue(self):
+        return self.server.job_queue
+    def do_GET(self):
+        parts = self.path_parts()
+        if parts == ['jobs']:
+            self.send_json(200, {'jobs': self.queue.list()})
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = self.queue.get(parse_job_id(parts[1]))
+            if job is None:
+                self.send_json(404, {'error': f"No job {parts[1]}"})
+            else:
+                self.send_json(200, job)
+        elif parts == ['status']:
+            engine_pool = self.server.job_scheduler.model.engine_pool
+            self.send_json(200, {
+                'running': self.queue.running_job(),
+                'queued': self.queue.queued_count(),
+                'engine_pool': engine_pool.stats() if engine_pool is not None else None
+            })
+        else:
+            self.send_json(404, {'error': f"Unknown path {self.path}"})
+    def do_POST(self):
+        parts = self.path_parts()
+        if parts == ['jobs']:
+            try:
+                request = self.read_json()
+                directory_path, action, options = validate_job_request(request)
+            except ValueError as e:
+                self.send_json(400, {'error': str(e)})
+                return
+            self.send_json(201, self.queue.submit(directory_path, action, options))
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'cancel':
+            job = self.queue.cancel(parse_job_id(parts[1]))
+            if job is None:
+                self.send_json(404, {'error': f"No job {parts[1]}"})
+            elif job['status'] not in (QUEUED, RUNNING, CANCELLED):
+                self.send_json(409, {'error': f"Job {job['id']} already {job['status']}", 'job': job})
+            else:
+                self.send_json(200, job)
+        else:
+            self.send_json(404, {'error': f"Unknown path {self.path}"})
+    def log_message(self, format, *args):
+        # Requests are logged to stderr like the rest of the service output, without the default timestamp noise
+        print(f"{self.address_string()} {format % args}", file=sys.stderr)
+    def path_parts(self):
+        return [part for part in self.path.split('?', 1)[0].split('/') if part]
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+        if not isinstance(request, dict):
+            raise ValueError("Expected a JSON object")
+        return request
+    def send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def job_arguments(job):
+    # The same arguments cli.py parses for the action, an interrupted generate job continues instead of starting over
+    options = job['options']
+    action = job['action']
+    if action == 'generate' and job.get('resumed'):
+        action = 'continue'
+    return Namespace(
+        command=action,
+        directory=job['directory'],
+        overwrite=options.get('overwrite', False),
+        format=options.get('format', 'mp3'),
+        pause=options.get('pause', 0.0)
+    )
+
+def main(argv=None):
+    global_settings = cli.load_global_settings()
+    parser = argparse.ArgumentParser(prog="job_service.py", description="Local job queue for generating and exporting audiobooks.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Address to listen on, only localhost by default")
+    parser.add_argument("--port", type=int, default=int(global_settings.get('job_service_port', DEFAULT_PORT)))
+    parser.add_argument("--queue-file", default=global_settings.get('job_service_queue_file') or DEFAULT_QUEUE_FILE)
+    args = parser.parse_args(argv)
+    tts_engines.configure_espeak()
+    server = serve(args.host, args.port, JobQueue(args.queue_file), AudiobookModel(global_settings))
+    print(f"Job service listening on http://{server.server_address[0]}:{server.server_address[1]}, queue saved in {args.queue_file}")
+    signal.signal(signal.SIGTERM, raise_keyboard_interrupt)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping job service, the running job is stopped after its current step")
+    finally:
+        server.server_close()
+        server.job_scheduler.stop()
+        server.job_scheduler.join()
+    return 0
+
+def parse_job_id(value):
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+def raise_keyboard_interrupt(signal_number, frame):
+    raise KeyboardInterrupt
+
+def serve(host, port, queue, model):
+    '''
+    Starts the scheduler and returns the HTTP server, serve_forever() is left to the caller.
+    '''
+    server = ThreadingHTTPServer((host, port), JobRequestHandler)
+    server.daemon_threads = True
+    server.job_queue = queue
+    server.job_scheduler = JobScheduler(queue, model)
+    server.job_scheduler.start()
+    return server
+
+def validate_job_request(request):
+    directory_path = request.get('directory')
+    action = request.get('action')
+    if action not in JOB_ACTIONS:
+        raise ValueError(f"action must be one of {', '.join(JOB_ACTIONS)}")
+    if not isinstance(directory_path, str) or not os.path.exists(os.path.join(directory_path, "text_audio_map.json")):
+        raise ValueError(f"{directory_path} is not a valid Audiobook Directory.")
+    options = {}
+    if action == 'generate':
+        options['overwrite'] = bool(request.get('overwrite', False))
+    elif action == 'export':
+        export_format = request.get('format', 'mp3')
+        if export_format not in cli.EXPORT_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(cli.EXPORT_FORMATS)}")
+        try:
+            pause = float(request.get('pause', 0.0))
+        except (TypeError, ValueError):
+            raise ValueError("pause must be a number of seconds")
+        options.update(format=export_format, pause=pause)
+    return directory_path, action, options
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+# lossless_export.py
+
+'''
+Native WAV and FLAC export, used instead of ffmpeg when the audiobook is exported to a lossless format.
+
+The header of every sentence file is read first and all of them have to share the sample rate, channel count and sample width, a mismatch is reported before anything is written instead of ending up as a corrupt file.  PCM frames are then copied block by block into the output and the pauses between sentences are written as silent frames, so memory use stays the same no matter how long the book is and there is no silence.wav, file list or ffprobe call.
+
+WAV output is written with its final sizes up front and switches to RF64 when the book doesn't fit in the 4 GB a plain RIFF file can hold.  FLAC is encoded with soundfile.
+'''
+
+import os
+import struct
+import wave
+from collections import namedtuple
+
+LOSSLESS_FORMATS = ('wav', 'flac')
+BLOCK_FRAMES = 1 << 16
+MAX_RIFF_SIZE = 0xFFFFFFFF
+# soundfile subtypes for FLAC by sample width in bytes, FLAC has no 32 bit integer samples
+FLAC_SUBTYPES = {1: 'PCM_S8', 2: 'PCM_16', 3: 'PCM_24'}
+
+class ExportProgress:
+    def __init__(self, total_frames, progress_callback):
+        self.total_frames = max(total_frames, 1)
+        self.progress_callback = progress_callback
+        self.written_frames = 0
+        self.reported = -1
+    def advance(self, frames):
+        self.written_frames += frames
+        if self.progress_callback is None:
+            return
+        percent = min(int(self.written_frames * 99 / self.total_frames), 99)
+        if percent != self.reported:
+            self.reported = percent
+            self.progress_callback(percent)
+
+SegmentFormat = namedtuple("SegmentFormat", ["sample_rate", "channels", "sample_width"])
+
+def describe_format(segment_format):
+    channels = {1: "mono", 2: "stereo"}.get(segment_format.channels, f"{segment_format.channels} channels")
+    return f"{segment_format.sample_rate} Hz {channels} {segment_format.sample_width * 8} bit"
+
+def read_segment_formats(audio_paths):
+    '''
+    Returns the common SegmentFormat and the frame count of every file, raises ValueError when a file isn't PCM wav or doesn't match the first one.
+    '''
+    book_format = None
+    frame_counts = []
+    for audio_path in audio_paths:
+        try:
+            with wave.open(audio_path, 'rb') as wav_file:
+                segment_format = SegmentFormat(wav_file.getframerate(), wav_file.getnchannels(), wav_file.getsampwidth())
+                frame_counts.append(wav_file.getnframes())
+        except (wave.Error, EOFError) as e:
+            raise ValueError(f"{os.path.basename(audio_path)} is not a PCM wav file ({e}), export to mp3 instead or regenerate it.")
+        if book_format is None:
+            book_format = segment_format
+        elif segment_format != book_format:
+            raise ValueError(
+                f"{os.path.basename(audio_path)} is {describe_format(segment_format)} but the book so far is {describe_format(book_format)}.  "
+                "All sentences need the same format for a lossless export, regenerate it or export to mp3 instead."
+            )
+    return book_format, frame_counts
+
+def write_lossless_export(export_format, audio_paths, pause_duration, output_path, progress_callback=None, should_stop_callback=None):
+    '''
+    Returns True once output_path is written, False if it was stopped through should_stop_callback.
+    '''
+    if not audio_paths:
+        raise ValueError("No audio files found to export.")
+    book_format, frame_counts = read_segment_formats(audio_paths)
+    if export_format == 'flac' and book_format.sample_width not in FLAC_SUBTYPES:
+        raise ValueError(f"FLAC can't hold {book_format.sample_width * 8} bit audio, export to wav instead.")
+    pause_frames = int(round(pause_duration * book_format.sample_rate))
+    total_frames = sum(frame_counts) + pause_frames * (len(audio_paths) - 1)
+    temp_path = f"{output_path}.part"
+    progress = ExportProgress(total_frames, progress_callback)
+    try:
+        if export_format == 'wav':
+            finished = write_wav(temp_path, book_format, total_frames, audio_paths, pause_frames, progress, should_stop_callback)
+        elif export_format == 'flac':
+            finished = write_flac(temp_path, book_format, audio_paths, pause_frames, progress, should_stop_callback)
+        else:
+            raise ValueError(f"Unknown lossless export format: {export_format}")
+        if not finished:
+            return False
+        os.replace(temp_path, output_path)
+        if progress_callback is not None:
+            progress_callback(100)
+        return True
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def write_flac(output_path, book_format, audio_paths, pause_frames, progress, should_stop_callback):
+    import numpy as np
+    import soundfile as sf
+    # int32 keeps 24 bit samples intact, soundfile scales them to the file's subtype
+    dtype = 'int16' if book_format.sample_width <= 2 else 'int32'
+    silence = np.zeros((min(pause_frames, BLOCK_FRAMES), book_format.channels), dtype=dtype)
+    with sf.SoundFile(output_path, 'w', samplerate=book_format.sample_rate, channels=book_format.channels, format='FLAC', subtype=FLAC_SUBTYPES[book_format.sample_width]) as output:
+        for position, audio_path in enumerate(audio_paths):
+            if should_stop_callback is not None and should_stop_callback():
+                return False
+            if position > 0:
+                remaining = pause_frames
+                while remaining > 0:
+                    output.write(silence[:min(remaining, BLOCK_FRAMES)])
+                    remaining -= min(remaining, BLOCK_FRAMES)
+                progress.advance(pause_frames)
+            with sf.SoundFile(audio_path) as segment:
+                while True:
+                    block = segment.read(BLOCK_FRAMES, dtype=dtype, always_2d=True)
+                    if not len(block):
+                        break
+                    output.write(block)
+                    progress.advance(len(block))
+    return True
+
+def write_wav(output_path, book_format, total_frames, audio_paths, pause_frames, progress, should_stop_callback):
+    frame_size = book_format.channels * book_format.sample_width
+    # 8 bit wav is unsigned, its silence is 0x80
+    silence_byte = b'\x80' if book_format.sample_width == 1 else b'\x00'
+    silence_block = silence_byte * (min(pause_frames, BLOCK_FRAMES) * frame_size)
+    with open(output_path, 'wb') as output:
+        write_wav_header(output, book_format, total_frames)
+        for position, audio_path in enumerate(audio_paths):
+            if should_stop_callback is not None and should_stop_callback():
+                return False
+            if position > 0:
+                remaining = pause_frames
+                while remaining > 0:
+                    output.write(silence_block[:min(remaining, BLOCK_FRAMES) * frame_size])
+                    remaining -= min(remaining, BLOCK_FRAMES)
+                progress.advance(pause_frames)
+            with wave.open(audio_path, 'rb') as segment:
+                while True:
+                    block = segment.readframes(BLOCK_FRAMES)
+                    if not block:
+                        break
+                    output.write(block)
+                    progress.advance(len(block) // frame_size)
+        if (total_frames * frame_size) % 2:
+            # RIFF chunks are padded to an even size
+            output.write(b'\x00')
+    return True
+
+def write_wav_header(output, book_format, total_frames):
+    frame_size = book_format.channels * book_format.sample_width
+    data_size = total_frames * frame_size
+    fmt_chunk = struct.pack(
+        '<4sIHHIIHH', b'fmt ', 16, 1, book_format.channels, book_format.sample_rate,
+        book_format.sample_rate * frame_size, frame_size, book_format.sample_width * 8
+    )
+    padding = data_size % 2
+    riff_size = 4 + len(fmt_chunk) + 8 + data_size + padding
+    if riff_size <= MAX_RIFF_SIZE:
+        output.write(struct.pack('<4sI4s', b'RIFF', riff_size, b'WAVE'))
+        output.write(fmt_chunk)
+        output.write(struct.pack('<4sI', b'data', data_size))
+        return
+    # RF64 (EBU Tech 3306), the real sizes go into the ds64 chunk
+    ds64_chunk = struct.pack('<4sIQQQI', b'ds64', 28, riff_size + 36, data_size, total_frames, 0)
+    output.write(struct.pack('<4sI4s', b'RF64', MAX_RIFF_SIZE, b'WAVE'))
+    output.write(ds64_chunk)
+    output.write(fmt_chunk)
+    output.write(struct.pack('<4sI', b'data', MAX_RIFF_SIZE))
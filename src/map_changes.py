@@ -0,0 +1,50 @@
+# map_changes.py
+
+'''
+Change notifications and deferred saving for the loaded book's text_audio_map.
+
+Editing one sentence used to rewrite text_audio_map.json and book_text.txt and rebuild every row of the table.  Instead, the model reports each change as row ranges to its listeners:
+
+    listener(kind, first_row, last_row)
+
+TEXT, SPEAKER, REGEN and GENERATED mean the entries in the range were changed in place, so only those rows are repainted.  DELETED means the rows were removed and the rows after them moved up, ranges are reported last first so the rows of the ranges still to come keep their numbers.
+
+The keys of the changed entries are collected in a MapChangeSet until it's flushed, which appends them to the map journal in one write and rewrites book_text.txt only if a sentence's text changed.  The controller flushes a moment after the last edit and before anything reads the book from disk, so a burst of edits costs a single save.  Deleting sentences saves a full snapshot right away (see AudiobookModel.delete_sentences), which already holds every collected entry.
+'''
+
+TEXT = 'text'
+SPEAKER = 'speaker'
+REGEN = 'regen'
+GENERATED = 'generated'
+DELETED = 'deleted'
+
+class MapChangeSet:
+    def __init__(self):
+        self.keys = set()
+        self.text_changed = False
+    def __bool__(self):
+        return bool(self.keys) or self.text_changed
+    def add(self, kind, rows):
+        if kind == DELETED:
+            # Keys before the deletion point at other entries now, the snapshot saved with it covers them
+            self.keys.clear()
+            self.text_changed = True
+            return
+        self.keys.update(str(row) for row in rows)
+        if kind == TEXT:
+            self.text_changed = True
+    def clear(self):
+        self.keys.clear()
+        self.text_changed = False
+
+def row_ranges(rows):
+    '''
+    Returns the (first row, last row) ranges of consecutive rows, in ascending order.
+    '''
+    ranges = []
+    for row in sorted(set(rows)):
+        if ranges and ranges[-1][1] == row - 1:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+    return [tuple(row_range) for row_range in ranges]
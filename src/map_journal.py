@@ -0,0 +1,154 @@
+# map_journal.py
+
+'''
+Write-ahead journal for text_audio_map.json.
+
+During generation, rewriting the whole indented text_audio_map.json after every sentence makes the cost of a save grow with the size of the book.  Instead, each generated or changed sentence is appended as one JSON line to text_audio_map.journal:
+
+    {"k": "12", "v": {"sentence": ..., "audio_path": ..., "generated": true, "speaker_id": 1, "regen": false}}
+
+A record with "v": null removes the key.  Records always carry the full entry, so replaying the same record twice is harmless.  Loading the map replays the journal over the snapshot, and compacting writes a fresh snapshot (atomically, via os.replace) and empties the journal.  A torn last line from a crash mid-write is ignored and trimmed.
+
+Keys are row positions, which deleting sentences or updating the book changes, so a journal is only valid for the snapshot it was started on.  Its first line names that snapshot by a hash of the snapshot file:
+
+    {"snapshot": "5f0c..."}
+
+A crash after a new snapshot was swapped in but before the journal was emptied leaves a journal naming the previous snapshot.  Its records are already in the new snapshot and may point at other rows now, so they're skipped.  Journals from before the header was added are replayed as they are.
+
+The UI thread (saving edits) and the generation thread (saving generated sentences) share one journal, so every method holds the journal's lock.  compact serializes a copy of the map taken in one go, since the UI thread may still be editing entries while the snapshot is written.
+'''
+
+import hashlib
+import json
+import os
+import threading
+
+MAP_FILE_NAME = "text_audio_map.json"
+JOURNAL_FILE_NAME = "text_audio_map.journal"
+# Compact once the journal has grown as large as the snapshot (but never for tiny journals), this keeps the amortized compaction cost per record constant
+MIN_COMPACTION_BYTES = 64 * 1024
+
+class TextAudioMapJournal:
+    def __init__(self, directory_path):
+        self.directory_path = directory_path
+        self.map_path = os.path.join(directory_path, MAP_FILE_NAME)
+        self.journal_path = os.path.join(directory_path, JOURNAL_FILE_NAME)
+        self.journal_bytes = file_size(self.journal_path)
+        self.snapshot_bytes = file_size(self.map_path)
+        self._file = None
+        self._lock = threading.RLock()
+    def append(self, key, entry):
+        self.append_entries([(key, entry)])
+    def append_delete(self, key):
+        self.append(key, None)
+    def append_entries(self, items):
+        # Any number of (key, entry) records with a single fsync
+        data = "".join(json.dumps({"k": str(key), "v": entry}, ensure_ascii=False, separators=(',', ':')) + "\n" for key, entry in items).encode("utf-8")
+        if not data:
+            return
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.journal_path, 'ab')
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.journal_bytes += len(data)
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+    def compact(self, text_audio_map):
+        with self._lock:
+            # Copied under the lock, a record appended before it is in the snapshot and one appended after it goes to the new journal.
+            # list() and dict() copy in one go, so edits from another thread can't change a dict while it's iterated
+            snapshot = {key: dict(entry) for key, entry in list(text_audio_map.items())}
+            data = json.dumps(snapshot, ensure_ascii=False, indent=4).encode("utf-8")
+            self.close()
+            temp_path = self.map_path + ".tmp"
+            with open(temp_path, 'wb') as map_file:
+                map_file.write(data)
+                map_file.flush()
+                os.fsync(map_file.fileno())
+            os.replace(temp_path, self.map_path)
+            # The snapshot now holds every journaled change, so the journal is started over for it
+            self.start_journal(snapshot_id(data))
+            self.snapshot_bytes = len(data)
+    def load(self):
+        '''
+        Reads the snapshot and replays the journal over it.  Returns the map and the number of records replayed.
+        '''
+        with self._lock:
+            with open(self.map_path, 'rb') as map_file:
+                data = map_file.read()
+            text_audio_map = json.loads(data)
+            return text_audio_map, self.replay(text_audio_map, snapshot_id(data))
+    def needs_compaction(self):
+        return self.journal_bytes >= max(self.snapshot_bytes, MIN_COMPACTION_BYTES)
+    def replay(self, text_audio_map, current_snapshot=None):
+        '''
+        Applies the journal's records to text_audio_map, unless the journal was started on another snapshot than current_snapshot.  Returns the number of records applied.
+        '''
+        with self._lock:
+            if not os.path.exists(self.journal_path):
+                return 0
+            self.close()
+            applied = 0
+            good_offset = 0
+            stale = False
+            with open(self.journal_path, 'rb') as journal_file:
+                for line in journal_file:
+                    if not line.endswith(b"\n"):
+                        break  # torn write from a crash, everything before it is intact
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    good_offset += len(line)
+                    if "snapshot" in record:
+                        stale = current_snapshot is not None and record["snapshot"] != current_snapshot
+                        continue
+                    if stale:
+                        continue
+                    key, entry = record["k"], record["v"]
+                    if entry is None:
+                        text_audio_map.pop(key, None)
+                    else:
+                        text_audio_map[key] = entry
+                    applied += 1
+            if stale:
+                print(f"Skipping {self.journal_path}, it was written before the last snapshot was saved")
+                self.start_journal(current_snapshot)
+                return 0
+            if good_offset != file_size(self.journal_path):
+                print(f"Discarding incomplete records at the end of {self.journal_path}")
+                with open(self.journal_path, 'r+b') as journal_file:
+                    journal_file.truncate(good_offset)
+            self.journal_bytes = good_offset
+            return applied
+    def start_journal(self, snapshot):
+        # Replaces the journal with just the header naming the snapshot
+        with self._lock:
+            self.close()
+            data = (json.dumps({"snapshot": snapshot}) + "\n").encode("utf-8")
+            with open(self.journal_path, 'wb') as journal_file:
+                journal_file.write(data)
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+            self.journal_bytes = len(data)
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def read_text_audio_map(directory_path):
+    map_file_path = os.path.join(directory_path, MAP_FILE_NAME)
+    if not os.path.exists(map_file_path):
+        raise FileNotFoundError("The selected directory is not a valid Audiobook Directory.")
+    text_audio_map, _ = TextAudioMapJournal(directory_path).load()
+    return text_audio_map
+
+def snapshot_id(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
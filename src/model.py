@@ -4,18 +4,30 @@ import os
 import json
 import shutil
 from pydub import AudioSegment
-import pyttsx3
 import re
-import subprocess
 import tempfile
 import yaml
 
 import tts_engines
 import s2s_engines
+from map_journal import TextAudioMapJournal, read_text_audio_map
+from synthesis_cache import SynthesisCache, CACHE_FOLDER_NAME
+from generation_pipeline import run_pipeline
+from process_generation import iter_batches, run_process_pool
+from audio_buffer import AudioBuffer, discard_file, replace_file, staging_path, temp_audio_path
+from engine_pool import EnginePool
+from audiobook_export import run_segmented_export, EXPORT_CACHE_FOLDER_NAME
+from lossless_export import write_lossless_export, LOSSLESS_FORMATS
+from audio_index import AudioTimeline, read_audio_info, is_audio_info_current, AUDIO_INFO_KEY
+from chapters import find_chapters, DEFAULT_CHAPTER_PATTERN
+from text_segmenter import clean_sentences, iter_sentences, read_sentences
+from word_replacer import WordReplacer, load_replacements
+from search_index import SentenceSearchIndex
+from sentence_ids import AudioIdAllocator, assign_audio_ids, audio_file_name, AUDIO_ID_KEY
+from sentence_diff import update_plan, DELETE, INSERT, RETEXT
+from map_changes import MapChangeSet, row_ranges, TEXT, SPEAKER, REGEN, DELETED
 
 from collections import defaultdict
-from PySide6.QtGui import QColor
-from PySide6.QtCore import Qt
 from subprocess import Popen, PIPE, CalledProcessError
 
 VALID_AUDIO_EXTENSIONS = ['.wav', '.mp3', '.m4a', '.ogg', '.flac']
@@ -33,21 +45,31 @@ class AudiobookModel:
         }
         self.current_tts_engine_name = None
         self.current_speaker_id = None
-        self.current_voice_parameters = None
+        self.current_tts_engine_key = None
         self.tts_engine = None
         self.filepath = None
         self.current_s2s_engine_name = None
         self.current_s2s_speaker_id = None
-        self.current_s2s_parameters = None
+        self.current_s2s_engine_key = None
         self.s2s_engine = None
+        self.map_journal = None
+        self.synthesis_cache = None
+        self.engine_pool = None
+        self.search_index = None
+        self.map_listeners = []
+        self.pending_map_changes = MapChangeSet()
+    def add_map_listener(self, listener):
+        self.map_listeners.append(listener)
     def assign_speaker_to_sentence(self, idx, speaker_id):
         idx_str = str(idx)
         if idx_str in self.text_audio_map:
             self.text_audio_map[idx_str]['speaker_id'] = speaker_id
+            self.notify_map_change(SPEAKER, [int(idx_str)])
     def change_regen_state(self, idx, state):
         idx_str = str(idx)
         if idx_str in self.text_audio_map:
             self.text_audio_map[idx_str]["regen"] = state
+            self.notify_map_change(REGEN, [int(idx_str)])
     def clear_background_image(self):
         settings_dict = {"background_image": None}
         self.save_settings(settings_dict) 
@@ -56,8 +78,9 @@ class AudiobookModel:
         for idx, sentence in enumerate(sentences_list):
             generated = False
             audio_path = ""
-            new_text_audio_map[str(idx)] = self.default_text_audio_map_format(sentence=sentence, audio_path=audio_path, generated=generated)
+            new_text_audio_map[str(idx)] = self.default_text_audio_map_format(sentence=sentence, audio_path=audio_path, generated=generated, audio_id=idx)
         self.text_audio_map = new_text_audio_map
+        self.search_index = None
     def create_book_text_file(self, text_file_destination):
         file_name = "book_text.txt"
         full_path = os.path.join(text_file_destination, file_name)
@@ -65,34 +88,27 @@ class AudiobookModel:
             for idx in self.text_audio_map:
                 text = self.text_audio_map[idx]["sentence"]
                 f.write(text + "\n\n")
-    def delete_sentences(self, rows_list):
+    def delete_sentences(self, rows_list, directory_path):
+        rows = set(rows_list)
         sorted_items = sorted(self.text_audio_map.items(), key=lambda x: int(x[0]))
-        filtered_items = [(k, v) for k, v in sorted_items if int(k) not in rows_list]
-        adjusted_items = [(str(i), v) for i, (_, v) in enumerate(filtered_items, start=0)]
-        adjusted_dict = {k: v for k, v in adjusted_items}
-        self.text_audio_map = adjusted_dict
-        # Rename audio files on disk to match new indices
-        rename_map = {}
-        for idx_str, entry in self.text_audio_map.items():
-            old_path = entry.get('audio_path')
-            if old_path and os.path.exists(old_path):
-                dirpath = os.path.dirname(old_path)
-                temp_path = old_path + '.tmp'
-                os.rename(old_path, temp_path)
-                rename_map[temp_path] = os.path.join(dirpath, f'audio_{idx_str}.wav')
-        for temp_path, new_path in rename_map.items():
-            if os.path.exists(new_path):
-                os.remove(new_path)
-            os.rename(temp_path, new_path)
-            new_idx_str = os.path.splitext(os.path.basename(new_path))[0].split('_')[-1]
-            self.text_audio_map[new_idx_str]['audio_path'] = new_path
+        deleted_items = [v for k, v in sorted_items if int(k) in rows]
+        # Only the positions change, the remaining sentences keep their audio_id and audio file.  The dict is rekeyed in place, the table reads from it.
+        self.text_audio_map.clear()
+        self.text_audio_map.update((str(i), v) for i, v in enumerate(v for k, v in sorted_items if int(k) not in rows))
+        if self.search_index is not None:
+            self.search_index.delete(rows_list)
+        # The map is saved before any audio is removed, a crash in between leaves unused files behind but never a map pointing at missing audio
+        self.save_text_audio_map(directory_path)
+        self.remove_audio_files(directory_path, deleted_items)
+        self.notify_map_change(DELETED, rows)
     def default_text_audio_map_format(self, **kwargs):
         text_audio_map = {
             "sentence": kwargs.get("sentence"),
             "audio_path": kwargs.get("audio_path"),
             "generated": kwargs.get("generated"),
             "speaker_id": 1,
-            "regen" : False
+            "regen" : False,
+            AUDIO_ID_KEY: kwargs.get("audio_id")
         }
         return text_audio_map
     def execute_subprocess(self, cmd):
@@ -101,73 +117,105 @@ class AudiobookModel:
                 print(line, end='')
         if p.returncode != 0:
             raise CalledProcessError(p.returncode, p.args)
-    def export_audiobook(self, directory_path, pause_duration):
+    def export_audiobook(self, directory_path, pause_duration, report_progress_callback=None, should_stop_callback=None, export_format="mp3"):
         dir_name = os.path.basename(directory_path)
         idx = 0
         exported_dir = os.path.join(directory_path, "exported_audiobooks")
         if not os.path.exists(exported_dir):
             os.makedirs(exported_dir)
-        audio_map_path = os.path.join(directory_path, 'text_audio_map.json')
-        if not os.path.exists(audio_map_path):
-            raise FileNotFoundError("The selected directory is not a valid Audiobook Directory.")
-        with open(audio_map_path, 'r', encoding='utf-8') as file:
-            text_audio_map = json.load(file)
-        sorted_audio_paths = [text_audio_map[key]['audio_path'] for key in sorted(text_audio_map, key=lambda k: int(k))]
-        def probe_audio_properties(file_path):
-            cmd = [
-                'ffprobe',
-                '-v', 'error',
-                '-select_streams', 'a:0',
-                '-show_entries', 'stream=sample_rate,channels,bits_per_sample',
-                '-of', 'default=noprint_wrappers=1:nokey=1',
-                file_path
-            ]
-            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            if result.returncode != 0:
-                raise RuntimeError(f"ffprobe error: {result.stderr}")
-            lines = result.stdout.strip().split('\n')
-            if len(lines) != 3:
-                raise ValueError("ffprobe did not return sample_rate, channels, and bits_per_sample")
-            sample_rate, channels, bits_per_sample = lines
-            return int(sample_rate), int(channels), int(bits_per_sample)
-        silence_concat_command = ""
+        text_audio_map = read_text_audio_map(directory_path)
+        # The export reads every file anyway, so info for audio changed outside the app is checked here
+        self.refresh_audio_info(directory_path, verify=True, text_audio_map=text_audio_map)
+        sorted_keys = [key for key in sorted(text_audio_map, key=lambda k: int(k)) if text_audio_map[key]['audio_path']]
+        sorted_audio_paths = [text_audio_map[key]['audio_path'] for key in sorted_keys]
+        while True:
+            new_audiobook_name = f"{dir_name}_audiobook_{idx}.{export_format}"
+            new_audiobook_path = os.path.join(exported_dir, new_audiobook_name)
+            if not os.path.exists(new_audiobook_path):
+                break
+            idx += 1
+        if export_format in LOSSLESS_FORMATS:
+            # The sentence wavs are copied straight into the output, no ffmpeg, ffprobe or silence file involved
+            finished = write_lossless_export(
+                export_format,
+                [os.path.join(directory_path, os.path.basename(sap)) for sap in sorted_audio_paths],
+                pause_duration,
+                new_audiobook_path,
+                progress_callback=report_progress_callback,
+                should_stop_callback=should_stop_callback
+            )
+            if not finished:
+                print("Export cancelled")
+                return None
+            print(f"Combined audiobook saved in {new_audiobook_name}")
+            return new_audiobook_name
+        silence_file_name = None
+        # Anything besides the sentence files that changes the encoded audio, cached export chunks are keyed by it
+        export_settings = {"pause_duration": pause_duration}
         if pause_duration > 0:
             pause_length = pause_duration * 1000
             if not sorted_audio_paths:
                 raise ValueError("No audio files found to determine silence properties.")
-            first_audio_path = sorted_audio_paths[0]
-            sample_rate, channels, bits_per_sample = probe_audio_properties(first_audio_path)
+            first_audio_info = text_audio_map[sorted_keys[0]].get(AUDIO_INFO_KEY)
+            if first_audio_info is None:
+                raise ValueError(f"Could not read {os.path.basename(sorted_audio_paths[0])} as a wav file to determine silence properties.")
+            sample_rate = first_audio_info['sample_rate']
+            channels = first_audio_info['channels']
+            bits_per_sample = first_audio_info['sample_width'] * 8
             silence = AudioSegment.silent(duration=pause_length, frame_rate=sample_rate)
             silence = silence.set_channels(channels)
             silence = silence.set_sample_width(bits_per_sample // 8)
             silence_path = os.path.join(directory_path, "silence.wav")
             silence.export(silence_path, format="wav")
-            silence_concat_command = f"file '{os.path.basename(silence_path)}'\n"
-        first = True
-        file_list_path = os.path.join(directory_path, 'file_list.txt')
-        with open(file_list_path, 'w') as file:
-            for sap in sorted_audio_paths:
-                if first:
-                    first = False
-                else:
-                    file.write(silence_concat_command)
-                file.write(f"file {os.path.basename(sap)}\n")
-        while True:
-            new_audiobook_name = f"{dir_name}_audiobook_{idx}.mp3"
-            new_audiobook_path = os.path.join(exported_dir, new_audiobook_name)
-            if not os.path.exists(new_audiobook_path):
-                break
-            idx += 1
-        self.execute_subprocess([AudioSegment.silent(0).ffmpeg, '-f', 'concat', '-safe', '0', '-i', file_list_path, new_audiobook_path])
+            silence_file_name = os.path.basename(silence_path)
+            export_settings.update(sample_rate=sample_rate, channels=channels, bits_per_sample=bits_per_sample)
+        chapters = None
+        # The join lines the chunks up with the recorded durations, chapter times come from them too, the encoded audio is never decoded for them
+        segment_durations = [(text_audio_map[key].get(AUDIO_INFO_KEY) or {}).get('duration') for key in sorted_keys]
+        if export_format == 'm4b':
+            chapters = find_chapters(
+                [text_audio_map[key] for key in sorted(text_audio_map, key=lambda k: int(k))],
+                self.global_settings.get('chapter_pattern', DEFAULT_CHAPTER_PATTERN),
+                opening_title=dir_name
+            )
+            print(f"Export: {len(chapters)} chapters found")
+        # Chunks of the book are encoded by parallel ffmpeg processes and joined without re-encoding, unchanged chunks come from the export cache
+        workers = int(self.global_settings.get('export_workers', 0) or 0) or os.cpu_count() or 1
+        finished = run_segmented_export(
+            AudioSegment.silent(0).ffmpeg,
+            directory_path,
+            [os.path.basename(sap) for sap in sorted_audio_paths],
+            silence_file_name,
+            new_audiobook_path,
+            workers,
+            os.path.join(exported_dir, EXPORT_CACHE_FOLDER_NAME),
+            cache_settings=export_settings,
+            chunk_sentences=int(self.global_settings.get('export_chunk_sentences', 100) or 100),
+            progress_callback=report_progress_callback,
+            should_stop_callback=should_stop_callback,
+            output_format=export_format,
+            segment_durations=segment_durations,
+            chapters=chapters,
+            title=dir_name,
+            cache_max_bytes=int(self.global_settings.get('export_cache_max_mb', 2048)) * 1024 * 1024
+        )
+        if not finished:
+            print("Export cancelled")
+            return None
         print(f"Combined audiobook saved in {new_audiobook_name}")
         return new_audiobook_name
+    def fetch_cached_audio(self, job):
+        # On a hit the cached audio is copied straight to the sentence's output path
+        if self.synthesis_cache is None:
+            return False
+        job['cache_key'] = self.synthesis_cache.key_for(job['sentence'], job['voice_parameters'], job['use_s2s'])
+        if self.synthesis_cache.fetch(job['cache_key'], job['output_path']):
+            job['audio_path'] = job['output_path']
+            job['cached'] = True
+            return True
+        return False
     def filter_paragraph(self, paragraph):
-        sentences = []
-        for line in paragraph.split('\n'):
-            line = line.strip()
-            if line and any(c.isalpha() for c in line):
-                sentences.append(line)
-        return sentences
+        return list(iter_sentences(paragraph.split('\n')))
     # def filter_paragraph(self, paragraph):
     #     lines = paragraph.strip().split('\n')
     #     filtered_list = []
@@ -186,9 +234,27 @@ class AudiobookModel:
     #                 filtered_list.append(line)
     #         i += 1
     #     return filtered_list
+    def flush_map_changes(self, directory_path):
+        '''
+        Saves the entries changed since the last flush, see map_changes.  Returns whether anything was written.
+        '''
+        changes = self.pending_map_changes
+        if not changes:
+            return False
+        if changes.keys:
+            journal = self.get_map_journal(directory_path)
+            journal.append_entries((key, self.text_audio_map.get(key)) for key in sorted(changes.keys, key=int))
+            if journal.needs_compaction():
+                journal.compact(self.text_audio_map)
+        if changes.text_changed:
+            self.create_book_text_file(directory_path)
+        changes.clear()
+        return True
     def generate_audio_for_sentence_threaded(self, directory_path, is_continue, is_regen_only, report_progress_callback, sentence_generated_callback, should_stop_callback=None):
         self.load_generation_settings(directory_path)
         self.load_text_audio_map(directory_path)
+        # Books generated before audio info was recorded are measured once, off the UI thread
+        self.refresh_audio_info(directory_path)
         if is_regen_only:
             total_sentences = sum(1 for entry in self.text_audio_map.values() if entry['regen'])
             if total_sentences == 0:
@@ -205,59 +271,143 @@ class AudiobookModel:
         for idx, entry in self.text_audio_map.items():
             speaker_id = entry.get('speaker_id', 1)
             sentences_by_speaker[speaker_id].append((idx, entry))
-        for speaker_id, entries in sentences_by_speaker.items():
-            speaker = self.speakers.get(speaker_id, {})
-            speaker_settings = speaker.get('settings', {})
-            tts_engine_name = speaker_settings.get('tts_engine', 'pyttsx3')
-            self.load_selected_tts_engine(tts_engine_name, speaker_id, **speaker_settings)
-            use_s2s = speaker_settings.get('use_s2s', False)
-            if use_s2s:
-                s2s_engine_name = speaker_settings.get('s2s_engine', None)
-                if s2s_engine_name:
-                    s2s_parameters = speaker_settings.copy()
-                    s2s_validated = self.load_selected_s2s_engine(s2s_engine_name, speaker_id, **s2s_parameters)
-                else:
-                    s2s_validated = False
+        worker_count = int(self.global_settings.get('generation_workers', 1) or 1)
+        def finalize_stage(job):
+            nonlocal generated_count
+            idx = job['idx']
+            self.write_job_audio(job)
+            if job['audio_path']:
+                new_audio_path = job['output_path']
+                if not job['cached']:
+                    self.store_cached_audio(job)
+                self.text_audio_map[idx]['audio_path'] = new_audio_path
+                self.text_audio_map[idx]['generated'] = True
+                self.record_audio_info(idx)
+                generated_count += 1
+                self.journal_text_audio_map_entry(directory_path, idx)
+                sentence_generated_callback(int(idx), job['sentence'])
+            progress_percentage = int((generated_count / total_sentences) * 100)
+            report_progress_callback(progress_percentage)
+        try:
+            if worker_count > 1:
+                self.run_process_pool_generation(directory_path, sentences_by_speaker, is_continue, is_regen_only, should_stop_callback, finalize_stage, worker_count)
             else:
-                s2s_validated = False
-            for idx, entry in entries:
-                if should_stop_callback():
-                    print("Generation stopped by user")
-                    return
-                if is_continue and entry['generated']:
-                    continue
-                if is_regen_only:
-                    if entry['regen']:
-                        pass
-                    else:
-                        continue
-                sentence = entry['sentence']
-                audio_path = self.generate_audio_proxy(sentence, speaker_settings, s2s_validated)
-                if audio_path:
-                    new_audio_path = os.path.join(directory_path, f"audio_{idx}.wav")
-                    shutil.move(audio_path, new_audio_path)
-                    self.text_audio_map[idx]['audio_path'] = new_audio_path
-                    self.text_audio_map[idx]['generated'] = True
-                    generated_count += 1
-                    self.save_text_audio_map(directory_path)
-                    sentence_generated_callback(int(idx), sentence)
-                progress_percentage = int((generated_count / total_sentences) * 100)
-                report_progress_callback(progress_percentage)
-    def generate_audio_proxy(self, sentence, voice_parameters, s2s_validated):
-        tts_engine_name = voice_parameters.get('tts_engine', 'pyttsx3')
-        s2s_engine_name = voice_parameters.get('s2s_engine', None)
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
-            audio_path = tmp_file.name
-        success = tts_engines.generate_audio(self.tts_engine, sentence, voice_parameters, tts_engine_name, audio_path)
-        if not success:
+                jobs = self.iter_generation_jobs(directory_path, sentences_by_speaker, is_continue, is_regen_only, should_stop_callback)
+                # Engines that can queue work (pyttsx3) get batches of generation_batch_size sentences, the others one sentence at a time
+                batch_size = int(self.global_settings.get('generation_batch_size', 8) or 8)
+                batches = iter_batches(jobs, batch_size, lambda job: tts_engines.supports_batch(job['voice_parameters'].get('tts_engine', 'pyttsx3')))
+                # tts of the next sentence overlaps with s2s of the current one
+                run_pipeline(batches, [self.generate_tts_batch_stage, self.generate_s2s_stage], finalize_stage)
+        finally:
+            # Fold the journal back into the snapshot, also when stopped or on error
+            self.save_text_audio_map(directory_path)
+            if self.synthesis_cache is not None:
+                print(f"Synthesis cache: {self.synthesis_cache.stats()}")
+            if self.engine_pool is not None:
+                print(f"Engine pool: {self.engine_pool.stats()}")
+    def generate_audio_proxy(self, sentence, voice_parameters, s2s_validated, output_path=None):
+        created_output = output_path is None
+        if created_output:
+            output_path = temp_audio_path()
+        s2s_engine = self.s2s_engine if s2s_validated else None
+        job = self.generation_job(None, sentence, voice_parameters, self.tts_engine, s2s_engine, output_path=output_path)
+        job = self.generate_s2s_stage(self.generate_tts_stage(job))
+        self.write_job_audio(job)
+        if not job['audio_path']:
+            if created_output:
+                discard_file(output_path)
             return None
-        if s2s_validated:
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_s2s_file:
-                s2s_audio_path = tmp_s2s_file.name
-            s2s_engines.process_audio(self.s2s_engine, s2s_engine_name=s2s_engine_name, input_audio_path=audio_path, output_audio_path=s2s_audio_path, parameters=voice_parameters)
-            return s2s_audio_path
-        else:
-            return audio_path
+        if not job['cached']:
+            self.store_cached_audio(job)
+        return job['audio_path']
+    def generate_s2s_stage(self, job):
+        if job['cached'] or job['s2s_engine'] is None:
+            return job
+        source = job['audio'] if job['audio'] is not None else job['audio_path']
+        if source is None:
+            return job
+        s2s_engine_name = job['voice_parameters'].get('s2s_engine', None)
+        s2s_path = staging_path(job['output_path'])
+        try:
+            s2s_engines.process_audio(job['s2s_engine'], s2s_engine_name=s2s_engine_name, input_audio_path=source, output_audio_path=s2s_path, parameters=job['voice_parameters'])
+        except Exception:
+            discard_file(s2s_path)
+            raise
+        finally:
+            # The tts output was only needed as s2s input
+            discard_file(job['audio_path'])
+        job['audio'] = None
+        job['audio_path'] = s2s_path
+        return job
+    def generate_tts_batch_stage(self, batch):
+        # Consecutive sentences of one speaker, see iter_batches, cache misses are generated with one call to the engine
+        if len(batch) == 1:
+            return [self.generate_tts_stage(batch[0])]
+        pending = [job for job in batch if not self.fetch_cached_audio(job)]
+        if not pending:
+            return batch
+        voice_parameters = pending[0]['voice_parameters']
+        target_paths = [self.tts_target_path(job) for job in pending]
+        try:
+            results = tts_engines.generate_audio_batch(pending[0]['tts_engine'], [(job['sentence'], target_path) for job, target_path in zip(pending, target_paths)], voice_parameters, voice_parameters.get('tts_engine', 'pyttsx3'))
+        except Exception:
+            for target_path in target_paths:
+                discard_file(target_path)
+            raise
+        for job, target_path, result in zip(pending, target_paths, results):
+            self.take_tts_result(job, result, target_path)
+        return batch
+    def generate_tts_stage(self, job):
+        voice_parameters = job['voice_parameters']
+        tts_engine_name = voice_parameters.get('tts_engine', 'pyttsx3')
+        if self.fetch_cached_audio(job):
+            return job
+        target_path = self.tts_target_path(job)
+        try:
+            result = tts_engines.generate_audio(job['tts_engine'], job['sentence'], voice_parameters, tts_engine_name, target_path)
+        except Exception:
+            discard_file(target_path)
+            raise
+        self.take_tts_result(job, result, target_path)
+        return job
+    def generation_job(self, idx, sentence, voice_parameters, tts_engine, s2s_engine, speaker_id=None, use_s2s=None, output_path=None):
+        # Engines are captured per job, a later speaker may swap self.tts_engine/self.s2s_engine while this job is still in flight
+        if use_s2s is None:
+            use_s2s = s2s_engine is not None
+        return {
+            "idx": idx,
+            "sentence": sentence,
+            "speaker_id": speaker_id,
+            "voice_parameters": voice_parameters,
+            "tts_engine": tts_engine,
+            "s2s_engine": s2s_engine,
+            "use_s2s": use_s2s,
+            "output_path": output_path,
+            "cache_key": None,
+            "cached": False,
+            "audio": None,
+            "audio_path": None
+        }
+    def get_audio_timeline(self, directory_path=None, pause_duration=0.0):
+        # With a directory, sentences generated before audio info was recorded are read once first
+        if directory_path is not None:
+            self.refresh_audio_info(directory_path)
+        return AudioTimeline(self.text_audio_map, pause_duration)
+    def get_engine_pool(self):
+        if self.engine_pool is None:
+            self.engine_pool = EnginePool(
+                int(self.global_settings.get('engine_pool_max_mb', 8192)) * 1024 * 1024,
+                int(self.global_settings.get('engine_pool_max_vram_mb', 6144)) * 1024 * 1024,
+                tts_config=self.load_config(os.path.join('configs', 'tts_config.json')),
+                s2s_config=self.load_config(os.path.join('configs', 's2s_config.json'))
+            )
+        return self.engine_pool
+    def get_map_journal(self, directory_path):
+        if self.map_journal is None or self.map_journal.directory_path != directory_path:
+            if self.map_journal is not None:
+                self.map_journal.close()
+            self.map_journal = TextAudioMapJournal(directory_path)
+        return self.map_journal
     def get_map_keys_and_values(self, idx_str):
         item = self.text_audio_map[idx_str]
         row_position = int(idx_str)
@@ -269,9 +419,28 @@ class AudiobookModel:
     def get_s2s_engines(self):
         s2s_config = self.load_config(os.path.join('configs', 's2s_config.json'))
         return [engine['name'] for engine in s2s_config.get('s2s_engines', [])]
+    def get_search_index(self):
+        # Built on first use after the book was loaded or replaced, single edits and deletions update it in place
+        if self.search_index is None or len(self.search_index) != len(self.text_audio_map):
+            self.search_index = SentenceSearchIndex(self.text_audio_map[key]['sentence'] for key in sorted(self.text_audio_map, key=lambda k: int(k)))
+        return self.search_index
     def get_speaker_name(self, speaker_id):
         speaker_name = self.speakers[speaker_id]['name']
         return speaker_name
+    def get_synthesis_cache(self, directory_path):
+        if not self.global_settings.get('synthesis_cache', True):
+            return None
+        cache_dir = self.global_settings.get('synthesis_cache_dir') or os.path.join(directory_path, CACHE_FOLDER_NAME)
+        if self.synthesis_cache is None or self.synthesis_cache.cache_dir != cache_dir:
+            max_bytes = int(self.global_settings.get('synthesis_cache_max_mb', 2048)) * 1024 * 1024
+            self.synthesis_cache = SynthesisCache(
+                cache_dir,
+                max_bytes,
+                cache_random_seeds=self.global_settings.get('synthesis_cache_random_seeds', False),
+                tts_config=self.load_config(os.path.join('configs', 'tts_config.json')),
+                s2s_config=self.load_config(os.path.join('configs', 's2s_config.json'))
+            )
+        return self.synthesis_cache
     def get_tts_engines(self):
         tts_config = self.load_config(os.path.join('configs', 'tts_config.json'))
         return [engine['name'] for engine in tts_config.get('tts_engines', [])]
@@ -285,6 +454,41 @@ class AudiobookModel:
             voice_model_files = [file for file in os.listdir(self.voice_folder_path) if file.endswith(".pth")]
             return voice_model_files
         return []
+    def has_pending_map_changes(self):
+        return bool(self.pending_map_changes)
+    def iter_generation_jobs(self, directory_path, sentences_by_speaker, is_continue, is_regen_only, should_stop_callback, load_engines=True):
+        for speaker_id, entries in sentences_by_speaker.items():
+            speaker = self.speakers.get(speaker_id, {})
+            speaker_settings = speaker.get('settings', {})
+            engines_loaded = False
+            for idx, entry in entries:
+                if should_stop_callback():
+                    print("Generation stopped by user")
+                    return
+                if is_continue and entry['generated']:
+                    continue
+                if is_regen_only:
+                    if entry['regen']:
+                        pass
+                    else:
+                        continue
+                output_path = os.path.join(directory_path, audio_file_name(entry[AUDIO_ID_KEY]))
+                if not load_engines:
+                    # The engines are loaded elsewhere, e.g. in generation worker processes
+                    use_s2s = bool(speaker_settings.get('use_s2s', False) and speaker_settings.get('s2s_engine', None))
+                    yield self.generation_job(idx, entry['sentence'], speaker_settings, None, None, speaker_id, use_s2s, output_path)
+                    continue
+                if not engines_loaded:
+                    # Only load a speaker's engines once one of their sentences actually needs generating
+                    s2s_validated = self.load_speaker_engines(speaker_id, speaker_settings)
+                    s2s_engine = self.s2s_engine if s2s_validated else None
+                    engines_loaded = True
+                yield self.generation_job(idx, entry['sentence'], speaker_settings, self.tts_engine, s2s_engine, speaker_id, output_path=output_path)
+    def journal_text_audio_map_entry(self, directory_path, idx_str):
+        journal = self.get_map_journal(directory_path)
+        journal.append(idx_str, self.text_audio_map.get(idx_str))
+        if journal.needs_compaction():
+            journal.compact(self.text_audio_map)
     def load_config(self, config_path):
         if not os.path.exists(config_path):
             return {}
@@ -295,11 +499,8 @@ class AudiobookModel:
         if os.path.exists(generation_settings_path):
             settings = self.load_json(generation_settings_path)
             self.speakers = settings.get('speakers', {})
+            # Colors stay hex strings, the view converts them where it needs a QColor
             self.speakers = {int(k): v for k, v in self.speakers.items()}
-            for speaker in self.speakers.values():
-                color = speaker.get('color', '#FFFFFF')
-                if isinstance(color, str):
-                    speaker['color'] = QColor(color)
             return settings
         else:
             return {}
@@ -307,82 +508,98 @@ class AudiobookModel:
         with open(file_path, 'r', encoding='utf-8') as file:
             return json.load(file)
     def load_selected_s2s_engine(self, chosen_s2s_engine, speaker_id, **kwargs):
-        if (self.current_s2s_engine_name == chosen_s2s_engine and
-            self.current_s2s_speaker_id == speaker_id and
-            self.current_s2s_parameters == kwargs):
+        # Only load-time parameters matter here, inference-time ones are read from the speaker settings on every sentence
+        engine_key = self.get_engine_pool().key_for("s2s", chosen_s2s_engine, kwargs)
+        if self.current_s2s_engine_key == engine_key and self.s2s_engine is not None:
+            self.current_s2s_speaker_id = speaker_id
             return True
         else:
             try:
-                self.s2s_engine = s2s_engines.load_s2s_engine(chosen_s2s_engine, **kwargs)
+                # Drop the reference first so the pool can actually free it if it needs the room
+                self.s2s_engine = None
+                self.current_s2s_engine_key = None
+                self.s2s_engine = self.get_engine_pool().acquire("s2s", chosen_s2s_engine, kwargs, s2s_engines.load_s2s_engine)
                 if self.s2s_engine == None:
                     return False
                 self.current_s2s_engine_name = chosen_s2s_engine
                 self.current_s2s_speaker_id = speaker_id
-                self.current_s2s_parameters = kwargs
+                self.current_s2s_engine_key = engine_key
                 return True
             except Exception as e:
                 print(f"Failed to load s2s engine '{chosen_s2s_engine}': {e}")
                 return False
     def load_selected_tts_engine(self, chosen_tts_engine, speaker_id, **kwargs):
-        if (self.current_tts_engine_name == chosen_tts_engine and
-            self.current_speaker_id == speaker_id and
-            self.current_voice_parameters == kwargs):
+        engine_key = self.get_engine_pool().key_for("tts", chosen_tts_engine, kwargs)
+        if self.current_tts_engine_key == engine_key:
+            self.current_speaker_id = speaker_id
             return self.tts_engine
         else:
-            self.tts_engine = tts_engines.load_tts_engine(chosen_tts_engine, **kwargs)
+            self.tts_engine = None
+            self.current_tts_engine_key = None
+            self.tts_engine = self.get_engine_pool().acquire("tts", chosen_tts_engine, kwargs, tts_engines.load_tts_engine)
             self.current_tts_engine_name = chosen_tts_engine
             self.current_speaker_id = speaker_id
-            self.current_voice_parameters = kwargs
+            self.current_tts_engine_key = engine_key
             return self.tts_engine
     def load_sentences(self, file_path):
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-            paragraphs = content.split('\n\n')
-            filtered_sentences = []
-            for paragraph in paragraphs:
-                filtered_list = self.filter_paragraph(paragraph)
-                filtered_sentences.extend(filtered_list)
-        return filtered_sentences
+        # The file is streamed line by line, sentences are only split within lines when sentence_splitting is on
+        return list(read_sentences(
+            file_path,
+            split_sentences=bool(self.global_settings.get('sentence_splitting', False)),
+            quote_aware=bool(self.global_settings.get('sentence_splitting_quote_aware', False))
+        ))
     def load_settings(self):
         if os.path.exists('settings.json'):
             with open('settings.json', 'r') as json_file:
                 self.settings = json.load(json_file)
                 return self.settings
         return {}
+    def load_speaker_engines(self, speaker_id, speaker_settings):
+        tts_engine_name = speaker_settings.get('tts_engine', 'pyttsx3')
+        self.load_selected_tts_engine(tts_engine_name, speaker_id, **speaker_settings)
+        use_s2s = speaker_settings.get('use_s2s', False)
+        if use_s2s:
+            s2s_engine_name = speaker_settings.get('s2s_engine', None)
+            if s2s_engine_name:
+                s2s_parameters = speaker_settings.copy()
+                return self.load_selected_s2s_engine(s2s_engine_name, speaker_id, **s2s_parameters)
+        return False
     def load_text_audio_map(self, directory_path):
         map_file_path = os.path.join(directory_path, "text_audio_map.json")
         if not os.path.exists(map_file_path):
             raise FileNotFoundError("The selected directory is not a valid Audiobook Directory.")
-        with open(map_file_path, 'r', encoding="utf-8") as map_file:
-            self.text_audio_map = json.load(map_file)
+        self.search_index = None
+        # Recover sentences journaled after the last snapshot, e.g. from a crashed generation run
+        journal = self.get_map_journal(directory_path)
+        text_audio_map, replayed = journal.load()
+        # Updated in place, the sentence table keeps reading from this dict (e.g. while generation reloads the map)
+        self.text_audio_map.clear()
+        self.text_audio_map.update(text_audio_map)
+        migrated = assign_audio_ids(self.text_audio_map)
+        if migrated:
+            print(f"Assigned audio ids to {migrated} sentences")
+        if replayed or migrated:
+            journal.compact(self.text_audio_map)
+        self.synthesis_cache = self.get_synthesis_cache(directory_path)
         return self.text_audio_map
         
+    def notify_map_change(self, kind, rows, persist=True):
+        '''
+        Reports changed rows to the map listeners, see map_changes.  With persist set, they're saved on the next flush_map_changes.
+        '''
+        if persist:
+            self.pending_map_changes.add(kind, rows)
+        ranges = row_ranges(rows)
+        if kind == DELETED:
+            ranges.reverse()
+        for first_row, last_row in ranges:
+            for listener in self.map_listeners:
+                listener(kind, first_row, last_row)
     def paragraph_to_sentence(self,paragraph) -> list:
         #This removes annoying pauses, and things like "greater than..." because a book
         #formatted computer text with '>' for example.
-        paragraph = re.sub('\n|-', ' ', re.sub('\[|\]|\*|\\|\<|\>|_|\"|\“|\”', '', paragraph))
-        paragraph = re.sub('…', '-', paragraph)
-        
-        # Substitutions for some abbreviations, can just be in rplwords, but these are common
-        paragraph = paragraph.replace('Mr.','Mister')
-        paragraph = paragraph.replace('Mrs.','Misses')
-        paragraph = paragraph.replace('Ms.','Miz')
-        paragraph = paragraph.replace('Dr.','Doctor')
-        #add space before period, to improve end of sentence audio for tortoise for example.
-        #removed space after period
-        #paragraph = paragraph.replace(r'. ', ' .*%')
-        paragraph = paragraph.replace(r'.', ' .*%')
-        
-        #This removes excess spaces.  
-        #These occur with indented paragraphs without periods.
-        #Included poems for example.
-        paragraph = paragraph.replace(r'     ', ' ')
-        paragraph = paragraph.replace(r'    ', ' ')
-        paragraph = paragraph.replace(r'   ', ' ')
-        paragraph = paragraph.replace(r'  ', ' ')
-
-        sentence_list = [s.strip() for s in paragraph.split('*%') if (s.strip()!='.' and s.strip()!='')]
-        return sentence_list
+        #Mr./Mrs./Ms./Dr. are spelled out and a space is added before each period, see text_segmenter.clean_sentences
+        return clean_sentences(paragraph)
     def process_upload_items(self, mode, save_items):
         for item in save_items:
             if item.get('name', None):
@@ -421,6 +638,41 @@ class AudiobookModel:
                     raise Exception(f"The file '{target_path}' already exists, please delete it before uploading a new voice.")
                 with open(target_path, 'w') as f:
                     f.write(source_text)
+    def record_audio_info(self, idx_str, audio_path=None, text_audio_map=None):
+        entry = (self.text_audio_map if text_audio_map is None else text_audio_map)[str(idx_str)]
+        info = read_audio_info(audio_path or entry['audio_path'])
+        if info is None:
+            entry.pop(AUDIO_INFO_KEY, None)
+        else:
+            entry[AUDIO_INFO_KEY] = info
+        return info
+    def refresh_audio_info(self, directory_path, verify=False, text_audio_map=None):
+        # Only the loaded book's map is journaled, a map read just for an export is thrown away afterwards
+        persist = text_audio_map is None or text_audio_map is self.text_audio_map
+        if text_audio_map is None:
+            text_audio_map = self.text_audio_map
+        updated = 0
+        for idx_str, entry in text_audio_map.items():
+            if not entry.get('audio_path'):
+                continue
+            audio_path = os.path.join(directory_path, os.path.basename(entry['audio_path']))
+            info = entry.get(AUDIO_INFO_KEY)
+            if info is not None and (not verify or is_audio_info_current(info, audio_path)):
+                continue
+            self.record_audio_info(idx_str, audio_path, text_audio_map)
+            if persist:
+                self.journal_text_audio_map_entry(directory_path, idx_str)
+            updated += 1
+        if updated:
+            print(f"Audio info: read {updated} audio files")
+        return updated
+    def remove_audio_files(self, directory_path, entries):
+        # Files still used by another sentence are kept
+        in_use = {os.path.basename(entry['audio_path']) for entry in self.text_audio_map.values() if entry.get('audio_path')}
+        for entry in entries:
+            audio_file = os.path.basename(entry.get('audio_path') or '')
+            if audio_file and audio_file not in in_use:
+                discard_file(os.path.join(directory_path, audio_file))
     def replace_default_with_none(self, data):
         if isinstance(data, dict):
             for key, value in data.items():
@@ -437,9 +689,10 @@ class AudiobookModel:
                     self.replace_default_with_none(value)
                     
     def replace_words_from_list(self, replacement_file_path, extra):
-        with open(replacement_file_path, 'r', encoding='utf-8') as f:
-            replacements = json.load(f)
-
+        # The whole list is compiled into one pattern, see word_replacer
+        replacer = WordReplacer(load_replacements(replacement_file_path))
+        changed_sentences = 0
+        changed_rows = []
         for key, value in self.text_audio_map.items():
             sentence = value['sentence']
 
@@ -452,21 +705,24 @@ class AudiobookModel:
                 sentence_list = self.paragraph_to_sentence(sentence)
                 sentence = ' '.join(sentence_list)
 
-            for _, replacement_data in replacements.items():
-                orig_word = replacement_data['orig_word']
-                replacement_word = replacement_data['replacement_word']
-            
-                pattern = r"\b{}\b".format(re.escape(orig_word))
-                #So sentences with replaced words are regenerated
-                if orig_word in sentence:
-                    value['regen'] = True  #I like this, but it is required
-                    value['generated'] = False
-                sentence = re.sub(pattern, replacement_word, sentence)
-
-            value['sentence'] = sentence
+            new_sentence, _ = replacer.replace(sentence)
+            #So sentences with replaced words are regenerated, only when a rule changed the text, the cleanup above alone doesn't change how it sounds
+            if new_sentence != sentence:
+                value['regen'] = True  #I like this, but it is required
+                value['generated'] = False
+                changed_sentences += 1
+            if new_sentence != value['sentence']:
+                changed_rows.append(int(key))
+                if self.search_index is not None:
+                    self.search_index.update(int(key), new_sentence)
 
+            value['sentence'] = new_sentence
+        self.notify_map_change(TEXT, changed_rows)
+        return replacer.counts, changed_sentences
     def reset(self):
         self.text_audio_map.clear()
+        self.search_index = None
+        self.pending_map_changes.clear()
         self.settings.clear()
         self.current_sentence_idx = 0
         self.speakers = {
@@ -474,12 +730,30 @@ class AudiobookModel:
         }
         self.current_tts_engine_name = None
         self.current_speaker_id = None
-        self.current_voice_parameters = None
+        self.current_tts_engine_key = None
         self.tts_engine = None
         self.filepath = None
     def reset_regen_in_text_audio_map(self):
+        changed_rows = []
         for idx_str in self.text_audio_map:
-            self.text_audio_map[idx_str]["regen"] = False
+            if self.text_audio_map[idx_str]["regen"]:
+                self.text_audio_map[idx_str]["regen"] = False
+                changed_rows.append(int(idx_str))
+        self.notify_map_change(REGEN, changed_rows)
+    def run_process_pool_generation(self, directory_path, sentences_by_speaker, is_continue, is_regen_only, should_stop_callback, finalize_stage, worker_count):
+        batch_size = int(self.global_settings.get('generation_batch_size', 8) or 8)
+        jobs = self.iter_generation_jobs(directory_path, sentences_by_speaker, is_continue, is_regen_only, should_stop_callback, load_engines=False)
+        def pending_jobs():
+            # Cache hits are finalized right away, only misses are sent to the workers
+            for job in jobs:
+                if self.fetch_cached_audio(job):
+                    finalize_stage(job)
+                else:
+                    yield job
+        # Every worker keeps its own engines, so each one gets an equal share of the budget
+        pool = self.get_engine_pool()
+        pool_budget = (pool.max_bytes // worker_count, pool.max_vram_bytes // worker_count)
+        run_process_pool(pending_jobs(), worker_count, batch_size, finalize_stage, pool_budget)
     def save_settings(self, settings_dict):
         with open('configs/settings.yaml', 'r') as f:
             settings_yaml = yaml.safe_load(f) or {}
@@ -491,26 +765,15 @@ class AudiobookModel:
         if speakers is None:
             speakers = self.speakers
         for speaker in speakers.values():
-            color = speaker.get('color', '#b0b0b0')
-            if isinstance(color, QColor):
-                speaker['color'] = color.name()
-            elif color == Qt.black:
-                speaker['color'] = QColor(color).name()
-            elif isinstance(color, str):
-                pass
-            else:
-                raise TypeError(f"Unsupported color type: {type(color)} for speaker {speaker}, value: {color}")
+            if 'color' in speaker:
+                speaker['color'] = color_name(speaker['color'])
         generation_settings['speakers'] = speakers
         generation_settings_path = os.path.join(directory_path, "generation_settings.json")
         self.replace_default_with_none(generation_settings)
         self.save_json(generation_settings_path, generation_settings)
     def save_json(self, file_path, data):
         def default_serializer(obj):
-            if isinstance(obj, QColor):
-                return obj.name()
-            elif isinstance(obj, int):
-                return QColor(obj).name()
-            raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+            return color_name(obj)
         with open(file_path, 'w', encoding='utf-8') as file:
             json.dump(data, file, ensure_ascii=False, indent=4, default=default_serializer)
     # def save_settings(self, background_image=None):
@@ -522,15 +785,8 @@ class AudiobookModel:
         if speakers is None:
             speakers = self.speakers
         for speaker in speakers.values():
-            color = speaker.get('color', '#b0b0b0')
-            if isinstance(color, QColor):
-                speaker['color'] = color.name()
-            elif color == Qt.black:
-                speaker['color'] = QColor(color).name()
-            elif isinstance(color, str):
-                pass
-            else:
-                raise TypeError(f"Unsupported color type: {type(color)} for speaker {speaker}, value: {color}")
+            if 'color' in speaker:
+                speaker['color'] = color_name(speaker['color'])
         generation_settings['speakers'] = speakers
         temp_settings_path = os.path.join('temp', "generation_settings.json")
         if not os.path.exists('temp'):
@@ -538,9 +794,7 @@ class AudiobookModel:
         self.replace_default_with_none(generation_settings)
         self.save_json(temp_settings_path, generation_settings)
     def save_text_audio_map(self, directory_path):
-        map_file_path = os.path.join(directory_path, "text_audio_map.json")
-        with open(map_file_path, 'w', encoding="utf-8") as map_file:
-            json.dump(self.text_audio_map, map_file, ensure_ascii=False, indent=4)
+        self.get_map_journal(directory_path).compact(self.text_audio_map)
     def set_background_image(self, file_name):
         if not os.path.exists('image_backgrounds'):
             os.makedirs('image_backgrounds')
@@ -551,80 +805,99 @@ class AudiobookModel:
         settings_dict = {"background_image": destination_path}
         self.save_settings(settings_dict)
         return destination_path
+    def store_cached_audio(self, job):
+        if self.synthesis_cache is not None:
+            self.synthesis_cache.store(job['cache_key'], job['audio_path'])
+    def take_tts_result(self, job, result, target_path):
+        if isinstance(result, AudioBuffer):
+            job['audio'] = result
+        elif result:
+            job['audio_path'] = result if isinstance(result, str) else target_path
+        if job['audio_path'] != target_path:
+            discard_file(target_path)
+    def tts_target_path(self, job):
+        # Without s2s, file based engines write next to the final audio file, write_job_audio swaps it in
+        if job['s2s_engine'] is None:
+            return staging_path(job['output_path'])
+        return temp_audio_path()
     def update_audiobook(self, directory_path, new_sentences_list):
-        audio_map_path = os.path.join(directory_path, 'text_audio_map.json')
-        if not os.path.exists(audio_map_path):
-            raise FileNotFoundError("The selected directory is not a valid Audiobook Directory.")
-        with open(audio_map_path, 'r', encoding='utf-8') as file:
-            text_audio_map = json.load(file)
-        reverse_map = {}
-        for idx, item in text_audio_map.items():
-            sentence = item['sentence']
-            reverse_map.setdefault(sentence, []).append(idx)
+        text_audio_map = read_text_audio_map(directory_path)
+        assign_audio_ids(text_audio_map)
+        allocator = AudioIdAllocator(text_audio_map)
+        old_keys = sorted(text_audio_map, key=lambda k: int(k))
+        # The old and new sentences are aligned by a diff, see sentence_diff
+        plan = update_plan(
+            [text_audio_map[key]['sentence'] for key in old_keys],
+            new_sentences_list,
+            normalized_matching=bool(self.global_settings.get('update_normalized_matching', True))
+        )
         new_text_audio_map = {}
-        deleted_indices = set(text_audio_map.keys())
-        sentence_counts = {}
-        rename_operations = {}
-        for new_idx, sentence in enumerate(new_sentences_list):
-            sentence_counts[sentence] = sentence_counts.get(sentence, 0) + 1
-            count = sentence_counts[sentence]
-            if sentence in reverse_map and len(reverse_map[sentence]) >= count:
-                old_idx = reverse_map[sentence][count - 1]
-                old_item = text_audio_map[old_idx]
-                old_audio_path = old_item['audio_path']
-                old_audio_filename = os.path.basename(old_audio_path)
-                old_audio_full_path = os.path.join(directory_path, old_audio_filename)
-                deleted_indices.discard(old_idx)
-                new_audio_filename = f"audio_{new_idx}.wav"
-                new_audio_full_path = os.path.join(directory_path, new_audio_filename)
-                old_item['audio_path'] = new_audio_full_path
-                new_text_audio_map[str(new_idx)] = old_item
-                if str(new_idx) != old_idx and old_audio_filename:
-                    rename_operations[old_audio_full_path] = new_audio_full_path
+        deleted_items = []
+        counts = defaultdict(int)
+        for step in plan:
+            counts[step.action] += 1
+            if step.action == DELETE:
+                deleted_items.append(text_audio_map[old_keys[step.old_index]])
+            elif step.action == INSERT:
+                new_text_audio_map[str(step.new_index)] = self.default_text_audio_map_format(sentence=new_sentences_list[step.new_index], audio_path="", generated=False, audio_id=allocator.allocate())
             else:
-                generated = False
-                new_audio_filename = ""
-                new_text_audio_map[str(new_idx)] = self.default_text_audio_map_format(sentence=sentence, audio_path=new_audio_filename, generated=generated)
-        for old_idx in deleted_indices:
-            old_audio_path = text_audio_map[old_idx]['audio_path']
-            if old_audio_path:
-                old_audio_filename = os.path.basename(old_audio_path)
-                old_audio_full_path = os.path.join(directory_path, old_audio_filename)
-                if os.path.exists(old_audio_full_path):
-                    os.remove(old_audio_full_path)
-                else:
-                    print(f"Audio file to delete not found: {old_audio_full_path}")
-        temp_files = {}
-        for src, dst in rename_operations.items():
-            if os.path.exists(src):
-                temp_src = src + '.tmp'
-                os.rename(src, temp_src)
-                temp_files[temp_src] = dst
-            else:
-                print(f"Warning: Source file '{src}' does not exist.")
-        for temp_src, dst in temp_files.items():
-            if os.path.exists(dst):
-                os.remove(dst)
-            os.rename(temp_src, dst)
+                old_item = text_audio_map[old_keys[step.old_index]]
+                # A kept sentence keeps its audio_id and file wherever it moves, only the directory is updated
+                if old_item['audio_path']:
+                    old_item['audio_path'] = os.path.join(directory_path, os.path.basename(old_item['audio_path']))
+                if step.action == RETEXT:
+                    old_item['sentence'] = new_sentences_list[step.new_index]
+                new_text_audio_map[str(step.new_index)] = old_item
+        print("Update audiobook: " + ", ".join(f"{count} {action}" for action, count in counts.items()))
         self.text_audio_map = new_text_audio_map
+        self.search_index = None
         self.save_text_audio_map(directory_path)
+        self.remove_audio_files(directory_path, deleted_items)
     def update_sentence_in_text_audio_map(self, idx, new_text):
         idx_str = str(idx)
         if idx_str in self.text_audio_map:
             self.text_audio_map[idx_str]['sentence'] = new_text
             self.text_audio_map[idx_str]["generated"] = False
+            if self.search_index is not None:
+                self.search_index.update(int(idx_str), new_text)
+            self.notify_map_change(TEXT, [int(idx_str)])
     def update_speakers(self, speakers):
         self.speakers = speakers
     def update_text_audio_map(self, sentences_list):
         new_text_audio_map = {}
+        assign_audio_ids(self.text_audio_map)
+        allocator = AudioIdAllocator(self.text_audio_map)
         sentence_to_existing_idx = {item['sentence']: idx for idx, item in self.text_audio_map.items()}
+        reused = set()
         for idx, sentence in enumerate(sentences_list):
-            if sentence in sentence_to_existing_idx:
-                existing_idx = sentence_to_existing_idx[sentence]
+            existing_idx = sentence_to_existing_idx.get(sentence)
+            # A repeated sentence only reuses the existing entry once, two rows sharing an entry would share its audio file
+            if existing_idx is not None and existing_idx not in reused:
+                reused.add(existing_idx)
                 item = self.text_audio_map[existing_idx]
                 new_text_audio_map[str(idx)] = item
             else:
                 generated = False
                 audio_path = ""
-                new_text_audio_map[str(idx)] = self.default_text_audio_map_format(sentence=sentence, audio_path=audio_path, generated=generated)              
+                new_text_audio_map[str(idx)] = self.default_text_audio_map_format(sentence=sentence, audio_path=audio_path, generated=generated, audio_id=allocator.allocate())
         self.text_audio_map = new_text_audio_map
+        self.search_index = None
+    def write_job_audio(self, job):
+        # In-memory audio is written exactly once, then the new audio replaces the sentence's file as a whole (see audio_buffer)
+        if job['audio'] is not None:
+            job['audio_path'] = job['audio'].write(staging_path(job['output_path']))
+            job['audio'] = None
+        if job['audio_path'] and job['audio_path'] != job['output_path']:
+            replace_file(job['audio_path'], job['output_path'])
+            job['audio_path'] = job['output_path']
+
+def color_name(color):
+    '''
+    Hex name of a speaker color.  The GUI hands in QColor and Qt.GlobalColor values, PySide6 is only imported for those so the model also runs without it (see cli.py).
+    '''
+    if isinstance(color, str):
+        return color
+    if not type(color).__module__.startswith('PySide6'):
+        raise TypeError(f"Object of type {color.__class__.__name__} is not JSON serializable")
+    from PySide6.QtGui import QColor
+    return QColor(color).name()
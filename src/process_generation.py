@@ -0,0 +1,135 @@
+# process_generation.py
+
+'''
+Multi-process generation, enabled with "generation_workers" > 1 in configs/settings.yaml.
+
+Each worker process loads its own engines through tts_engines.load_tts_engine (and s2s_engines.load_s2s_engine when the speaker uses s2s) and keeps them in its own EnginePool between batches, with the engine memory budget split between the workers.  Workers receive batches of sentences from a single speaker, write each finished sentence straight to its audio file and send back the paths.  The parent process stays the only writer of text_audio_map and reports progress through the same callbacks as the in-process pipeline.
+
+Only a few batches are kept in flight at a time, so a stop request takes effect after the current batches instead of after the whole book.
+'''
+
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from audio_buffer import AudioBuffer, discard_file, staging_path, temp_audio_path
+from engine_pool import EnginePool
+
+# Engines loaded by this worker process
+_worker_pool = None
+
+def generate_batch(speaker_id, speaker_settings, batch, pool_budget):
+    # Imported here so that only worker processes pay for the engine imports
+    import tts_engines
+    import s2s_engines
+    pool = get_worker_pool(pool_budget)
+    tts_engine_name = speaker_settings.get('tts_engine', 'pyttsx3')
+    tts_engine = pool.acquire("tts", tts_engine_name, speaker_settings, tts_engines.load_tts_engine)
+    s2s_engine = None
+    s2s_engine_name = speaker_settings.get('s2s_engine', None)
+    if speaker_settings.get('use_s2s', False) and s2s_engine_name:
+        try:
+            s2s_engine = pool.acquire("s2s", s2s_engine_name, speaker_settings, s2s_engines.load_s2s_engine)
+        except Exception as e:
+            print(f"Failed to load s2s engine '{s2s_engine_name}': {e}")
+    results = []
+    # Audio is written next to the sentence's file, the parent swaps it in when it finalizes the sentence
+    target_paths = [staging_path(output_path) if s2s_engine is None else temp_audio_path() for _, _, output_path in batch]
+    # pyttsx3 generates the whole batch in one run of its driver
+    generated = tts_engines.generate_audio_batch(tts_engine, [(sentence, target_path) for (_, sentence, _), target_path in zip(batch, target_paths)], speaker_settings, tts_engine_name)
+    for (idx, sentence, output_path), target_path, result in zip(batch, target_paths, generated):
+        if not result:
+            discard_file(target_path)
+            results.append((idx, None))
+            continue
+        if isinstance(result, AudioBuffer):
+            discard_file(target_path)
+            source = result
+        else:
+            source = result if isinstance(result, str) else target_path
+        if s2s_engine is not None:
+            try:
+                s2s_engines.process_audio(s2s_engine, s2s_engine_name=s2s_engine_name, input_audio_path=source, output_audio_path=staging_path(output_path), parameters=speaker_settings)
+            finally:
+                if not isinstance(source, AudioBuffer):
+                    discard_file(source)
+            audio_path = staging_path(output_path)
+        elif isinstance(source, AudioBuffer):
+            audio_path = source.write(staging_path(output_path))
+        else:
+            audio_path = source
+        results.append((idx, audio_path))
+    return results
+
+def get_worker_pool(pool_budget):
+    global _worker_pool
+    if _worker_pool is None:
+        max_bytes, max_vram_bytes = pool_budget
+        _worker_pool = EnginePool(
+            max_bytes,
+            max_vram_bytes,
+            tts_config=load_config(os.path.join('configs', 'tts_config.json')),
+            s2s_config=load_config(os.path.join('configs', 's2s_config.json'))
+        )
+    return _worker_pool
+
+def iter_batches(jobs, batch_size, is_batchable=None):
+    # Consecutive jobs of one speaker, jobs is_batchable turns down are handed on alone and right away
+    batch = []
+    for job in jobs:
+        if batch and (job['speaker_id'] != batch[0]['speaker_id'] or len(batch) >= batch_size):
+            yield batch
+            batch = []
+        batch.append(job)
+        if is_batchable is not None and not is_batchable(job):
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def load_config(config_path):
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+def run_process_pool(jobs, worker_count, batch_size, finalize_stage, pool_budget):
+    '''
+    jobs must carry "idx", "sentence", "speaker_id", "voice_parameters" and "output_path".  finalize_stage is called on the calling thread with each job once its "audio_path" is filled in (None on failure).  pool_budget is the (ram bytes, vram bytes) engine budget of every worker.
+    '''
+    max_in_flight = worker_count * 2
+    # spawn everywhere, CUDA can't be used from forked processes
+    context = multiprocessing.get_context("spawn")
+    batches = iter_batches(jobs, batch_size)
+    in_flight = {}
+    with ProcessPoolExecutor(max_workers=worker_count, mp_context=context) as executor:
+        try:
+            exhausted = False
+            while True:
+                while not exhausted and len(in_flight) < max_in_flight:
+                    batch = next(batches, None)
+                    if batch is None:
+                        exhausted = True
+                        break
+                    first = batch[0]
+                    future = executor.submit(
+                        generate_batch,
+                        first['speaker_id'],
+                        first['voice_parameters'],
+                        [(job['idx'], job['sentence'], job['output_path']) for job in batch],
+                        pool_budget
+                    )
+                    in_flight[future] = batch
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = in_flight.pop(future)
+                    paths = dict(future.result())
+                    for job in batch:
+                        job['audio_path'] = paths.get(job['idx'])
+                        finalize_stage(job)
+        finally:
+            for future in in_flight:
+                future.cancel()
@@ -1,33 +1,58 @@
 # s2s_engines.py
+import importlib.util
 import os
 import json
-import torch
 import traceback
 
-try:
-    from rvc_python.infer import RVCInference
-    import fairseq
-except Exception as e:
-    print(f"RVC not installed, received error: {e}")
-    print("Full traceback:")
-    traceback.print_exc()
+from audio_buffer import AudioBuffer, discard_file, temp_audio_path
+
+# torch, RVC and fairseq are imported when RVC is first loaded, see ENGINE_PACKAGES in tts_engines.py
+ENGINE_PACKAGES = {
+    'rvc': 'rvc_python'
+}
+
+S2S_CONFIG_PATH = "configs/s2s_config.json"
 
 def process_audio(s2s_engine, s2s_engine_name, input_audio_path, output_audio_path, parameters):
+    # input_audio_path may also be an AudioBuffer handed over by the tts stage
     s2s_engine_name = s2s_engine_name.lower()
     if s2s_engine_name == 'rvc':
-        return process_with_rvc(s2s_engine, input_audio_path, output_audio_path)
+        return process_with_rvc(s2s_engine, input_audio_path, output_audio_path, parameters)
     # Add other s2s engines here
     else:
         print(f"s2s engine '{s2s_engine_name}' not recognized.")
         return False
 
-def process_with_rvc(s2s_engine, input_audio_path, output_audio_path):
-    s2s_engine.infer_file(input_audio_path, output_audio_path)
+def process_with_rvc(s2s_engine, input_audio_path, output_audio_path, parameters=None):
+    if parameters:
+        # Pitch, index rate etc. are inference-time settings, applied to the loaded model instead of reloading it
+        s2s_engine.set_params(**rvc_inference_parameters(parameters))
+    if isinstance(input_audio_path, AudioBuffer):
+        # rvc_python only converts files, so in-memory audio has to be written out for it
+        temp_input_path = input_audio_path.write(temp_audio_path())
+        try:
+            s2s_engine.infer_file(temp_input_path, output_audio_path)
+        finally:
+            discard_file(temp_input_path)
+    else:
+        s2s_engine.infer_file(input_audio_path, output_audio_path)
     return output_audio_path
 
+def is_engine_available(s2s_engine_name):
+    package = ENGINE_PACKAGES.get(s2s_engine_name.lower())
+    if package is None:
+        return False
+    try:
+        return importlib.util.find_spec(package) is not None
+    except (ImportError, ValueError):
+        traceback.print_exc()
+        return False
+
 def load_s2s_engine(s2s_engine_name, **kwargs):
     s2s_engine_name = s2s_engine_name.lower()
     try:
+        if s2s_engine_name in ENGINE_PACKAGES and not is_engine_available(s2s_engine_name):
+            raise ImportError(f"{s2s_engine_name} is not installed, the '{ENGINE_PACKAGES[s2s_engine_name]}' package could not be found")
         if s2s_engine_name == 'rvc':
             return load_with_rvc(**kwargs)
         else:
@@ -38,18 +63,34 @@ def load_s2s_engine(s2s_engine_name, **kwargs):
         raise e
     
 def load_with_rvc(**kwargs):
-    engine_name = "RVC"
-    s2s_config = load_config("configs/s2s_config.json")
-    s2s_settings = dict_to_object(s2s_config)
+    import torch
+    import fairseq
+    from rvc_python.infer import RVCInference
+    rvc_engine_config = find_rvc_engine_config()
+    rvc_folder_path = next((param.folder_path for param in rvc_engine_config.parameters if param.attribute == "selected_voice"), None)
+
+    torch.serialization.add_safe_globals([fairseq.data.dictionary.Dictionary])
+    s2s = RVCInference(models_dir=rvc_folder_path,
+                       device="cuda:0",
+                       **rvc_inference_parameters(kwargs, rvc_engine_config)
+                       )
+    voice_to_use = kwargs.get("selected_voice", None)
+    if voice_to_use == None:
+        return
     
-    rvc_engine_config = None
+    s2s.load_model(voice_to_use)
+    return s2s
+
+def find_rvc_engine_config():
+    engine_name = "RVC"
+    s2s_settings = load_s2s_config()
     for engine in s2s_settings.s2s_engines:
         if engine.name.lower() == engine_name.lower():
-            rvc_engine_config = engine
-            break
-        
-    rvc_folder_path = next((param.folder_path for param in rvc_engine_config.parameters if param.attribute == "selected_voice"), None)
-    
+            return engine
+
+def rvc_inference_parameters(kwargs, rvc_engine_config=None):
+    if rvc_engine_config is None:
+        rvc_engine_config = find_rvc_engine_config()
     f0method = kwargs.get("f0method")
     f0up_key = kwargs.get("f0pitch")
     
@@ -65,24 +106,17 @@ def load_with_rvc(**kwargs):
     protect_step = next((param.step for param in rvc_engine_config.parameters if param.attribute == "protect"), 100)
     protect = kwargs.get("protect")/protect_step
     
+    return {
+        "f0method": f0method,
+        "f0up_key": f0up_key,
+        "index_rate": index_rate,
+        "filter_radius": filter_radius,
+        "resample_sr": resample_sr,
+        "rms_mix_rate": rms_mix_rate,
+        "protect": protect
+    }
 
-    torch.serialization.add_safe_globals([fairseq.data.dictionary.Dictionary])
-    s2s = RVCInference(models_dir=rvc_folder_path,
-                       device="cuda:0",
-                       f0method=f0method,
-                       f0up_key=f0up_key,
-                       index_rate=index_rate,
-                       filter_radius=filter_radius,
-                       resample_sr=resample_sr,
-                       rms_mix_rate=rms_mix_rate,
-                       protect=protect
-                       )
-    voice_to_use = kwargs.get("selected_voice", None)
-    if voice_to_use == None:
-        return
-    
-    s2s.load_model(voice_to_use)
-    return s2s
+_s2s_config_cache = {}
 
 def load_config(config_path):
     if not os.path.exists(config_path):
@@ -90,6 +124,19 @@ def load_config(config_path):
     with open(config_path, 'r') as f:
         return json.load(f)
 
+def load_s2s_config(path=S2S_CONFIG_PATH):
+    # Parsed once and reused until the file changes, like tts_engines.load_tts_config, rvc_inference_parameters runs for every sentence
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    cached = _s2s_config_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    s2s_settings = dict_to_object(load_config(path))
+    _s2s_config_cache[path] = (mtime, s2s_settings)
+    return s2s_settings
+
 # borrowed from https://github.com/ex3ndr/supervoice-gpt/blob/5c316bdbc7c70164ac4fe9a9a826976c4f546b0d/supervoice_gpt/misc.py#L4
 # modified for lists
 def dict_to_object(src):
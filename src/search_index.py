@@ -0,0 +1,122 @@
+# search_index.py
+
+'''
+Search index over the sentences of the loaded book.
+
+The lowercased sentences are joined, without a separator, into one string and a table holds the offset where each sentence starts.  The row of a match is found by binary search on that table, so a match running over the end of a sentence into the next ones (the "Search across sentences limits" option) is found with a single str.find instead of building a concatenation of the following sentences for every row.
+
+The rows containing a query are collected once, after each hit the scan jumps straight to the start of the next sentence.  They are kept until the text changes, so repeatedly pressing next/previous is a binary search over them.  Queries found in more than MAX_CACHED_HITS rows aren't collected, their next hit is never far away, so those are searched straight from the selected row instead.  Editing, replacing or deleting sentences updates the lowercased sentence list in place, the joined string and offsets are rebuilt on the next search.
+'''
+
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+
+MAX_CACHED_QUERIES = 16
+MAX_CACHED_HITS = 2000
+
+class SentenceSearchIndex:
+    def __init__(self, sentences=()):
+        self.sentences = [sentence.lower() for sentence in sentences]
+        self.text = None
+        self.offsets = None
+        self.hit_cache = OrderedDict()
+    def __len__(self):
+        return len(self.sentences)
+    def delete(self, rows):
+        rows = set(rows)
+        self.sentences = [sentence for row, sentence in enumerate(self.sentences) if row not in rows]
+        self.invalidate()
+    def find(self, start_row, forward, query, across_sentences=False):
+        '''
+        Returns the next row after start_row (or before it, going backwards) containing query, wrapping around the book but never returning start_row itself, or None.
+        '''
+        if not query or not self.sentences:
+            return None
+        start_row = min(max(start_row, 0), len(self.sentences) - 1)
+        hits = self.hits(query, across_sentences, MAX_CACHED_HITS)
+        if hits is None:
+            return self.scan(start_row, forward, query.lower(), across_sentences)
+        if not hits:
+            return None
+        if forward:
+            position = bisect_right(hits, start_row)
+            row = hits[position] if position < len(hits) else hits[0]
+        else:
+            position = bisect_left(hits, start_row)
+            row = hits[position - 1] if position > 0 else hits[-1]
+        return None if row == start_row else row
+    def first_hit(self, query, across_sentences, begin, limit):
+        # Row of the first match starting in text[begin:limit]
+        length = len(query)
+        position = self.text.find(query, begin, limit + length - 1)
+        while position != -1:
+            row = bisect_right(self.offsets, position) - 1
+            if across_sentences or position + length <= self.offsets[row + 1]:
+                return row
+            position = self.text.find(query, position + 1, limit + length - 1)
+        return None
+    def hits(self, query, across_sentences=False, limit=None):
+        '''
+        Sorted rows in which a match of query starts.  Unless across_sentences is set, the match also has to end in that row.  None when there are more than limit of them.
+        '''
+        query = query.lower()
+        key = (query, across_sentences)
+        if key in self.hit_cache:
+            self.hit_cache.move_to_end(key)
+            return self.hit_cache[key]
+        self.rebuild()
+        text = self.text
+        offsets = self.offsets
+        length = len(query)
+        rows = []
+        position = text.find(query)
+        while position != -1:
+            row = bisect_right(offsets, position) - 1
+            if not across_sentences and position + length > offsets[row + 1]:
+                # Runs into the next sentence, a later match could still start in this one
+                position = text.find(query, position + 1)
+                continue
+            rows.append(row)
+            if limit is not None and len(rows) > limit:
+                rows = None
+                break
+            position = text.find(query, offsets[row + 1])
+        self.hit_cache[key] = rows
+        if len(self.hit_cache) > MAX_CACHED_QUERIES:
+            self.hit_cache.popitem(last=False)
+        return rows
+    def invalidate(self):
+        self.text = None
+        self.offsets = None
+        self.hit_cache.clear()
+    def last_hit(self, query, across_sentences, begin, limit):
+        # Row of the last match starting in text[begin:limit]
+        length = len(query)
+        position = self.text.rfind(query, begin, limit + length - 1)
+        while position != -1:
+            row = bisect_right(self.offsets, position) - 1
+            if across_sentences or position + length <= self.offsets[row + 1]:
+                return row
+            position = self.text.rfind(query, begin, position + length - 1)
+        return None
+    def rebuild(self):
+        if self.text is not None:
+            return
+        self.text = "".join(self.sentences)
+        # One extra offset marks the end of the last sentence
+        self.offsets = [0]
+        self.offsets.extend(accumulate(map(len, self.sentences)))
+    def scan(self, start_row, forward, query, across_sentences):
+        self.rebuild()
+        before, after = self.offsets[start_row], self.offsets[start_row + 1]
+        if forward:
+            row = self.first_hit(query, across_sentences, after, len(self.text))
+            return row if row is not None else self.first_hit(query, across_sentences, 0, before)
+        row = self.last_hit(query, across_sentences, 0, before)
+        return row if row is not None else self.last_hit(query, across_sentences, after, len(self.text))
+    def update(self, row, sentence):
+        sentence = sentence.lower()
+        if self.sentences[row] != sentence:
+            self.sentences[row] = sentence
+            self.invalidate()
@@ -0,0 +1,170 @@
+# sentence_diff.py
+
+'''
+Sentence alignment for updating an audiobook with an edited text file.
+
+The old and new sentences are turned into integer keys (equal text, equal key) and aligned by a diff instead of being looked up by text and occurrence count, so inserting a paragraph or a repeated line such as "* * *" no longer shifts which copy of a repeated sentence keeps its audio.  The diff works like git's patience diff:
+    - the common start and end of the two lists are matched first
+    - sentences that occur exactly once in both lists are anchors, the longest run of anchors in the same order is kept and the gaps between them are aligned the same way
+    - a gap without anchors is aligned by Myers' O(ND) diff, which is fast when the gap only has a few changes.  Gaps needing more than MAX_EDIT_COST edits are treated as replaced entirely.
+A book with a handful of edits is aligned in close to linear time.
+
+With normalized matching on, sentences left unmatched are aligned a second time on normalized text (Unicode compatibility forms, straight quotes and apostrophes, single spaces), so changing quote style or whitespace keeps the audio and only updates the sentence text.
+
+The result is a plan in new-text order: keep, retext (kept audio, updated text), insert and delete steps.
+'''
+
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, namedtuple
+
+KEEP = 'keep'
+RETEXT = 'retext'
+INSERT = 'insert'
+DELETE = 'delete'
+MAX_EDIT_COST = 1000
+QUOTE_TABLE = str.maketrans({'“': '"', '”': '"', '„': '"', '«': '"', '»': '"', '‘': "'", '’': "'", '‚': "'", '`': "'", '´': "'"})
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+PlanStep = namedtuple('PlanStep', ['action', 'old_index', 'new_index'])
+
+def align(old_keys, new_keys):
+    '''
+    Returns the matched (old index, new index) pairs of two key lists, in order.
+    '''
+    matches = []
+    align_range(old_keys, new_keys, 0, len(old_keys), 0, len(new_keys), matches)
+    return matches
+
+def align_range(old_keys, new_keys, old_lo, old_hi, new_lo, new_hi, matches):
+    # Common start and end
+    while old_lo < old_hi and new_lo < new_hi and old_keys[old_lo] == new_keys[new_lo]:
+        matches.append((old_lo, new_lo))
+        old_lo += 1
+        new_lo += 1
+    tail = []
+    while old_lo < old_hi and new_lo < new_hi and old_keys[old_hi - 1] == new_keys[new_hi - 1]:
+        old_hi -= 1
+        new_hi -= 1
+        tail.append((old_hi, new_hi))
+    if old_lo < old_hi and new_lo < new_hi:
+        anchors = unique_anchors(old_keys, new_keys, old_lo, old_hi, new_lo, new_hi)
+        if anchors:
+            for old_index, new_index in anchors:
+                align_range(old_keys, new_keys, old_lo, old_index, new_lo, new_index, matches)
+                matches.append((old_index, new_index))
+                old_lo, new_lo = old_index + 1, new_index + 1
+            align_range(old_keys, new_keys, old_lo, old_hi, new_lo, new_hi, matches)
+        else:
+            matches.extend(myers_matches(old_keys, new_keys, old_lo, old_hi, new_lo, new_hi))
+    matches.extend(reversed(tail))
+
+def myers_matches(old_keys, new_keys, old_lo, old_hi, new_lo, new_hi, max_cost=MAX_EDIT_COST):
+    '''
+    Matched pairs of a shortest edit script, or none when it takes more than max_cost inserts and deletes.
+    '''
+    n = old_hi - old_lo
+    m = new_hi - new_lo
+    furthest = {1: 0}
+    trace = []
+    for cost in range(min(n + m, max_cost) + 1):
+        trace.append(dict(furthest))
+        for diagonal in range(-cost, cost + 1, 2):
+            if diagonal == -cost or (diagonal != cost and furthest[diagonal - 1] < furthest[diagonal + 1]):
+                x = furthest[diagonal + 1]
+            else:
+                x = furthest[diagonal - 1] + 1
+            y = x - diagonal
+            while x < n and y < m and old_keys[old_lo + x] == new_keys[new_lo + y]:
+                x += 1
+                y += 1
+            furthest[diagonal] = x
+            if x >= n and y >= m:
+                return myers_backtrack(trace, n, m, old_lo, new_lo)
+    return []
+
+def myers_backtrack(trace, x, y, old_lo, new_lo):
+    matches = []
+    for cost in range(len(trace) - 1, -1, -1):
+        furthest = trace[cost]
+        diagonal = x - y
+        if diagonal == -cost or (diagonal != cost and furthest[diagonal - 1] < furthest[diagonal + 1]):
+            previous_diagonal = diagonal + 1
+        else:
+            previous_diagonal = diagonal - 1
+        previous_x = furthest[previous_diagonal]
+        previous_y = previous_x - previous_diagonal
+        while x > previous_x and y > previous_y:
+            x -= 1
+            y -= 1
+            matches.append((old_lo + x, new_lo + y))
+        x, y = previous_x, previous_y
+    matches.reverse()
+    return matches
+
+def normalize_sentence(sentence):
+    sentence = unicodedata.normalize('NFKC', sentence).translate(QUOTE_TABLE)
+    return WHITESPACE_PATTERN.sub(' ', sentence).strip()
+
+def sentence_keys(old_sentences, new_sentences, key_function=None):
+    keys = {}
+    def key_of(sentence):
+        return keys.setdefault(sentence if key_function is None else key_function(sentence), len(keys))
+    return [key_of(sentence) for sentence in old_sentences], [key_of(sentence) for sentence in new_sentences]
+
+def unique_anchors(old_keys, new_keys, old_lo, old_hi, new_lo, new_hi):
+    # Keys occurring once on each side, then the longest run of them in the same order (patience sorting)
+    old_counts = Counter(old_keys[old_lo:old_hi])
+    new_counts = Counter(new_keys[new_lo:new_hi])
+    old_positions = {old_keys[i]: i for i in range(old_lo, old_hi) if old_counts[old_keys[i]] == 1}
+    candidates = [(old_positions[new_keys[j]], j) for j in range(new_lo, new_hi) if new_counts[new_keys[j]] == 1 and new_keys[j] in old_positions]
+    tails = []
+    tail_indexes = []
+    previous = [None] * len(candidates)
+    for position, (old_index, _) in enumerate(candidates):
+        slot = bisect_left(tails, old_index)
+        if slot:
+            previous[position] = tail_indexes[slot - 1]
+        if slot == len(tails):
+            tails.append(old_index)
+            tail_indexes.append(position)
+        else:
+            tails[slot] = old_index
+            tail_indexes[slot] = position
+    anchors = []
+    position = tail_indexes[-1] if tail_indexes else None
+    while position is not None:
+        anchors.append(candidates[position])
+        position = previous[position]
+    anchors.reverse()
+    return anchors
+
+def update_plan(old_sentences, new_sentences, normalized_matching=True):
+    '''
+    Returns PlanSteps in new-text order, each old sentence that isn't kept is deleted right where the diff leaves it.
+    '''
+    old_keys, new_keys = sentence_keys(old_sentences, new_sentences)
+    matches = {old_index: (new_index, KEEP) for old_index, new_index in align(old_keys, new_keys)}
+    if normalized_matching:
+        # Only the unmatched sentences between two exact matches are aligned again, on normalized text
+        old_lo = new_lo = 0
+        for old_hi, (new_hi, _) in sorted(matches.items()) + [(len(old_sentences), (len(new_sentences), None))]:
+            if old_lo < old_hi and new_lo < new_hi:
+                for old_index, new_index in align(*sentence_keys(old_sentences[old_lo:old_hi], new_sentences[new_lo:new_hi], normalize_sentence)):
+                    old_index += old_lo
+                    new_index += new_lo
+                    matches[old_index] = (new_index, KEEP if old_sentences[old_index] == new_sentences[new_index] else RETEXT)
+            old_lo, new_lo = old_hi + 1, new_hi + 1
+    plan = []
+    old_index = 0
+    new_index = 0
+    for matched_old in sorted(matches):
+        matched_new, action = matches[matched_old]
+        plan.extend(PlanStep(DELETE, index, None) for index in range(old_index, matched_old))
+        plan.extend(PlanStep(INSERT, None, index) for index in range(new_index, matched_new))
+        plan.append(PlanStep(action, matched_old, matched_new))
+        old_index, new_index = matched_old + 1, matched_new + 1
+    plan.extend(PlanStep(DELETE, index, None) for index in range(old_index, len(old_sentences)))
+    plan.extend(PlanStep(INSERT, None, index) for index in range(new_index, len(new_sentences)))
+    return plan
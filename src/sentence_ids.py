@@ -0,0 +1,62 @@
+# sentence_ids.py
+
+'''
+Stable audio ids for the sentences in text_audio_map.json.
+
+The keys of text_audio_map are row positions, they hold the order of the book and shift whenever sentences are deleted or inserted.  Every entry also carries an "audio_id" that never changes once assigned, and its audio file is named after that id (audio_{audio_id}.wav) instead of after its position.  Deleting, inserting or moving sentences only rekeys the map, which is saved as one atomic snapshot, and no audio file is ever renamed.
+
+New ids continue after the highest id in the map, so a fresh book still starts out with audio_0.wav, audio_1.wav, ...  Books made before ids existed are migrated when they're loaded: their files were always renamed to match the positions, so each entry takes the id its current file name already has and nothing is renamed there either.
+'''
+
+import os
+import re
+
+AUDIO_ID_KEY = "audio_id"
+AUDIO_FILE_PATTERN = re.compile(r'^audio_(\d+)\.wav$')
+
+class AudioIdAllocator:
+    def __init__(self, text_audio_map):
+        self.next_id = max((entry[AUDIO_ID_KEY] for entry in text_audio_map.values() if entry.get(AUDIO_ID_KEY) is not None), default=-1) + 1
+    def allocate(self):
+        audio_id = self.next_id
+        self.next_id += 1
+        return audio_id
+
+def assign_audio_ids(text_audio_map):
+    '''
+    Gives every entry without an audio_id one, preferring the id in its audio file name, then its position.  Returns the number of entries changed.
+    '''
+    used = {entry[AUDIO_ID_KEY] for entry in text_audio_map.values() if entry.get(AUDIO_ID_KEY) is not None}
+    assigned = 0
+    unassigned = []
+    # Ids of existing files go first, so an entry without audio can't take the id of a file that's in use
+    for key in sorted(text_audio_map, key=int):
+        entry = text_audio_map[key]
+        if entry.get(AUDIO_ID_KEY) is not None:
+            continue
+        audio_id = audio_id_from_path(entry.get('audio_path'))
+        if audio_id is None or audio_id in used:
+            unassigned.append((key, entry))
+            continue
+        entry[AUDIO_ID_KEY] = audio_id
+        used.add(audio_id)
+        assigned += 1
+    allocator = None
+    for key, entry in unassigned:
+        audio_id = int(key)
+        if audio_id in used:
+            if allocator is None:
+                allocator = AudioIdAllocator(text_audio_map)
+            audio_id = allocator.allocate()
+        entry[AUDIO_ID_KEY] = audio_id
+        used.add(audio_id)
+    return assigned + len(unassigned)
+
+def audio_file_name(audio_id):
+    return f"audio_{audio_id}.wav"
+
+def audio_id_from_path(audio_path):
+    if not audio_path:
+        return None
+    match = AUDIO_FILE_PATTERN.match(os.path.basename(audio_path))
+    return int(match.group(1)) if match else None
@@ -0,0 +1,56 @@
+# startup_profile.py
+
+'''
+Import-time profiling for "python src/controller.py --profile-startup".
+
+ImportProfiler wraps builtins.__import__ before the rest of the app is imported and records, for every module imported for the first time, the time spent importing it including its own imports (cumulative) and excluding them (self).  report() prints the slowest modules, the self time per top level package and the time it took until the window was shown.
+'''
+
+import builtins
+import sys
+import time
+
+class ImportProfiler:
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.records = {}
+        self._stack = []
+        self._original_import = None
+    def install(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Only first imports are interesting, everything else is a sys.modules lookup
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        start = time.perf_counter()
+        self._stack.append(0.0)
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            cumulative, self_time = self.records.get(name, (0.0, 0.0))
+            self.records[name] = (cumulative + elapsed, self_time + elapsed - children)
+    def report(self, label="window shown", top=25):
+        self.uninstall()
+        elapsed = time.perf_counter() - self.start_time
+        total_imports = sum(self_time for _, self_time in self.records.values())
+        print(f"\n[profile-startup] {label} after {elapsed * 1000:.0f} ms, {total_imports * 1000:.0f} ms of it importing {len(self.records)} modules")
+        print(f"[profile-startup] {'cumulative ms':>14} {'self ms':>9}  module")
+        slowest = sorted(self.records.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        for name, (cumulative, self_time) in slowest:
+            print(f"[profile-startup] {cumulative * 1000:14.1f} {self_time * 1000:9.1f}  {name}")
+        packages = {}
+        for name, (_, self_time) in self.records.items():
+            package = name.split('.')[0]
+            packages[package] = packages.get(package, 0.0) + self_time
+        print(f"[profile-startup] {'self ms':>14}  package")
+        for package, self_time in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+            print(f"[profile-startup] {self_time * 1000:14.1f}  {package}")
@@ -0,0 +1,151 @@
+# synthesis_cache.py
+
+'''
+Content-addressed cache of synthesized sentences.
+
+The key is a sha256 over the normalized sentence, the TTS engine, the speaker settings that belong to that engine (and to the s2s engine when it is used) and the seed.  Settings that pick a voice file or folder also add the size and mtime of what they point at, so re-recording a reference clip under the same name misses the cache.  Entries are plain .wav files named after the key.  A hit is served with a file copy instead of inference.  Entries and sentence files are copied rather than hard linked, a linked sentence file would change the cache entry when it's regenerated and every hit would touch the mtime (and with it the export and audio info signatures) of the sentence files linked to it.
+
+Least recently used entries are evicted once the cache grows past its size budget.  File mtimes serve as the LRU clock, so no index file has to be rewritten on every hit.
+
+Sentences generated with a random seed (or a seed that isn't a number) are not cached unless "synthesis_cache_random_seeds" is enabled, since every generation is expected to sound different.
+'''
+
+import hashlib
+import json
+import os
+import time
+import unicodedata
+
+from audio_buffer import copy_file
+
+CACHE_FOLDER_NAME = "synthesis_cache"
+
+class SynthesisCache:
+    def __init__(self, cache_dir, max_bytes, cache_random_seeds=False, tts_config=None, s2s_config=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.cache_random_seeds = cache_random_seeds
+        self.engine_attributes = {}
+        # Parameters whose value names a file or folder under folder_path
+        self.voice_paths = {}
+        for engine in (tts_config or {}).get('tts_engines', []) + (s2s_config or {}).get('s2s_engines', []):
+            self.engine_attributes[engine['name'].lower()] = [param['attribute'] for param in engine.get('parameters', [])]
+            for param in engine.get('parameters', []):
+                if param.get('look_for') in ('files', 'folders') and param.get('folder_path'):
+                    self.voice_paths[param['attribute']] = (param['folder_path'], param.get('relies_on'))
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.total_bytes = sum(entry.stat().st_size for entry in os.scandir(self.cache_dir) if entry.name.endswith(".wav"))
+    def evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        entries = sorted(
+            (entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".wav")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        # Trim a little below the budget so that eviction doesn't run on every store
+        target = int(self.max_bytes * 0.9)
+        for entry in entries:
+            if self.total_bytes <= target:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self.total_bytes -= size
+            self.evictions += 1
+    def fetch(self, key, target_path):
+        if key is None:
+            self.bypassed += 1
+            return False
+        cache_path = self.path_for(key)
+        if not os.path.exists(cache_path):
+            self.misses += 1
+            return False
+        now = time.time()
+        os.utime(cache_path, (now, now))
+        copy_file(cache_path, target_path)
+        self.hits += 1
+        return True
+    def is_random_seed(self, voice_parameters, attributes):
+        for attribute in attributes:
+            if not attribute.endswith("_seed"):
+                continue
+            seed = voice_parameters.get(attribute)
+            if seed is None or seed == "":
+                return True
+            try:
+                seed = int(seed)
+            except (TypeError, ValueError):
+                return True
+            # StyleTTS treats a seed of 0 as random as well
+            if seed < 0 or (attribute == "stts_seed" and seed == 0):
+                return True
+        return False
+    def key_for(self, sentence, voice_parameters, s2s_validated):
+        tts_engine_name = voice_parameters.get('tts_engine', 'pyttsx3').lower()
+        attributes = list(self.engine_attributes.get(tts_engine_name, []))
+        if s2s_validated:
+            s2s_engine_name = (voice_parameters.get('s2s_engine') or "").lower()
+            attributes += self.engine_attributes.get(s2s_engine_name, [])
+        if self.is_random_seed(voice_parameters, attributes) and not self.cache_random_seeds:
+            return None
+        resolved = {attribute: voice_parameters.get(attribute) for attribute in attributes}
+        for attribute in attributes:
+            if attribute in self.voice_paths and voice_parameters.get(attribute):
+                resolved[f"{attribute}_signature"] = path_signature(self.voice_path(voice_parameters, attribute))
+        resolved['tts_engine'] = tts_engine_name
+        resolved['s2s_engine'] = voice_parameters.get('s2s_engine') if s2s_validated else None
+        payload = json.dumps(
+            {"sentence": normalize_sentence(sentence), "parameters": resolved},
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}.wav")
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "evictions": self.evictions,
+            "total_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes
+        }
+    def store(self, key, audio_path):
+        if key is None or not audio_path or not os.path.exists(audio_path):
+            return
+        cache_path = self.path_for(key)
+        if os.path.exists(cache_path):
+            return
+        copy_file(audio_path, cache_path)
+        self.total_bytes += os.path.getsize(cache_path)
+        self.evict()
+    def voice_path(self, voice_parameters, attribute):
+        folder_path, relies_on = self.voice_paths[attribute]
+        if relies_on:
+            folder_path = os.path.join(folder_path, str(voice_parameters.get(relies_on) or ""))
+        return os.path.join(folder_path, str(voice_parameters[attribute]))
+
+def normalize_sentence(sentence):
+    return " ".join(unicodedata.normalize("NFC", sentence).split())
+
+def path_signature(path):
+    # Size and mtime of a file, or of every file in a folder, None when it's missing
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+    if not os.path.isdir(path):
+        return None
+    signature = []
+    for root, folders, files in os.walk(path):
+        folders.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            stat = os.stat(file_path)
+            signature.append([os.path.relpath(file_path, path), stat.st_size, stat.st_mtime_ns])
+    return signature
@@ -0,0 +1,105 @@
+# text_segmenter.py
+
+'''
+Streaming sentence segmentation for loaded text files.
+
+The file is read line by line and sentences are yielded as soon as their line has been scanned, so a large book is never held in memory as one string or as a list of paragraphs.  By default every non-empty line containing a letter is one sentence, as it has been since v3.6.
+
+With "sentence_splitting" enabled in configs/settings.yaml, lines are also split after sentence-ending punctuation (. ! ? …) that is followed by the start of a new sentence.  A line is scanned once by a single compiled pattern for possible sentence ends, the brackets and quotes between two of them are counted with str.count instead of being walked character by character:
+    - no split after common abbreviations (Mr. Dr. e.g. ...) or a single initial (J. R. R. Tolkien)
+    - no split inside () or []
+    - closing quotes and brackets right after the punctuation stay with their sentence
+    - with "sentence_splitting_quote_aware", no split inside double quotes either, so a quoted passage of several sentences stays together with its speaker.  Single quotes are ignored since they can't be told apart from apostrophes.
+
+clean_sentences is the single-pass version of the old paragraph_to_sentence cleanup used by the word replacer's extra option.
+'''
+
+import re
+
+SENTENCE_END = r'[.!?…]+'
+CLOSERS = '"”’)]'
+# A sentence end (with any closers right after it) followed by whitespace and something that isn't an ascii lowercase letter, the rest is checked in split_line
+BOUNDARY_PATTERN = re.compile(r'{}[{}]*(?=\s+(?![a-z])(\S))'.format(SENTENCE_END, re.escape(CLOSERS)))
+ABBREVIATION_PATTERN = re.compile(
+    r'(?:\b(?:mr|mrs|ms|dr|prof|st|jr|sr|mt|vs|etc|no|vol|ch|fig|capt|col|gen|lt|sgt|rev|e\.g|i\.e)|(?<![^\W\d_])[A-Z])$',
+    re.IGNORECASE
+)
+ABBREVIATION_LOOKBEHIND = 6
+# Cleanup for the word replacer's extra option, see clean_sentences
+CLEANUP_TABLE = str.maketrans({
+    '[': None, ']': None, '*': None, '\\': None, '<': None, '>': None, '_': None, '"': None, '“': None, '”': None,
+    '\n': ' ', '-': ' ', '…': '-'
+})
+TITLE_REPLACEMENTS = {'Mr.': 'Mister', 'Mrs.': 'Misses', 'Ms.': 'Miz', 'Dr.': 'Doctor'}
+TITLE_PATTERN = re.compile('|'.join(re.escape(title) for title in sorted(TITLE_REPLACEMENTS, key=len, reverse=True)))
+CLEAN_SENTENCE_PATTERN = re.compile(r'[^.]*\.|[^.]+$')
+SPACES_PATTERN = re.compile(r' {2,}')
+
+def clean_sentences(paragraph):
+    '''
+    Removes brackets, quotes and other characters that make engines pause or read them out, spells out Mr./Mrs./Ms./Dr. and returns the sentences ending at each period, with a space before the period.
+    '''
+    paragraph = paragraph.translate(CLEANUP_TABLE)
+    paragraph = TITLE_PATTERN.sub(lambda match: TITLE_REPLACEMENTS[match.group()], paragraph)
+    paragraph = SPACES_PATTERN.sub(' ', paragraph)
+    sentences = []
+    for match in CLEAN_SENTENCE_PATTERN.finditer(paragraph):
+        piece = match.group()
+        if piece.endswith('.'):
+            piece = piece[:-1] + ' .'
+        sentence = SPACES_PATTERN.sub(' ', piece).strip()
+        if sentence and sentence != '.':
+            sentences.append(sentence)
+    return sentences
+
+def has_letter(text):
+    return any(map(str.isalpha, text))
+
+def iter_sentences(lines, split_sentences=False, quote_aware=False):
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if not split_sentences:
+            if has_letter(line):
+                yield line
+            continue
+        for sentence in split_line(line, quote_aware):
+            if has_letter(sentence):
+                yield sentence
+
+def read_sentences(file_path, split_sentences=False, quote_aware=False):
+    with open(file_path, 'r', encoding='utf-8') as file:
+        yield from iter_sentences(file, split_sentences, quote_aware)
+
+def split_line(line, quote_aware=False):
+    start = 0
+    scanned = 0
+    brackets = 0
+    in_straight_quote = False
+    in_curly_quote = False
+    for match in BOUNDARY_PATTERN.finditer(line):
+        end = match.end()
+        brackets = max(brackets + line.count('(', scanned, end) + line.count('[', scanned, end) - line.count(')', scanned, end) - line.count(']', scanned, end), 0)
+        if line.count('"', scanned, end) % 2:
+            in_straight_quote = not in_straight_quote
+        last_open = line.rfind('“', scanned, end)
+        last_close = line.rfind('”', scanned, end)
+        if last_open != last_close:
+            in_curly_quote = last_open > last_close
+        scanned = end
+        if brackets or (quote_aware and (in_straight_quote or in_curly_quote)):
+            continue
+        following = match.group(1)
+        if not (following.isupper() or following.isdigit() or following in '"“‘(['):
+            # Lowercase after the punctuation, e.g. '"Wait!" she said.'
+            continue
+        if line[match.start()] == '.' and ABBREVIATION_PATTERN.search(line, max(start, match.start() - ABBREVIATION_LOOKBEHIND), match.start()):
+            continue
+        sentence = line[start:end].strip()
+        if sentence:
+            yield sentence
+        start = end
+    sentence = line[start:].strip()
+    if sentence:
+        yield sentence
@@ -8,217 +8,110 @@ For example, let's take "speed" from f5tts.  It needs to be a decimal value but
 
 import importlib.util, os
 import json
-import numpy as np
-import soundfile as sf
+import threading
 import traceback
-try:
-    from tortoise_tts_api.inference.load import load_tts as load_tortoise_engine
-    from tortoise_tts_api.inference.generate import generate as tortoise_generate
-except Exception as e:
-    print(f"Tortoise not available, received error: {e}")
-    print("Full traceback:")
-    traceback.print_exc()
-    
-try:
-    from styletts_api.inference.load import load_all_models
-    from styletts_api.inference.generate import generate_audio as stts_generate
-except Exception as e:
-    print(f"StyleTTS not available, received error: {e}")
-    print("Full traceback:")
-    traceback.print_exc()
-try:
-    from f5_tts.api import F5TTS
-except Exception as e:
-    print(f"F5-TTS is not available, received error: {e}")
-    print("Full traceback:")
-    traceback.print_exc()
-try:
-    from GPT_SoVITS.TTS_infer_pack.TTS import TTS, TTS_Config
-except Exception as e:
-    print(f"GPT-SoVITS is not available, received error: {e}")
-    print("Full traceback:")
-    traceback.print_exc()
+from collections import namedtuple
+from types import MappingProxyType
+
+from audio_buffer import AudioBuffer
+
+# Engine packages are imported the first time an engine is loaded instead of here, so starting the app (or a project
+# that only uses pyttsx3) doesn't pull in torch and every model package.  These are the top level packages used to
+# check whether an engine is installed without importing it.
+ENGINE_PACKAGES = {
+    'pyttsx3': 'pyttsx3',
+    'styletts2': 'styletts_api',
+    'tortoise': 'tortoise_tts_api',
+    'f5tts': 'f5_tts',
+    'gpt_sovits': 'GPT_SoVITS'
+}
+
+TTS_CONFIG_PATH = "configs/tts_config.json"
+# Engines that can queue several sentences and generate them in one go
+BATCH_ENGINES = {'pyttsx3'}
 
 def generate_audio(tts_engine, sentence, voice_parameters, tts_engine_name, audio_path):
     tts_engine_name = tts_engine_name.lower()
+    # Resolved once per speaker and reused for every sentence, see get_generation_plan
+    plan = get_generation_plan(tts_engine_name, voice_parameters)
     if tts_engine_name == 'pyttsx3':
-        return generate_with_pyttsx3(tts_engine, sentence, voice_parameters, audio_path)
+        return generate_with_pyttsx3(tts_engine, sentence, plan, audio_path)
     elif tts_engine_name == 'styletts2':
-        return generate_with_styletts2(tts_engine, sentence, voice_parameters, audio_path)
+        return generate_with_styletts2(tts_engine, sentence, plan, audio_path)
     elif tts_engine_name == 'tortoise':
-        return generate_with_tortoise(tts_engine, sentence, voice_parameters, audio_path)
+        return generate_with_tortoise(tts_engine, sentence, plan, audio_path)
     elif tts_engine_name == 'xtts':
-        return generate_with_xtts(tts_engine, sentence, voice_parameters, audio_path)
+        return generate_with_xtts(tts_engine, sentence, plan, audio_path)
     elif tts_engine_name == 'f5tts':
-        return generate_with_f5tts(tts_engine, sentence, voice_parameters, audio_path)
+        return generate_with_f5tts(tts_engine, sentence, plan, audio_path)
     elif tts_engine_name == 'gpt_sovits':
-        return generate_with_gpt_sovits(tts_engine, sentence, voice_parameters, audio_path)
+        return generate_with_gpt_sovits(tts_engine, sentence, plan, audio_path)
     else:
         # Handle unknown engine
         return False
 
-def generate_with_pyttsx3(tts_engine, sentence, voice_parameters, audio_path):
-    import pyttsx3
-    engine = pyttsx3.init()
-    # Optionally set voice parameters here using voice_parameters
-    # e.g., engine.setProperty('rate', voice_parameters.get('rate', 200))
-    # Save the spoken sentence to an audio file
-    engine.save_to_file(sentence, audio_path)
-    engine.runAndWait()
-    return os.path.exists(audio_path)
+def generate_audio_batch(tts_engine, sentences_and_paths, voice_parameters, tts_engine_name):
+    '''
+    Generates several sentences of one speaker, returns the result of each like generate_audio does.  Engines that can queue work (pyttsx3) do the whole batch in one go, others generate sentence by sentence.
+    '''
+    tts_engine_name = tts_engine_name.lower()
+    if supports_batch(tts_engine_name):
+        plan = get_generation_plan(tts_engine_name, voice_parameters)
+        return generate_batch_with_pyttsx3(tts_engine, sentences_and_paths, plan)
+    return [generate_audio(tts_engine, sentence, voice_parameters, tts_engine_name, audio_path) for sentence, audio_path in sentences_and_paths]
 
-def generate_with_styletts2(tts_engine, sentence, voice_parameters, audio_path):
-    engine_name = "StyleTTS2" 
-    # Load the config and convert it to an object
-    tts_config = load_config("configs/tts_config.json")
-    tts_settings = dict_to_object(tts_config)
+def generate_with_pyttsx3(tts_engine, sentence, plan, audio_path):
+    return generate_batch_with_pyttsx3(tts_engine, [(sentence, audio_path)], plan)[0]
 
-    styletts_engine_config = None
-    for engine in tts_settings.tts_engines:
-        if engine.name.lower() == engine_name.lower():  # Case-insensitive matching
-            styletts_engine_config = engine
-            break
-        
-    voice_root = next((param.folder_path for param in styletts_engine_config.parameters if param.attribute == "stts_voice"))
+def generate_batch_with_pyttsx3(tts_engine, sentences_and_paths, plan):
+    engine = tts_engine.driver(plan)
+    # Every sentence is queued first so the driver only runs its event loop once for the whole batch
+    for sentence, audio_path in sentences_and_paths:
+        engine.save_to_file(sentence, audio_path)
+    engine.runAndWait()
+    return [os.path.exists(audio_path) for _, audio_path in sentences_and_paths]
 
-    voice = voice_parameters.get("stts_voice", None)
-    if not voice:
-        raise ("No voice found for StyleTTS")
-    reference_audio_file = voice_parameters.get("stts_reference_audio_file")
-    seed = int(voice_parameters.get("stts_seed"))
-    if not seed:
-        seed=-1
-    diffusion_steps = voice_parameters.get("stts_diffusion_steps")
-    
-    alpha_step = next((param.step for param in styletts_engine_config.parameters if param.attribute=="stts_alpha"), 100)
-    alpha = round(voice_parameters.get("stts_alpha", 70) / alpha_step, 2)
-    
-    beta_step = next((param.step for param in styletts_engine_config.parameters if param.attribute=="stts_beta"), 100)
-    beta = round(voice_parameters.get("stts_beta", 30) / beta_step, 2)
-    
-    embedding_scale_step = next((param.step for param in styletts_engine_config.parameters if param.attribute=="stts_embedding_scale"), 100)
-    embedding_scale = round(voice_parameters.get("stts_embedding_scale", 50) / embedding_scale_step, 2)
-    
+def generate_with_styletts2(tts_engine, sentence, plan, audio_path):
+    from styletts_api.inference.generate import generate_audio as stts_generate
     audio_path = stts_generate(
         text=sentence, 
-        voice=voice, 
-        reference_audio_file=reference_audio_file, 
-        seed=seed, 
-        diffusion_steps=diffusion_steps, 
-        alpha=alpha, 
-        beta=beta, 
-        embedding_scale=embedding_scale, 
         output_audio_path=audio_path,
         model_dict=tts_engine, 
-        voices_root=voice_root
+        **plan.values
         )
     return audio_path
 
-def generate_with_tortoise(tts_engine, sentence, voice_parameters, audio_path):
-    engine_name = "Tortoise" 
-    # Load the config and convert it to an object
-    tts_config = load_config("configs/tts_config.json")
-    tts_settings = dict_to_object(tts_config)
-
-    styletts_engine_config = None
-    for engine in tts_settings.tts_engines:
-        if engine.name.lower() == engine_name.lower():  # Case-insensitive matching
-            tortoise_engine_config = engine
-            break
+def generate_with_tortoise(tts_engine, sentence, plan, audio_path):
+    from tortoise_tts_api.inference.generate import generate as tortoise_generate
     if tts_engine is None:
         return False
-    voice = voice_parameters.get('voice', 'random')
-    sample_size = voice_parameters.get('sample_size', 4)
-    use_hifigan = voice_parameters.get('use_hifigan', False)
-    num_autoregressive_samples = sample_size
-    seed = voice_parameters.get("tortoise_seed", -1)
-    iterations = voice_parameters.get("tortoise_iterations", 25)
-    extra_voice_dirs = next((param.folder_path for param in tortoise_engine_config.parameters if param.attribute == "voice"), [])
-
     result = tortoise_generate(
         tts=tts_engine,
         text=sentence,
-        voice=voice,
-        seed=seed,
-        use_hifigan=use_hifigan,
-        num_autoregressive_samples=num_autoregressive_samples,
-        diffusion_iterations=iterations,
         audio_path=audio_path,
-        extra_voice_dirs=[extra_voice_dirs]
+        **plan.values
     )
     return os.path.exists(audio_path)
 
-def generate_with_xtts(tts_engine, sentence, voice_parameters, audio_path):
+def generate_with_xtts(tts_engine, sentence, plan, audio_path):
     # Implement xtts TTS engine generation here
     pass
 
-def generate_with_f5tts(tts_engine, sentence, voice_parameters, audio_path):
-    engine_name = "f5tts"
-    tts_settings = load_tts_config()
-    f5tts_engine_config = find_engine_config(engine_name, tts_settings)
-    
-    voice_name = voice_parameters.get("f5tts_voice")
-    ref_file_root = next((param.folder_path for param in f5tts_engine_config.parameters if param.attribute == "f5tts_voice" ))
-    
-    ref_file_path = os.path.join(ref_file_root, voice_name, f"{voice_name}.wav")
-    ref_text = os.path.join(ref_file_root, voice_name, f"{voice_name}.txt")
-    with open(ref_text, "r", encoding="utf-8") as f:
-        ref_text = f.readline()
-        
-
-    seed = voice_parameters.get("f5tts_seed", -1)
-    
-    speed_step = next((param.step for param in f5tts_engine_config.parameters if param.attribute=="f5tts_speed"), 100)
-    speed = round(voice_parameters.get("f5tts_speed") / speed_step, 2)
-    print(speed)
-
-        
-    tts_engine.infer(
-        ref_file=ref_file_path,
-        ref_text=ref_text,
+def generate_with_f5tts(tts_engine, sentence, plan, audio_path):
+    # Keep the samples in memory, they are written once when the sentence is finalized
+    wav, sr, _ = tts_engine.infer(
         gen_text=sentence,
-        file_wave=audio_path,
-        speed=speed,
-        seed=seed
+        file_wave=None,
+        **plan.values
     )
     
-    return audio_path
+    return AudioBuffer(wav, sr)
 
-def generate_with_gpt_sovits(tts_engine, sentence, voice_parameters, audio_path):
+def generate_with_gpt_sovits(tts_engine, sentence, plan, audio_path):
+    import numpy as np
     
-    tts_settings = load_tts_config()
-    gpt_sovits_engine_config = find_engine_config("gpt_sovits", tts_settings)
-    
-    voice_name = voice_parameters.get("gpt_sovits_voice")
-    voice_root_path = next(param.folder_path for param in gpt_sovits_engine_config.parameters if param.attribute == "gpt_sovits_voice")
-    voice_ref_audio_path = os.path.join(voice_root_path, voice_name, f"{voice_name}.wav")
-    voice_ref_text_path = os.path.join(voice_root_path, voice_name, f"{voice_name}.txt")
-    with open(voice_ref_text_path, "r", encoding="utf-8") as f:
-        voice_ref_text_transcript = f.readline()
-    
-    top_k_steps = next((param.step for param in gpt_sovits_engine_config.parameters if param.attribute=="gpt_sovits_top_k"), 500)
-    top_k = int(round(voice_parameters.get("gpt_sovits_top_k") / top_k_steps, 2))
-    
-    top_p_steps = next((param.step for param in gpt_sovits_engine_config.parameters if param.attribute=="gpt_sovits_top_p"), 100)
-    top_p = round(voice_parameters.get("gpt_sovits_top_p") / top_p_steps, 2)
-    
-    temperature_steps = next((param.step for param in gpt_sovits_engine_config.parameters if param.attribute=="gpt_sovits_temperature"), 100)
-    temperature = round(voice_parameters.get("gpt_sovits_temperature") / temperature_steps, 2)
-    
-    sample_steps = voice_parameters.get("gpt_sovits_sample_steps")
-    
-    inputs = {
-        "text": sentence,
-        "text_lang" : voice_parameters.get("gpt_sovits_output_lang"),
-        "ref_audio_path": voice_ref_audio_path,
-        "prompt_text": voice_ref_text_transcript,
-        "prompt_lang" : voice_parameters.get("gpt_sovits_ref_lang"),
-        "seed": voice_parameters.get("gpt_sovits_seed"),
-        "top_k" : top_k,
-        "top_p" : top_p,
-        "temperature" : temperature,
-        "sample_steps" : sample_steps
-    }
+    inputs = dict(plan.values)
+    inputs["text"] = sentence
     
     gen = tts_engine.run(inputs)
     
@@ -229,9 +122,146 @@ def generate_with_gpt_sovits(tts_engine, sentence, voice_parameters, audio_path)
         fragments.append(fragment)
 
     combined_audio = np.concatenate(fragments, axis=0)
-    sf.write(audio_path, combined_audio, sr)
     
-    return audio_path
+    return AudioBuffer(combined_audio, sr)
+
+#################################################
+############### Generation Plans ################
+#################################################
+
+# A generation plan holds everything an engine's generate function needs apart from the sentence itself: folder paths
+# resolved from tts_config.json, slider values divided by their step and the reference transcript read from disk.
+# Plans are cached per engine and speaker settings and rebuilt when tts_config.json or a file they read changes.
+GenerationPlan = namedtuple("GenerationPlan", ["engine_name", "values", "sources"])
+MAX_GENERATION_PLANS = 64
+_generation_plans = {}
+
+def get_generation_plan(tts_engine_name, voice_parameters, config_path=TTS_CONFIG_PATH):
+    key = (tts_engine_name, config_path, json.dumps(voice_parameters, sort_keys=True, default=str))
+    plan = _generation_plans.get(key)
+    if plan is not None and is_plan_current(plan):
+        return plan
+    plan = compile_generation_plan(tts_engine_name, voice_parameters, config_path)
+    _generation_plans.pop(key, None)
+    if len(_generation_plans) >= MAX_GENERATION_PLANS:
+        # Oldest plan first, dicts keep insertion order
+        _generation_plans.pop(next(iter(_generation_plans)))
+    _generation_plans[key] = plan
+    return plan
+
+def compile_generation_plan(tts_engine_name, voice_parameters, config_path=TTS_CONFIG_PATH):
+    tts_engine_name = tts_engine_name.lower()
+    sources = {config_path: file_mtime(config_path)}
+    tts_settings = load_tts_config(config_path)
+    if tts_engine_name == 'pyttsx3':
+        values = plan_pyttsx3(voice_parameters)
+    elif tts_engine_name == 'styletts2':
+        values = plan_styletts2(find_engine_config("StyleTTS2", tts_settings), voice_parameters)
+    elif tts_engine_name == 'tortoise':
+        values = plan_tortoise(find_engine_config("Tortoise", tts_settings), voice_parameters)
+    elif tts_engine_name == 'f5tts':
+        values = plan_f5tts(find_engine_config("f5tts", tts_settings), voice_parameters, sources)
+    elif tts_engine_name == 'gpt_sovits':
+        values = plan_gpt_sovits(find_engine_config("gpt_sovits", tts_settings), voice_parameters, sources)
+    else:
+        values = {}
+    return GenerationPlan(tts_engine_name, MappingProxyType(values), tuple(sources.items()))
+
+def is_plan_current(plan):
+    return all(file_mtime(path) == mtime for path, mtime in plan.sources)
+
+def plan_pyttsx3(voice_parameters):
+    voice = voice_parameters.get("pyttsx3_voice")
+    if voice == "Default":
+        voice = None
+    rate = voice_parameters.get("rate")
+    volume = voice_parameters.get("volume")
+    return {
+        "rate": int(rate) if rate is not None else None,
+        # The spinbox goes from 0 to 100, pyttsx3 wants 0.0 to 1.0
+        "volume": volume / 100 if volume is not None else None,
+        "voice": voice
+    }
+
+def plan_styletts2(styletts_engine_config, voice_parameters):
+    parameters = engine_parameters(styletts_engine_config)
+    voice = voice_parameters.get("stts_voice", None)
+    if not voice:
+        raise ValueError("No voice found for StyleTTS")
+    seed = int(voice_parameters.get("stts_seed"))
+    if not seed:
+        seed=-1
+    return {
+        "voice": voice,
+        "reference_audio_file": voice_parameters.get("stts_reference_audio_file"),
+        "seed": seed,
+        "diffusion_steps": voice_parameters.get("stts_diffusion_steps"),
+        "alpha": round(voice_parameters.get("stts_alpha", 70) / parameter_step(parameters, "stts_alpha"), 2),
+        "beta": round(voice_parameters.get("stts_beta", 30) / parameter_step(parameters, "stts_beta"), 2),
+        "embedding_scale": round(voice_parameters.get("stts_embedding_scale", 50) / parameter_step(parameters, "stts_embedding_scale"), 2),
+        "voices_root": parameters["stts_voice"].folder_path
+    }
+
+def plan_tortoise(tortoise_engine_config, voice_parameters):
+    parameters = engine_parameters(tortoise_engine_config)
+    extra_voice_dirs = getattr(parameters.get("voice"), "folder_path", [])
+    return {
+        "voice": voice_parameters.get('voice', 'random'),
+        "seed": voice_parameters.get("tortoise_seed", -1),
+        "use_hifigan": voice_parameters.get('use_hifigan', False),
+        "num_autoregressive_samples": voice_parameters.get('sample_size', 4),
+        "diffusion_iterations": voice_parameters.get("tortoise_iterations", 25),
+        "extra_voice_dirs": [extra_voice_dirs]
+    }
+
+def plan_f5tts(f5tts_engine_config, voice_parameters, sources):
+    parameters = engine_parameters(f5tts_engine_config)
+    voice_name = voice_parameters.get("f5tts_voice")
+    ref_file_root = parameters["f5tts_voice"].folder_path
+    ref_file_path = os.path.join(ref_file_root, voice_name, f"{voice_name}.wav")
+    ref_text = read_reference_text(os.path.join(ref_file_root, voice_name, f"{voice_name}.txt"), sources)
+    speed = round(voice_parameters.get("f5tts_speed") / parameter_step(parameters, "f5tts_speed"), 2)
+    return {
+        "ref_file": ref_file_path,
+        "ref_text": ref_text,
+        "speed": speed,
+        "seed": voice_parameters.get("f5tts_seed", -1)
+    }
+
+def plan_gpt_sovits(gpt_sovits_engine_config, voice_parameters, sources):
+    parameters = engine_parameters(gpt_sovits_engine_config)
+    voice_name = voice_parameters.get("gpt_sovits_voice")
+    voice_root_path = parameters["gpt_sovits_voice"].folder_path
+    voice_ref_audio_path = os.path.join(voice_root_path, voice_name, f"{voice_name}.wav")
+    voice_ref_text_transcript = read_reference_text(os.path.join(voice_root_path, voice_name, f"{voice_name}.txt"), sources)
+    return {
+        "text_lang" : voice_parameters.get("gpt_sovits_output_lang"),
+        "ref_audio_path": voice_ref_audio_path,
+        "prompt_text": voice_ref_text_transcript,
+        "prompt_lang" : voice_parameters.get("gpt_sovits_ref_lang"),
+        "seed": voice_parameters.get("gpt_sovits_seed"),
+        "top_k" : int(round(voice_parameters.get("gpt_sovits_top_k") / parameter_step(parameters, "gpt_sovits_top_k", 500), 2)),
+        "top_p" : round(voice_parameters.get("gpt_sovits_top_p") / parameter_step(parameters, "gpt_sovits_top_p"), 2),
+        "temperature" : round(voice_parameters.get("gpt_sovits_temperature") / parameter_step(parameters, "gpt_sovits_temperature"), 2),
+        "sample_steps" : voice_parameters.get("gpt_sovits_sample_steps")
+    }
+
+def engine_parameters(engine_config):
+    return {param.attribute: param for param in engine_config.parameters}
+
+def parameter_step(parameters, attribute, default=100):
+    return getattr(parameters.get(attribute), "step", default)
+
+def read_reference_text(path, sources):
+    sources[path] = file_mtime(path)
+    with open(path, "r", encoding="utf-8") as f:
+        return f.readline()
+
+def file_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
     
 #################################################
 ############### Loading Functions ###############
@@ -240,8 +270,10 @@ def generate_with_gpt_sovits(tts_engine, sentence, voice_parameters, audio_path)
 def load_tts_engine(tts_engine_name, **kwargs):
     tts_engine_name = tts_engine_name.lower()
     try:
+        if tts_engine_name in ENGINE_PACKAGES and not is_engine_available(tts_engine_name):
+            raise ImportError(f"{tts_engine_name} is not installed, the '{ENGINE_PACKAGES[tts_engine_name]}' package could not be found")
         if tts_engine_name == 'pyttsx3':
-            return None  # pyttsx3 doesn't require loading
+            return load_with_pyttsx3(**kwargs)
         elif tts_engine_name == 'styletts2':
             return load_with_styletts2(**kwargs)
         elif tts_engine_name == 'tortoise':
@@ -259,7 +291,56 @@ def load_tts_engine(tts_engine_name, **kwargs):
         # Re-raise the exception to be caught by the worker thread
         raise e
 
+class Pyttsx3Engine:
+    '''
+    Keeps one pyttsx3 driver alive between sentences instead of starting it for every sentence.  Drivers like SAPI5 can only be used from the thread that created them, so a new one is started when the engine is used from another thread (e.g. a regeneration after a generation run).
+    '''
+    def __init__(self):
+        self.engine = None
+        self.thread_id = None
+        self.applied = {}
+    def driver(self, plan):
+        import pyttsx3
+        # Going back to a default (None) value needs a fresh driver, pyttsx3 can't unset a property
+        reset = any(value is None and self.applied.get(name) is not None for name, value in plan.values.items())
+        if self.engine is None or self.thread_id != threading.get_ident() or reset:
+            # pyttsx3.init() hands back the existing engine while a reference to it is alive
+            self.engine = None
+            self.engine = pyttsx3.init()
+            self.thread_id = threading.get_ident()
+            self.applied = {}
+        for name, value in plan.values.items():
+            if self.applied.get(name) == value:
+                continue
+            if name == 'voice':
+                value = find_pyttsx3_voice_id(self.engine, value)
+            if value is not None:
+                self.engine.setProperty(name, value)
+            self.applied[name] = plan.values[name]
+        return self.engine
+
+def find_pyttsx3_voice_id(engine, voice_name):
+    if not voice_name:
+        return None
+    for voice in engine.getProperty('voices'):
+        if voice.name == voice_name or voice.id == voice_name:
+            return voice.id
+    print(f"pyttsx3 voice '{voice_name}' not found, using the default voice")
+    return None
+
+def list_pyttsx3_voices():
+    try:
+        import pyttsx3
+        return [voice.name for voice in pyttsx3.init().getProperty('voices')]
+    except Exception as e:
+        print(f"Could not list pyttsx3 voices: {e}")
+        return []
+
+def load_with_pyttsx3(**kwargs):
+    return Pyttsx3Engine()
+
 def load_with_styletts2(**kwargs):
+    from styletts_api.inference.load import load_all_models
     engine_name = "StyleTTS2" 
     tts_settings = load_tts_config()
     styletts_engine_config = find_engine_config(engine_name, tts_settings)
@@ -277,6 +358,7 @@ def load_with_styletts2(**kwargs):
     return model_dict
 
 def load_with_tortoise(**kwargs):
+    from tortoise_tts_api.inference.load import load_tts as load_tortoise_engine
     engine_name = "Tortoise" 
     tts_settings = load_tts_config()
     tortoise_engine_config = find_engine_config(engine_name, tts_settings)
@@ -315,6 +397,7 @@ def load_with_xtts(**kwargs):
     pass
 
 def load_with_f5tts(**kwargs):
+    from f5_tts.api import F5TTS
     engine_name = "f5tts"
     tts_settings = load_tts_config()
     f5tts_engine_config = find_engine_config(engine_name, tts_settings)
@@ -355,6 +438,7 @@ def load_with_f5tts(**kwargs):
     return model
 
 def load_with_gpt_sovits(**kwargs):
+    from GPT_SoVITS.TTS_infer_pack.TTS import TTS, TTS_Config
     tts_settings = load_tts_config()
     gpt_sovits_engine_config = find_engine_config("gpt_sovits", tts_settings)
     version = kwargs.get("gpt_sovits_version")
@@ -420,15 +504,45 @@ def load_with_gpt_sovits(**kwargs):
 ############### Utility Functions ###############
 #################################################
 
+def configure_espeak():
+    # Points phonemizer at the bundled espeak NG, only checks that styletts2 is installed so torch isn't loaded yet
+    if importlib.util.find_spec("styletts2") is None:
+        return
+    espeak_path = os.path.join(os.path.dirname(__file__), '..', 'espeak NG')
+    os.environ['PHONEMIZER_ESPEAK_PATH'] = espeak_path
+    os.environ['PHONEMIZER_ESPEAK_LIBRARY'] = os.path.join(espeak_path, 'libespeak-ng.dll')
+    os.environ['ESPEAK_DATA_PATH'] = os.path.join(espeak_path, 'espeak-ng-data')
+
+def is_engine_available(tts_engine_name):
+    package = ENGINE_PACKAGES.get(tts_engine_name.lower())
+    if package is None:
+        return False
+    try:
+        return importlib.util.find_spec(package) is not None
+    except (ImportError, ValueError):
+        traceback.print_exc()
+        return False
+
+def supports_batch(tts_engine_name):
+    return tts_engine_name.lower() in BATCH_ENGINES
+
+_tts_config_cache = {}
+
 def find_engine_config(engine_name, tts_settings):
     for engine in tts_settings.tts_engines:
         if engine.name.lower() == engine_name.lower():
             engine_config = engine
             return engine_config
 
-def load_tts_config(path="configs/tts_config.json"):
+def load_tts_config(path=TTS_CONFIG_PATH):
+    # Parsed once and reused until the file changes, callers only read from it
+    mtime = file_mtime(path)
+    cached = _tts_config_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
     tts_config = load_config(path)
     tts_settings = dict_to_object(tts_config)
+    _tts_config_cache[path] = (mtime, tts_settings)
     return tts_settings
 
 def load_config(config_path):
@@ -5,10 +5,11 @@ from PySide6.QtWidgets import (
     QSlider, QWidgetAction, QComboBox, QApplication, QMainWindow, QPushButton,
     QVBoxLayout, QLineEdit, QLabel, QWidget, QMessageBox, QCheckBox,
     QHeaderView, QProgressBar, QGridLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QFileDialog, QScrollArea,
-    QSizePolicy, QSpinBox, QSplitter, QDialog, QListWidget, QListWidgetItem, QColorDialog, QMenu, QAbstractItemView, QStyledItemDelegate, QPlainTextEdit
+    QSizePolicy, QSpinBox, QSplitter, QDialog, QListWidget, QListWidgetItem, QColorDialog, QMenu, QAbstractItemView, QStyledItemDelegate, QPlainTextEdit,
+    QTableView, QStyle, QStyleOptionButton
 )
 from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
-from PySide6.QtCore import Signal, Qt, QUrl, QSize
+from PySide6.QtCore import Signal, Qt, QUrl, QSize, QAbstractTableModel, QModelIndex, QEvent, QRect, QTimer
 from PySide6.QtGui import QPixmap, QAction, QScreen, QTextOption, QGuiApplication
 
 import os
@@ -24,6 +25,8 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtGui import QColor
 
+from gapless_playback import GaplessPlayer
+
 class SpeakerManagementDialog(QDialog):
     def __init__(self, parent=None, speakers=None):
         super().__init__(parent)
@@ -92,7 +95,7 @@ class SpeakerManagementDialog(QDialog):
             if ok and speaker_name:
                 speaker['name'] = speaker_name
                 # Let user select a color
-                color = QColorDialog.getColor(initial=speaker.get('color', Qt.black))
+                color = QColorDialog.getColor(initial=QColor(speaker.get('color', Qt.black)))
                 if color.isValid():
                     speaker['color'] = color
                 self.populate_speaker_list()
@@ -154,6 +157,154 @@ class MultiLineDelegate(QStyledItemDelegate):
         # Fill the entire cell
         editor.setGeometry(option.rect)
 
+class CheckBoxDelegate(QStyledItemDelegate):
+    # Paints a centered checkbox for the check state of the cell, no widget is created per row.  The parent table's style is used, so the stylesheet applies.
+    def check_box_rect(self, option):
+        style = self.parent().style()
+        rect = QRect(0, 0, style.pixelMetric(QStyle.PM_IndicatorWidth), style.pixelMetric(QStyle.PM_IndicatorHeight))
+        rect.moveCenter(option.rect.center())
+        return rect
+
+    def editorEvent(self, event, model, option, index):
+        if not index.flags() & Qt.ItemIsUserCheckable:
+            return False
+        if event.type() == QEvent.MouseButtonRelease:
+            if event.button() != Qt.LeftButton or not self.check_box_rect(option).contains(event.position().toPoint()):
+                return False
+        elif event.type() == QEvent.MouseButtonDblClick:
+            # Swallowed so a double click doesn't toggle twice
+            return self.check_box_rect(option).contains(event.position().toPoint())
+        elif event.type() != QEvent.KeyPress or event.key() not in (Qt.Key_Space, Qt.Key_Select):
+            return False
+        checked = index.data(Qt.CheckStateRole) == Qt.Checked
+        return model.setData(index, Qt.Unchecked if checked else Qt.Checked, Qt.CheckStateRole)
+
+    def paint(self, painter, option, index):
+        table = self.parent()
+        style = table.style()
+        # Only the selection background and the checkbox are drawn, initStyleOption isn't needed for either
+        style.drawPrimitive(QStyle.PE_PanelItemViewItem, option, painter, table)
+        check_option = QStyleOptionButton()
+        check_option.rect = self.check_box_rect(option)
+        check_option.state = QStyle.State_Enabled | (QStyle.State_On if index.data(Qt.CheckStateRole) == Qt.Checked else QStyle.State_Off)
+        style.drawControl(QStyle.CE_CheckBox, check_option, painter, table)
+
+class SentenceTableModel(QAbstractTableModel):
+    '''
+    Table model over the book's text_audio_map.  Cells are read from the map when the table paints them, so a book of any length only costs what's on screen.  Edits and checkbox toggles are passed on as signals, the controller updates the map.
+    '''
+    SENTENCE_COLUMN, SPEAKER_COLUMN, REGEN_COLUMN, DELETE_COLUMN = range(4)
+    HEADERS = ['Sentence', 'Speaker', 'Regen?', 'Delete']
+
+    regen_toggled = Signal(int, bool)
+    sentence_edited = Signal(int, str)
+
+    def __init__(self, speaker_color, parent=None):
+        super().__init__(parent)
+        self.text_audio_map = {}
+        self.row_count = 0
+        self.speaker_name = None
+        self.speaker_color = speaker_color
+        self.delete_rows = set()
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        entry = self.text_audio_map.get(str(index.row()))
+        if entry is None:
+            return None
+        column = index.column()
+        if column == self.SENTENCE_COLUMN:
+            if role in (Qt.DisplayRole, Qt.EditRole):
+                return entry['sentence']
+            if role == Qt.BackgroundRole:
+                return self.speaker_color(entry.get('speaker_id', 1))
+        elif column == self.SPEAKER_COLUMN:
+            if role == Qt.DisplayRole:
+                try:
+                    return self.speaker_name(entry.get('speaker_id', 1))
+                except KeyError:
+                    return str(entry.get('speaker_id', 1))
+            if role == Qt.TextAlignmentRole:
+                return Qt.AlignCenter
+        elif role == Qt.CheckStateRole:
+            if column == self.REGEN_COLUMN:
+                checked = entry.get('regen', False)
+            else:
+                checked = index.row() in self.delete_rows
+            return Qt.Checked if checked else Qt.Unchecked
+        return None
+
+    def flags(self, index):
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == self.SENTENCE_COLUMN:
+            flags |= Qt.ItemIsEditable
+        elif index.column() in (self.REGEN_COLUMN, self.DELETE_COLUMN):
+            flags |= Qt.ItemIsUserCheckable
+        return flags
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def refresh_rows(self, first_row, last_row):
+        first_row = max(first_row, 0)
+        last_row = min(last_row, self.row_count - 1)
+        if first_row <= last_row:
+            self.dataChanged.emit(self.index(first_row, 0), self.index(last_row, len(self.HEADERS) - 1))
+
+    def remove_rows(self, first_row, last_row):
+        # The rows were already removed from text_audio_map, the ones after them moved up
+        count = last_row - first_row + 1
+        self.beginRemoveRows(QModelIndex(), first_row, last_row)
+        self.row_count -= count
+        self.delete_rows = {row if row < first_row else row - count for row in self.delete_rows if not first_row <= row <= last_row}
+        self.endRemoveRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+
+    def set_sentences(self, text_audio_map, speaker_name):
+        self.speaker_name = speaker_name
+        # The same book with the same rows is only repainted, which keeps the selection, scroll position and row heights
+        if text_audio_map is self.text_audio_map and len(text_audio_map) == self.row_count:
+            if self.row_count:
+                self.dataChanged.emit(self.index(0, 0), self.index(self.row_count - 1, len(self.HEADERS) - 1))
+            return
+        self.beginResetModel()
+        self.text_audio_map = text_audio_map
+        self.row_count = len(text_audio_map)
+        self.delete_rows.clear()
+        self.endResetModel()
+
+    def setData(self, index, value, role=Qt.EditRole):
+        row = index.row()
+        column = index.column()
+        if column == self.SENTENCE_COLUMN and role == Qt.EditRole:
+            if value == self.data(index, Qt.EditRole):
+                return False
+            self.sentence_edited.emit(row, value)
+        elif column == self.REGEN_COLUMN and role == Qt.CheckStateRole:
+            self.regen_toggled.emit(row, Qt.CheckState(value) == Qt.Checked)
+        elif column == self.DELETE_COLUMN and role == Qt.CheckStateRole:
+            if Qt.CheckState(value) == Qt.Checked:
+                self.delete_rows.add(row)
+            else:
+                self.delete_rows.discard(row)
+        else:
+            return False
+        self.dataChanged.emit(index, index)
+        return True
+
+    def take_delete_rows(self):
+        rows = sorted(self.delete_rows)
+        self.delete_rows.clear()
+        if rows:
+            self.dataChanged.emit(self.index(rows[0], self.DELETE_COLUMN), self.index(rows[-1], self.DELETE_COLUMN))
+        return rows
+
 class UploadDialog(QDialog):
     upload_requested = Signal(str, list)
     def __init__(self, parent=None, engines_list=None):
@@ -703,6 +854,10 @@ class AudiobookMakerView(QMainWindow):
         self.indices = []
         self.media_player.mediaStatusChanged.connect(self.on_audio_finished)
         self.current_audio_path = None  # Track the current audio file being played
+        # "Play All from Selected" streams through one audio sink, see gapless_playback
+        self.gapless_player = GaplessPlayer(self)
+        self.gapless_player.segment_started.connect(self.on_segment_started)
+        self.gapless_player.finished.connect(self.on_sequence_finished)
         self.word_replacer_window = None
         
         self.speakers_updated.connect(self.update_speaker_selection_combo)
@@ -833,6 +988,8 @@ class AudiobookMakerView(QMainWindow):
         self.search_across_sentences.setChecked(False)
         
         # QComboBoxes
+        self.export_format_combo = QComboBox()
+        self.export_format_combo.addItems(["mp3", "m4b", "wav", "flac"])
         self.s2s_engine_combo = QComboBox()
         self.s2s_engine_combo.currentTextChanged.connect(self.on_s2s_engine_changed)
         self.speaker_selection_combo = QComboBox()
@@ -851,6 +1008,7 @@ class AudiobookMakerView(QMainWindow):
         estimated_width = len(max_pause) * 50
         self.export_pause_value_label = QLabel(f"{pause / 10}")
         self.export_pause_value_label.setFixedWidth(estimated_width)
+        self.export_format_label = QLabel("Export Format: ")
         self.export_pause_label = QLabel("Pause Between Sentences (sec): ")
         self.s2s_engine_label = QLabel("S2S Engine: ")
         self.speaker_selection_label = QLabel("Current Speaker: ")
@@ -896,22 +1054,30 @@ class AudiobookMakerView(QMainWindow):
         self.go_to_sentence_input.setMinimum(1)
         self.go_to_sentence_input.setMaximum(2**31 - 1) # necessary so that the field has a decent size
 
-        # QTableWidget
-        self.tableWidget = QTableWidget(self)
-        self.tableWidget.itemChanged.connect(self.handle_sentence_changed)
-        self.tableWidget.setColumnCount(4)
-        self.tableWidget.setHorizontalHeaderLabels(['Sentence', 'Speaker', 'Regen?', 'Delete'])
-        self.tableWidget.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
-        self.tableWidget.setSelectionBehavior(QAbstractItemView.SelectRows)
-        self.tableWidget.setSelectionMode(QAbstractItemView.SingleSelection)
-        self.tableWidget.setColumnHidden(3, True)
-        self.tableWidget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)  # Allow table to expand
-        self.tableWidget.setWordWrap(True)
-        self.tableWidget.verticalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
-        self.tableWidget.setColumnWidth(1, 150)  # Speaker
-        self.tableWidget.setColumnWidth(2, 100)  # Regen
-        self.tableWidget.setColumnWidth(3, 100)  # Delete
-        self.tableWidget.setContextMenuPolicy(Qt.CustomContextMenu)
+        # QTableView, rows are painted from text_audio_map by SentenceTableModel
+        self.sentence_table_model = SentenceTableModel(self.get_speaker_color, self)
+        self.sentence_table_model.sentence_edited.connect(self.handle_sentence_changed)
+        self.sentence_table_model.regen_toggled.connect(self.regen_checkbox_toggled)
+        self.table_view = QTableView(self)
+        self.table_view.setModel(self.sentence_table_model)
+        self.table_view.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table_view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table_view.setColumnHidden(3, True)
+        self.table_view.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)  # Allow table to expand
+        self.table_view.setWordWrap(True)
+        self.table_view.setColumnWidth(1, 150)  # Speaker
+        self.table_view.setColumnWidth(2, 100)  # Regen
+        self.table_view.setColumnWidth(3, 100)  # Delete
+        self.table_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        # Row heights are fitted to their text only for the rows in view, see resize_table
+        self.resize_rows_timer = QTimer(self)
+        self.resize_rows_timer.setSingleShot(True)
+        self.resize_rows_timer.timeout.connect(self.resize_table)
+        self.table_view.verticalScrollBar().valueChanged.connect(self.schedule_resize_table)
+        self.table_view.horizontalHeader().sectionResized.connect(self.schedule_resize_table)
+        self.sentence_table_model.modelReset.connect(self.schedule_resize_table)
+        self.sentence_table_model.dataChanged.connect(self.schedule_resize_table)
 
         # QWidgetActions
         slider_action = QWidgetAction(self)
@@ -942,8 +1108,11 @@ class AudiobookMakerView(QMainWindow):
         self.tools_menu.addAction(self.word_replacer_action)
 
         ### Object/widget dependent "sets"
-        delegate = MultiLineDelegate(self.tableWidget)
-        self.tableWidget.setItemDelegateForColumn(0, delegate)
+        delegate = MultiLineDelegate(self.table_view)
+        self.table_view.setItemDelegateForColumn(0, delegate)
+        check_box_delegate = CheckBoxDelegate(self.table_view)
+        self.table_view.setItemDelegateForColumn(2, check_box_delegate)
+        self.table_view.setItemDelegateForColumn(3, check_box_delegate)
 
         self.s2s_options_widget.setLayout(self.s2s_options_layout)        
         self.s2s_options_scroll_area.setWidget(self.s2s_options_widget)
@@ -955,6 +1124,8 @@ class AudiobookMakerView(QMainWindow):
         self.export_pause_layout.addWidget(self.export_pause_label)
         self.export_pause_layout.addWidget(self.export_pause_slider)
         self.export_pause_layout.addWidget(self.export_pause_value_label)
+        self.export_pause_layout.addWidget(self.export_format_label)
+        self.export_pause_layout.addWidget(self.export_format_combo)
 
         self.generation_buttons_layout.addWidget(self.start_generation_button)
         self.generation_buttons_layout.addWidget(self.stop_generation_button)
@@ -973,7 +1144,7 @@ class AudiobookMakerView(QMainWindow):
         self.tts_engine_layout.addWidget(self.tts_engine_label)
         self.tts_engine_layout.addWidget(self.tts_engine_combo, 1)
 
-        sentence_area.addWidget(self.tableWidget)
+        sentence_area.addWidget(self.table_view)
 
         right_layout.addLayout(self.audiobook_label_layout)
         
@@ -1025,60 +1196,13 @@ class AudiobookMakerView(QMainWindow):
         width, height = self.get_window_size()
         self.setGeometry(100, 100, int(width), int(height))
         
-    def add_table_item(self, row, text, speaker_name, regen_state=False, delete_state=False):
-        self.tableWidget.blockSignals(True)
-        # Ensure the table has enough rows
-        current_row_count = self.tableWidget.rowCount()
-        if current_row_count <= row:
-            self.tableWidget.setRowCount(row + 1)
-            
-        # 1) Sentence column
-        sentence_item = QTableWidgetItem(text)
-        sentence_item.setText(text)
-        
-        # 2) Speaker column
-        speaker_item = QTableWidgetItem(speaker_name)
-        speaker_item.setFlags(speaker_item.flags() & ~Qt.ItemIsEditable)
-        speaker_item.setTextAlignment(Qt.AlignCenter)
-        
-        # 3) Regen? column (checkbox)
-        regen_check_box = QCheckBox()
-        regen_check_box.setChecked(regen_state)
-        regen_check_box_widget = QWidget()
-        regen_check_box_layout = QHBoxLayout(regen_check_box_widget)
-        regen_check_box_layout.setContentsMargins(0, 0, 0, 0)
-        regen_check_box_layout.setAlignment(Qt.AlignCenter)
-        regen_check_box_layout.addWidget(regen_check_box)
-        
-        regen_check_box.stateChanged.connect(
-            lambda state, row=row: self.regen_checkbox_toggled.emit(row, bool(state))
-        )
-        
-        # 4) Delete column (checkbox)
-        delete_check_box = QCheckBox()
-        delete_check_box.setChecked(delete_state)
-        delete_check_box_widget = QWidget()
-        delete_check_box_layout = QHBoxLayout(delete_check_box_widget)
-        delete_check_box_layout.setContentsMargins(0, 0, 0, 0)
-        delete_check_box_layout.setAlignment(Qt.AlignCenter)
-        delete_check_box_layout.addWidget(delete_check_box)
-        
-        self.tableWidget.setItem(row, 0, sentence_item)
-        self.tableWidget.setItem(row, 1, speaker_item)
-        self.tableWidget.setCellWidget(row, 2, regen_check_box_widget)
-        self.tableWidget.setCellWidget(row, 3, delete_check_box_widget)
-        
-        # self.tableWidget.resizeRowToContents(row)
-        self.tableWidget.blockSignals(False)
-
     def ask_question(self, title, question, buttons=QMessageBox.Yes | QMessageBox.No, default_button=QMessageBox.No):
         reply = QMessageBox.question(self, title, question, buttons, default_button)
         return reply == QMessageBox.Yes
     def assign_speaker_to_selected(self, speaker_id, speaker_name):
-        selected_rows = self.tableWidget.selectionModel().selectedRows()
+        selected_rows = self.table_view.selectionModel().selectedRows()
         for index in selected_rows:
             row = index.row()
-            self.set_row_speaker(row, speaker_id, speaker_name)
             self.sentence_speaker_changed.emit(row, speaker_id)
     
     def browse_file(self, widget, param):
@@ -1095,7 +1219,7 @@ class AudiobookMakerView(QMainWindow):
                 self.clear_layout(item.layout())
                 item.layout().deleteLater()  
     def clear_table(self):
-        self.tableWidget.setRowCount(0)
+        self.sentence_table_model.set_sentences({}, None)
     def create_widget_for_parameter(self, param):
         layout = QHBoxLayout()
         label = QLabel(param['label'] + ": ")
@@ -1326,6 +1450,10 @@ class AudiobookMakerView(QMainWindow):
         elif look_for == 'custom':
             for item in custom_options:
                 items.append(item)
+        elif look_for == 'pyttsx3_voices':
+            # Voices installed on the system, only looked up when the pyttsx3 settings are shown
+            import tts_engines
+            items.extend(tts_engines.list_pyttsx3_voices())
         else:
             self.show_message("Error", f"Invalid look_for value: {look_for}", QMessageBox.Warning)
             return items
@@ -1340,25 +1468,8 @@ class AudiobookMakerView(QMainWindow):
         else:
             return 1  # Default speaker
     def get_deletion_checkboxes(self):
-        checked_rows = []
-        delete_column = 3  # table col
-
-        for row in range(self.tableWidget.rowCount()):
-            cell_widget = self.tableWidget.cellWidget(row, delete_column)
-            if cell_widget:
-                layout = cell_widget.layout()
-                if layout:
-                    for i in range(layout.count()):
-                        item = layout.itemAt(i)
-                        if item:
-                            checkbox = item.widget()
-                            if isinstance(checkbox, QCheckBox) and checkbox.isChecked():
-                                checked_rows.append(row)
-                                checkbox.blockSignals(True)
-                                checkbox.setChecked(False)
-                                checkbox.blockSignals(False)
-                                break
-        return checked_rows
+        # The checked rows, the checkboxes are cleared
+        return self.sentence_table_model.take_delete_rows()
     def get_existing_directory(self, title, directory=''):
         options = QFileDialog.Options()
         options |= QFileDialog.ShowDirsOnly
@@ -1373,6 +1484,8 @@ class AudiobookMakerView(QMainWindow):
             return relative_directory
 
         return None
+    def get_export_format(self):
+        return self.export_format_combo.currentText()
     def get_open_file_name(self, title, directory='', filter=''):
         options = QFileDialog.Options()
         options |= QFileDialog.ReadOnly
@@ -1381,7 +1494,7 @@ class AudiobookMakerView(QMainWindow):
     def get_pause_between_sentences(self):
         return self.export_pause_slider.value() / 10.0
     def get_search_start(self):
-        selected_rows = self.tableWidget.selectionModel().selectedRows()
+        selected_rows = self.table_view.selectionModel().selectedRows()
         if selected_rows:
             return selected_rows[0].row()
         return 0
@@ -1455,7 +1568,19 @@ class AudiobookMakerView(QMainWindow):
 
         return voice_parameters
     def get_selected_table_row(self):
-        return self.tableWidget.currentRow()
+        return self.table_view.currentIndex().row()
+    def get_speaker_color(self, speaker_id):
+        speaker = self.speakers.get(str(speaker_id), None)
+        if not speaker: # HOT FIX, should figure out why speaker_id needs to be a string for one check, and then int for another for color
+            speaker = self.speakers.get(speaker_id, None)
+        if not speaker:
+            return None
+        color = speaker.get('color', Qt.black)
+        if isinstance(color, str):
+            color = QColor(color)
+        return color
+    def get_table_row_count(self):
+        return self.sentence_table_model.rowCount()
     def get_window_size(self):
         screen = QGuiApplication.primaryScreen().availableGeometry()  # Get the available screen geometry
         target_ratio = 16 / 9
@@ -1465,17 +1590,8 @@ class AudiobookMakerView(QMainWindow):
             height = screen.height() * 0.8
             width = height * target_ratio  # calculate width based on the target aspect ratio
         return width, height
-    def handle_sentence_changed(self, item):
-        if item.column() == 0:
-            row = item.row()
-            new_text = item.text()
-            self.tableWidget.blockSignals(True)
-            try:
-                # Perform any updates to the item if necessary
-                pass
-            finally:
-                self.tableWidget.blockSignals(False)
-            self.text_item_changed.emit(row, new_text)
+    def handle_sentence_changed(self, row, new_text):
+        self.text_item_changed.emit(row, new_text)
 
     def initialize_media_player(self):
         self.media_player = QMediaPlayer()
@@ -1545,6 +1661,9 @@ class AudiobookMakerView(QMainWindow):
         return modified_stylesheet
     
     def pause_audio(self):
+        if self.playing_sequence:
+            self.gapless_player.toggle_pause()
+            return
         if self.media_player.playbackState() == QMediaPlayer.PlayingState:
             self.media_player.pause()
         elif self.media_player.playbackState() == QMediaPlayer.PausedState:
@@ -1552,10 +1671,19 @@ class AudiobookMakerView(QMainWindow):
     def play_audio(self, audio_path):
         if not audio_path:
             return
+        if self.playing_sequence:
+            self.gapless_player.stop()
+            self.playing_sequence = False
         self.initialize_media_player()
         self.media_player.setSource(QUrl.fromLocalFile(audio_path))
         self.media_player.play()
         self.current_audio_path = audio_path  # Update current audio path
+    def play_sequence(self, segments, pause_duration):
+        # (row, audio_path) segments, played without gaps
+        if self.media_player.playbackState() != QMediaPlayer.StoppedState:
+            self.stop_audio()
+        self.playing_sequence = True
+        self.gapless_player.play(segments, pause_duration)
     def on_audio_finished(self, state):
         if state == QMediaPlayer.EndOfMedia or state == QMediaPlayer.StoppedState:
             self.current_audio_path = None  # Clear current audio path
@@ -1596,7 +1724,7 @@ class AudiobookMakerView(QMainWindow):
     def on_generate_button_clicked(self):
         self.start_generation_requested.emit()
     def on_go_to_sentence(self):
-        self.select_table_row(min(self.tableWidget.rowCount(), self.go_to_sentence_input.value()) - 1)
+        self.select_table_row(min(self.get_table_row_count(), self.go_to_sentence_input.value()) - 1)
     def on_load_existing_audiobook_triggered(self):
         self.load_existing_audiobook_requested.emit()
     def on_load_text_clicked(self):
@@ -1628,6 +1756,13 @@ class AudiobookMakerView(QMainWindow):
         self.regenerate_bulk_requested.emit()
     def on_regenerate_button_clicked(self):
         self.regenerate_audio_for_sentence_requested.emit()
+    def on_segment_started(self, row, audio_path):
+        self.current_audio_path = audio_path
+        self.select_table_row(row)
+    def on_sequence_finished(self):
+        self.playing_sequence = False
+        self.current_audio_path = None
+        self.audio_finished_signal.emit()
     def on_set_background_clear_image_triggered(self):
         self.set_background_clear_image_requested.emit()
     def on_set_background_image_triggered(self):
@@ -1682,6 +1817,8 @@ class AudiobookMakerView(QMainWindow):
         engines = [engine['name'] for engine in self.tts_config.get('tts_engines')]
         self.tts_engine_combo.addItems(engines)
     
+    def refresh_table_rows(self, first_row, last_row):
+        self.sentence_table_model.refresh_rows(first_row, last_row)
     def release_media_player_resources(self):
         # Reinitialize the media player to release any file handles
         # This way is NECESSARY to prevent the gui from freezing (for some unknown reason)
@@ -1689,6 +1826,8 @@ class AudiobookMakerView(QMainWindow):
         self.audio_output = QAudioOutput()
         self.media_player.setAudioOutput(self.audio_output)
         self.media_player.mediaStatusChanged.connect(self.on_audio_finished)
+    def remove_table_rows(self, first_row, last_row):
+        self.sentence_table_model.remove_rows(first_row, last_row)
     def reset(self):
         self.clear_table()
         self.set_audiobook_label("No Audio Book Set")
@@ -1722,13 +1861,43 @@ class AudiobookMakerView(QMainWindow):
         self.background_label.setGeometry(0, 0, self.width(), self.height())
         self.update_background()  # Update the background pixmap scaling
         super().resizeEvent(event)  # Call the superclass resize event method
+        self.schedule_resize_table()
     def resize_table(self):
-        self.tableWidget.resizeRowsToContents()
+        # Only the rows in view are fitted to their text, fitting every row of a long book is what made loading it slow
+        row_count = self.get_table_row_count()
+        row = self.table_view.rowAt(0)
+        if row < 0:
+            return
+        viewport_height = self.table_view.viewport().height()
+        top = self.table_view.rowViewportPosition(row)
+        while row < row_count and top < viewport_height:
+            self.table_view.resizeRowToContents(row)
+            top += self.table_view.rowHeight(row)
+            row += 1
     
+    def schedule_resize_table(self, *args):
+        # Scrolling, resizing and edits come in bursts, the rows in view are fitted once after them
+        self.resize_rows_timer.start(0)
     def select_table_row(self, row):
-        self.tableWidget.selectRow(row)
+        self.table_view.selectRow(row)
+        # Fit the row and the ones above it first, so they can't push it back out of view once they grow
+        viewport_height = self.table_view.viewport().height()
+        above = row
+        height = 0
+        while above >= 0 and height < viewport_height:
+            self.table_view.resizeRowToContents(above)
+            height += self.table_view.rowHeight(above)
+            above -= 1
+        self.table_view.scrollTo(self.sentence_table_model.index(row, 0))
     def set_audiobook_label(self, text):
         self.audiobook_label.setText(text)
+    def set_audiobook_runtime(self, seconds, missing=0):
+        minutes, seconds = divmod(int(round(seconds)), 60)
+        hours, minutes = divmod(minutes, 60)
+        tooltip = f"Runtime: {hours}:{minutes:02d}:{seconds:02d}"
+        if missing:
+            tooltip += f" ({missing} sentences not measured yet)"
+        self.audiobook_label.setToolTip(tooltip)
     def set_background(self, file_path):
         # Set the pixmap for the background label
         pixmap = QPixmap(file_path)
@@ -1736,23 +1905,6 @@ class AudiobookMakerView(QMainWindow):
         self.update_background()
     def set_progress(self, value):
         self.progress_bar.setValue(value)
-    def set_row_speaker(self, row, speaker_id, speaker_name):
-        self.set_row_speaker_color(row, speaker_id)
-        speaker_item = QTableWidgetItem(speaker_name)
-        speaker_item.setFlags(speaker_item.flags() & ~Qt.ItemIsEditable)
-        self.tableWidget.setItem(row, 1, speaker_item)
-    def set_row_speaker_color(self, row, speaker_id):
-        self.tableWidget.blockSignals(True)
-        speaker = self.speakers.get(str(speaker_id), None)
-        if not speaker: # HOT FIX, should figure out why speaker_id needs to be a string for one check, and then int for another for color
-            speaker = self.speakers.get(speaker_id, None)
-        color = speaker.get('color', Qt.black)
-        if isinstance(color, str):
-            color = QColor(color)
-        item = self.tableWidget.item(row, 0) # Explicit sentence column
-        if item:
-            item.setBackground(color)
-        self.tableWidget.blockSignals(False)
     def set_s2s_parameters(self, settings):
         s2s_engine = self.get_s2s_engine()
         engine_config = next(
@@ -1785,6 +1937,8 @@ class AudiobookMakerView(QMainWindow):
                             widget.setCurrentIndex(0)
     def set_start_generation_button_text(self, text):
         self.start_generation_button.setText(text)
+    def set_table_sentences(self, text_audio_map, speaker_name):
+        self.sentence_table_model.set_sentences(text_audio_map, speaker_name)
     def set_tts_initial_index(self):
         if self.tts_engine_combo.count() > 0:
             self.tts_engine_combo.setCurrentIndex(0)
@@ -1829,12 +1983,13 @@ class AudiobookMakerView(QMainWindow):
         msg_box.exec()
     def skip_current_audio(self):
         if self.playing_sequence:
-            self.media_player.stop()
-            self.release_media_player_resources()
-            self.media_player.setSource(QUrl())
             self.current_audio_path = None
-            self.on_audio_finished(QMediaPlayer.EndOfMedia)
+            self.gapless_player.skip()
     def stop_audio(self):
+        if self.playing_sequence:
+            self.gapless_player.stop()
+            self.playing_sequence = False
+            self.current_audio_path = None
         if self.media_player.playbackState() != QMediaPlayer.StoppedState:
             self.media_player.stop()
             self.release_media_player_resources()
@@ -1848,9 +2003,9 @@ class AudiobookMakerView(QMainWindow):
             self.indices = []
 
     def toggle_delete_column(self):
-        is_hidden = self.tableWidget.isColumnHidden(3)
+        is_hidden = self.table_view.isColumnHidden(3)
         is_button_hidden = self.delete_button.isHidden()
-        self.tableWidget.setColumnHidden(3, not is_hidden)
+        self.table_view.setColumnHidden(3, not is_hidden)
         self.delete_button.setHidden(not is_button_hidden)
     def toggle_engines_column(self):
         is_visible = self.options_widget.isVisible()
@@ -0,0 +1,59 @@
+# word_replacer.py
+
+'''
+Word replacement lists compiled into one pattern.
+
+Every original word of the list goes into a character trie which is turned into a single regular expression, "\b(?:trie)\b", so a sentence is scanned once no matter how many rules the list has, and the regex engine follows one branch of the trie instead of trying every word at every position.  Where two rules match at the same position the longer one wins, e.g. "New York" over "New", and replaced text is never matched again by another rule.  Replacement words are inserted literally.
+
+The number of replacements made by each rule is counted, so the word replacer can report which rules actually matched.
+'''
+
+import json
+import re
+from collections import Counter
+
+class WordReplacer:
+    def __init__(self, replacements):
+        # The first rule for an original word wins, like it did when rules were applied one after the other
+        self.replacements = {}
+        for orig_word, replacement_word in replacements:
+            if orig_word and orig_word not in self.replacements:
+                self.replacements[orig_word] = replacement_word
+        self.pattern = re.compile(r'\b{}\b'.format(trie_pattern(self.replacements))) if self.replacements else None
+        self.counts = Counter()
+    def replace(self, text):
+        '''
+        Returns the text with every rule applied and the number of replacements made.
+        '''
+        if self.pattern is None:
+            return text, 0
+        replaced = 0
+        def substitute(match):
+            nonlocal replaced
+            replaced += 1
+            orig_word = match.group()
+            self.counts[orig_word] += 1
+            return self.replacements[orig_word]
+        return self.pattern.sub(substitute, text), replaced
+
+def load_replacements(replacement_file_path):
+    with open(replacement_file_path, 'r', encoding='utf-8') as f:
+        replacements = json.load(f)
+    return [(item['orig_word'], item['replacement_word']) for item in replacements.values()]
+
+def trie_pattern(words):
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    return trie_node_pattern(trie)
+
+def trie_node_pattern(node):
+    branches = [re.escape(char) + trie_node_pattern(child) for char, child in node.items() if char]
+    if not branches:
+        return ''
+    pattern = branches[0] if len(branches) == 1 else '(?:{})'.format('|'.join(branches))
+    # A word ending here is optional, so longer words sharing the prefix are tried first
+    return '(?:{})?'.format(pattern) if '' in node else pattern
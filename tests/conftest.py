@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules are imported from src like the app does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
@@ -0,0 +1,61 @@
+import struct
+import wave
+
+import pytest
+
+from audio_index import AUDIO_INFO_KEY, AudioTimeline, read_audio_format, read_audio_frames, read_audio_info
+
+def write_pcm_wav(path, frames, sample_rate=24000, value=16384):
+    with wave.open(str(path), 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(struct.pack(f'<{frames}h', *([value] * frames)))
+
+def write_float_wav(path, frames, sample_rate=22050, channels=2, value=0.5):
+    # WAVE_FORMAT_IEEE_FLOAT, what torchaudio.save writes for float tensors
+    data = struct.pack(f'<{frames * channels}f', *([value] * frames * channels))
+    header = struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + len(data), b'WAVE', b'fmt ', 16, 3, channels, sample_rate, sample_rate * channels * 4, channels * 4, 32, b'data', len(data))
+    path.write_bytes(header + data)
+
+def test_pcm_wav_info(tmp_path):
+    path = tmp_path / "audio.wav"
+    write_pcm_wav(path, 12000)
+    info = read_audio_info(str(path))
+    assert info['duration'] == 0.5
+    assert (info['sample_rate'], info['channels'], info['sample_width']) == (24000, 1, 2)
+    assert info['peak'] == pytest.approx(0.5, abs=1e-4)
+    assert info['rms'] == pytest.approx(0.5, abs=1e-4)
+
+def test_float_wav_info(tmp_path):
+    pytest.importorskip("soundfile")
+    path = tmp_path / "float.wav"
+    write_float_wav(path, 22050)
+    info = read_audio_info(str(path))
+    assert info is not None
+    assert info['duration'] == 1.0
+    assert (info['sample_rate'], info['channels'], info['sample_width']) == (22050, 2, 4)
+    assert info['peak'] == pytest.approx(0.5, abs=1e-4)
+    assert tuple(read_audio_format(str(path))) == (22050, 2, 4)
+    segment_format, data = read_audio_frames(str(path))
+    assert tuple(segment_format) == (22050, 2, 2)
+    assert len(data) == 22050 * 2 * 2
+
+def test_unreadable_file_has_no_info(tmp_path):
+    path = tmp_path / "broken.wav"
+    path.write_bytes(b"not audio")
+    assert read_audio_info(str(path)) is None
+    assert read_audio_info(str(tmp_path / "missing.wav")) is None
+
+def test_timeline():
+    text_audio_map = {
+        "0": {"audio_path": "a.wav", AUDIO_INFO_KEY: {"duration": 2.0}},
+        "1": {"audio_path": "", AUDIO_INFO_KEY: None},
+        "2": {"audio_path": "c.wav", AUDIO_INFO_KEY: {"duration": 1.5}},
+        "3": {"audio_path": "d.wav"}
+    }
+    timeline = AudioTimeline(text_audio_map, pause_duration=0.5)
+    assert timeline.start_of(2) == 2.5
+    assert timeline.duration == 4.0
+    assert timeline.missing == 1
+    assert timeline.index_at(3.0) == "2"
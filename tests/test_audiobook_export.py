@@ -0,0 +1,105 @@
+import math
+import os
+import shutil
+import struct
+import subprocess
+import wave
+
+import pytest
+
+from audio_index import AUDIO_INFO_KEY, AudioTimeline
+from audiobook_export import load_manifest, run_segmented_export, save_manifest, trim_chunks
+
+SAMPLE_RATE = 24000
+
+def write_sentence(path, tone_frames, leading=0, trailing=0):
+    # A tone with the bit of silence TTS output starts and ends with
+    tone = b''.join(struct.pack('<h', int(9000 * math.sin(index / 4))) for index in range(tone_frames))
+    with wave.open(str(path), 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(b'\0\0' * leading + tone + b'\0\0' * trailing)
+    return (leading + tone_frames + trailing) / SAMPLE_RATE
+
+def decoded_duration(ffmpeg, path):
+    output = subprocess.run([ffmpeg, '-v', 'error', '-i', str(path), '-f', 's16le', '-ac', '1', '-ar', str(SAMPLE_RATE), '-'], capture_output=True, check=True).stdout
+    return len(output) / 2 / SAMPLE_RATE
+
+@pytest.mark.parametrize("output_format", ["mp3", "m4b"])
+@pytest.mark.parametrize("pause_duration", [0.0, 0.3])
+def test_exported_duration_matches_timeline(tmp_path, output_format, pause_duration):
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        pytest.skip("ffmpeg not found")
+    audio_paths = []
+    durations = []
+    text_audio_map = {}
+    for index in range(24):
+        audio_path = f"{index}.wav"
+        durations.append(write_sentence(tmp_path / audio_path, 9000 + 1731 * index, leading=1200, trailing=3600))
+        audio_paths.append(audio_path)
+        text_audio_map[str(index)] = {"audio_path": audio_path, AUDIO_INFO_KEY: {"duration": durations[-1]}}
+    silence_path = None
+    if pause_duration:
+        silence_path = "silence.wav"
+        write_sentence(tmp_path / silence_path, 0, leading=int(pause_duration * SAMPLE_RATE))
+    output_path = tmp_path / f"book.{output_format}"
+    # One sentence per chunk, every boundary would add the encoder delay and padding if the join didn't take them out
+    assert run_segmented_export(
+        ffmpeg, str(tmp_path), audio_paths, silence_path, str(output_path), 4, str(tmp_path / "cache"),
+        cache_settings={"pause_duration": pause_duration}, chunk_sentences=1, output_format=output_format,
+        segment_durations=durations, chapters=[(0, "One"), (12, "Two")] if output_format == "m4b" else None
+    )
+    timeline = AudioTimeline(text_audio_map, pause_duration)
+    assert decoded_duration(ffmpeg, output_path) == pytest.approx(timeline.duration, abs=0.15)
+
+def test_trim_makes_up_for_boundaries_without_silence():
+    frame = 1152
+    chunks = []
+    source_start = 0.0
+    for index in range(6):
+        source_duration = (20000 + 100 * index) / 44100
+        chunks.append({
+            "samples": (int(source_duration * 44100) + 1105) // frame * frame + 2 * frame,
+            "sample_rate": 44100,
+            "frame_samples": frame,
+            "tail_offsets": list(range(65)),
+            "source_start": source_start,
+            "source_duration": source_duration,
+            # Only every other chunk starts with enough silence to drop frames from
+            "leading_silence": 0.2 if index % 2 == 0 else 0.0,
+            "trailing_silence": 0.0
+        })
+        source_start += source_duration
+    total = trim_chunks(chunks, 1105)
+    assert chunks[0]['skip_frames'] == 0
+    assert [chunk['skip_frames'] for chunk in chunks[1::2]] == [0, 0, 0]
+    for chunk in chunks[2::2]:
+        assert abs(chunk['output_start'] - 1105 / 44100 - chunk['source_start']) <= frame / 2 / 44100
+    assert total - source_start < 4 * frame / 44100
+
+def cached_chunk(cache_directory, key, size, used):
+    path = cache_directory / f"{key}.mp3"
+    path.write_bytes(b"\0" * size)
+    os.utime(path, (used, used))
+    return {"key": key, "path": str(path), "segments": 1}
+
+def test_manifest_keeps_chunks_of_earlier_exports_within_budget(tmp_path):
+    first = [cached_chunk(tmp_path, "mp3-pause", 100, 1000), cached_chunk(tmp_path, "m4b", 100, 2000)]
+    save_manifest(str(tmp_path), first, max_bytes=1000)
+    latest = [cached_chunk(tmp_path, "mp3-no-pause", 100, 3000)]
+    (tmp_path / "crashed.part.mp3").write_bytes(b"\0")
+    save_manifest(str(tmp_path), latest, max_bytes=1000)
+    assert set(load_manifest(str(tmp_path))) == {"mp3-pause", "m4b", "mp3-no-pause"}
+    assert not (tmp_path / "crashed.part.mp3").exists()
+
+def test_least_recently_used_chunks_go_first(tmp_path):
+    save_manifest(str(tmp_path), [cached_chunk(tmp_path, f"old{index}", 100, 1000 + index) for index in range(3)], max_bytes=1000)
+    latest = [cached_chunk(tmp_path, "new", 300, 5000)]
+    save_manifest(str(tmp_path), latest, max_bytes=450)
+    assert set(load_manifest(str(tmp_path))) == {"old2", "new"}
+    assert sorted(os.listdir(tmp_path)) == ["manifest.json", "new.mp3", "old2.mp3"]
+    # The latest export's chunks stay even when they alone are over the budget
+    save_manifest(str(tmp_path), latest, max_bytes=250)
+    assert set(load_manifest(str(tmp_path))) == {"new"}
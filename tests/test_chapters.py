@@ -0,0 +1,39 @@
+from chapters import chapter_title, escape_metadata, find_chapters, write_chapter_metadata
+
+def entry(sentence, audio=True, **fields):
+    return {"sentence": sentence, "audio_path": "audio.wav" if audio else "", **fields}
+
+def test_pattern_matches_headings_case_insensitively():
+    entries = [entry("CHAPTER ONE"), entry("It was dark."), entry("Part two begins"), entry("The end.")]
+    assert find_chapters(entries) == [(0, "CHAPTER ONE"), (2, "Part two begins")]
+
+def test_heading_without_audio_marks_the_next_sentence_with_audio():
+    entries = [entry("Intro."), entry("Chapter 1", audio=False), entry("First line."), entry("Second line.")]
+    assert find_chapters(entries) == [(1, "Chapter 1")]
+
+def test_explicit_markers():
+    entries = [entry("Opening."), entry("A storm.", chapter=True), entry("Rain.", chapter="The Flood")]
+    assert find_chapters(entries, pattern="") == [(1, "A storm."), (2, "The Flood")]
+
+def test_opening_chapter_is_added_when_the_book_starts_without_one():
+    entries = [entry("Foreword."), entry("Chapter 1"), entry("Text.")]
+    assert find_chapters(entries, opening_title="My Book") == [(0, "My Book"), (1, "Chapter 1")]
+    assert find_chapters(entries[1:], opening_title="My Book") == [(0, "Chapter 1")]
+
+def test_long_titles_are_shortened():
+    title = chapter_title("Chapter one, " + "word " * 40)
+    assert len(title) == 80
+    assert title.endswith("...")
+
+def test_escape_metadata():
+    assert escape_metadata("a=b;c#d\\e\nf") == "a\\=b\\;c\\#d\\\\e\\\nf"
+
+def test_write_chapter_metadata(tmp_path):
+    path = tmp_path / "chapters.txt"
+    write_chapter_metadata(str(path), "Book = One", [(0.0, "Start"), (12.5, "Next")], 30.0)
+    assert path.read_text(encoding="utf-8") == (
+        ";FFMETADATA1\n"
+        "title=Book \\= One\n"
+        "[CHAPTER]\nTIMEBASE=1/1000\nSTART=0\nEND=12500\ntitle=Start\n"
+        "[CHAPTER]\nTIMEBASE=1/1000\nSTART=12500\nEND=30000\ntitle=Next\n"
+    )
@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+
+import map_journal
+from map_journal import JOURNAL_FILE_NAME, TextAudioMapJournal, read_text_audio_map
+
+def entry(sentence, generated=False):
+    return {"sentence": sentence, "audio_path": "", "generated": generated, "speaker_id": 1, "regen": False}
+
+def book(count):
+    return {str(idx): entry(f"Sentence {idx} .") for idx in range(count)}
+
+def test_appended_records_are_replayed(tmp_path):
+    journal = TextAudioMapJournal(str(tmp_path))
+    journal.compact(book(3))
+    journal.append("1", entry("Sentence 1 .", generated=True))
+    journal.append("3", entry("Sentence 3 ."))
+    journal.append_delete("0")
+    journal.close()
+    text_audio_map, replayed = TextAudioMapJournal(str(tmp_path)).load()
+    assert replayed == 3
+    assert sorted(text_audio_map, key=int) == ["1", "2", "3"]
+    assert text_audio_map["1"]["generated"] is True
+
+def test_compact_folds_the_journal_into_the_snapshot(tmp_path):
+    journal = TextAudioMapJournal(str(tmp_path))
+    text_audio_map = book(2)
+    journal.compact(text_audio_map)
+    text_audio_map["0"] = entry("Sentence 0 .", generated=True)
+    journal.append("0", text_audio_map["0"])
+    journal.compact(text_audio_map)
+    with open(tmp_path / "text_audio_map.json", encoding="utf-8") as file:
+        assert json.load(file)["0"]["generated"] is True
+    assert TextAudioMapJournal(str(tmp_path)).load() == (text_audio_map, 0)
+
+def test_torn_last_record_is_trimmed(tmp_path):
+    journal = TextAudioMapJournal(str(tmp_path))
+    journal.compact(book(2))
+    journal.append("0", entry("Sentence 0 .", generated=True))
+    journal.close()
+    journal_path = tmp_path / JOURNAL_FILE_NAME
+    intact_size = os.path.getsize(journal_path)
+    with open(journal_path, "ab") as file:
+        file.write(b'{"k": "1", "v": {"sente')
+    text_audio_map = read_text_audio_map(str(tmp_path))
+    assert text_audio_map["0"]["generated"] is True
+    assert text_audio_map["1"]["generated"] is False
+    assert os.path.getsize(journal_path) == intact_size
+
+def test_journal_of_an_older_snapshot_is_skipped(tmp_path, monkeypatch):
+    journal = TextAudioMapJournal(str(tmp_path))
+    text_audio_map = book(3)
+    journal.compact(text_audio_map)
+    journal.append("2", entry("Sentence 2 .", generated=True))
+    # Row 0 is deleted and the map rekeyed, the process dies before the journal is started over
+    rekeyed = {"0": text_audio_map["1"], "1": entry("Sentence 2 .", generated=True)}
+    monkeypatch.setattr(TextAudioMapJournal, "start_journal", lambda self, snapshot: None)
+    journal.compact(rekeyed)
+    monkeypatch.undo()
+    assert TextAudioMapJournal(str(tmp_path)).load() == (rekeyed, 0)
+    # The stale records are gone for good, not just skipped once
+    assert TextAudioMapJournal(str(tmp_path)).load() == (rekeyed, 0)
+
+def test_journal_without_snapshot_header_is_replayed(tmp_path):
+    TextAudioMapJournal(str(tmp_path)).compact(book(2))
+    with open(tmp_path / JOURNAL_FILE_NAME, "w", encoding="utf-8") as file:
+        file.write(json.dumps({"k": "1", "v": entry("Sentence 1 .", generated=True)}) + "\n")
+    assert read_text_audio_map(str(tmp_path))["1"]["generated"] is True
+
+def test_needs_compaction_once_the_journal_outgrows_the_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(map_journal, "MIN_COMPACTION_BYTES", 0)
+    journal = TextAudioMapJournal(str(tmp_path))
+    journal.compact(book(2))
+    assert not journal.needs_compaction()
+    while journal.journal_bytes < journal.snapshot_bytes:
+        journal.append("0", entry("Sentence 0 .", generated=True))
+    assert journal.needs_compaction()
+    journal.close()
+
+def test_appends_and_compactions_from_two_threads(tmp_path):
+    journal = TextAudioMapJournal(str(tmp_path))
+    text_audio_map = book(400)
+    journal.compact(text_audio_map)
+    errors = []
+    def generate():
+        try:
+            for idx in range(0, 400, 2):
+                key = str(idx)
+                text_audio_map[key] = entry(f"Sentence {idx} .", generated=True)
+                journal.append(key, text_audio_map[key])
+                if idx % 10 == 0:
+                    journal.compact(text_audio_map)
+        except Exception as e:
+            errors.append(e)
+    def edit():
+        try:
+            # Other rows than the generation thread, so the last record of every row is its final state
+            for idx in range(1, 400, 2):
+                key = str(idx)
+                text_audio_map[key]["regen"] = True
+                journal.append_entries([(key, text_audio_map[key])])
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=generate), threading.Thread(target=edit)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    journal.close()
+    assert errors == []
+    loaded, _ = TextAudioMapJournal(str(tmp_path)).load()
+    assert loaded == text_audio_map
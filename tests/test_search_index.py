@@ -0,0 +1,39 @@
+from search_index import MAX_CACHED_HITS, SentenceSearchIndex
+
+SENTENCES = ["The cat sat.", "A dog ran.", "Another CAT slept.", "Birds sang.", "The end of the cat"]
+
+def test_find_wraps_around_in_both_directions():
+    index = SentenceSearchIndex(SENTENCES)
+    assert index.find(0, True, "cat") == 2
+    assert index.find(2, True, "cat") == 4
+    assert index.find(4, True, "cat") == 0
+    assert index.find(0, False, "cat") == 4
+    assert index.find(2, False, "cat") == 0
+
+def test_start_row_itself_is_never_returned():
+    index = SentenceSearchIndex(SENTENCES)
+    assert index.find(1, True, "dog") is None
+    assert index.find(1, True, "zebra") is None
+    assert index.find(1, True, "") is None
+
+def test_matches_across_sentences_only_when_asked():
+    index = SentenceSearchIndex(SENTENCES)
+    assert index.hits("sat.a dog") == []
+    assert index.hits("sat.a dog", across_sentences=True) == [0]
+    assert index.find(3, True, "sat.a dog", across_sentences=True) == 0
+
+def test_update_and_delete():
+    index = SentenceSearchIndex(SENTENCES)
+    assert index.hits("cat") == [0, 2, 4]
+    index.update(1, "A cat ran.")
+    assert index.hits("cat") == [0, 1, 2, 4]
+    index.delete([0, 2])
+    assert len(index) == 3
+    assert index.hits("cat") == [0, 2]
+
+def test_frequent_queries_are_searched_from_the_row():
+    sentences = ["Word."] * (MAX_CACHED_HITS + 5)
+    index = SentenceSearchIndex(sentences)
+    assert index.hits("word", limit=MAX_CACHED_HITS) is None
+    assert index.find(10, True, "word") == 11
+    assert index.find(0, False, "word") == len(sentences) - 1
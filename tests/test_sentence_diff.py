@@ -0,0 +1,66 @@
+import random
+
+from sentence_diff import DELETE, INSERT, KEEP, RETEXT, PlanStep, align, myers_matches, normalize_sentence, update_plan
+
+def kept_pairs(plan):
+    return [(step.old_index, step.new_index) for step in plan if step.action in (KEEP, RETEXT)]
+
+def check_plan(plan, old_sentences, new_sentences):
+    # Every old sentence is kept or deleted once, every new one kept or inserted once, in order
+    assert sorted(step.old_index for step in plan if step.old_index is not None) == list(range(len(old_sentences)))
+    assert [step.new_index for step in plan if step.new_index is not None] == list(range(len(new_sentences)))
+    pairs = kept_pairs(plan)
+    assert pairs == sorted(pairs) and [old for old, _ in pairs] == sorted(old for old, _ in pairs)
+    for step in plan:
+        if step.action == KEEP:
+            assert old_sentences[step.old_index] == new_sentences[step.new_index]
+
+def test_identical_books_keep_everything():
+    sentences = ["One.", "Two.", "Two.", "Three."]
+    assert update_plan(sentences, sentences) == [PlanStep(KEEP, i, i) for i in range(4)]
+
+def test_inserted_separator_keeps_the_repeated_lines_in_place():
+    old = ["Chapter 1", "* * *", "A.", "* * *", "B."]
+    new = ["Chapter 1", "* * *", "New.", "* * *", "A.", "* * *", "B."]
+    plan = update_plan(old, new)
+    check_plan(plan, old, new)
+    assert kept_pairs(plan) == [(0, 0), (1, 1), (2, 4), (3, 5), (4, 6)]
+    assert [step.new_index for step in plan if step.action == INSERT] == [2, 3]
+
+def test_edited_sentence_is_deleted_and_inserted():
+    old = ["A.", "B.", "C."]
+    new = ["A.", "B changed.", "C."]
+    plan = update_plan(old, new)
+    check_plan(plan, old, new)
+    assert PlanStep(DELETE, 1, None) in plan and PlanStep(INSERT, None, 1) in plan
+
+def test_normalized_matching_retexts_quote_and_space_changes():
+    old = ["“Hello,” she said.", "It’s  late."]
+    new = ['"Hello," she said.', "It's late."]
+    assert update_plan(old, new) == [PlanStep(RETEXT, 0, 0), PlanStep(RETEXT, 1, 1)]
+    assert kept_pairs(update_plan(old, new, normalized_matching=False)) == []
+
+def test_normalize_sentence():
+    assert normalize_sentence("  ﬁne “day”  ‘ok’ ") == "fine \"day\" 'ok'"
+
+def test_gaps_past_the_edit_budget_are_replaced():
+    old_keys = [1, 2, 1, 2, 1, 2]
+    new_keys = [2, 1, 2, 1, 2, 1]
+    assert myers_matches(old_keys, new_keys, 0, 6, 0, 6) == [(1, 0), (2, 1), (3, 2), (4, 3), (5, 4)]
+    assert myers_matches(old_keys, new_keys, 0, 6, 0, 6, max_cost=1) == []
+
+def test_random_edits_give_valid_plans():
+    rng = random.Random(7)
+    for _ in range(50):
+        old = [rng.choice(["A.", "B.", "C.", "* * *", "D."]) for _ in range(rng.randint(0, 40))]
+        new = list(old)
+        for _ in range(rng.randint(0, 8)):
+            position = rng.randint(0, len(new))
+            if new and rng.random() < 0.5:
+                del new[min(position, len(new) - 1)]
+            else:
+                new.insert(position, rng.choice(["A.", "E.", "* * *"]))
+        check_plan(update_plan(old, new), old, new)
+
+def test_align_matches_common_subsequence():
+    assert align([1, 2, 3, 4], [1, 3, 4, 5]) == [(0, 0), (2, 1), (3, 2)]
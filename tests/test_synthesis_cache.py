@@ -0,0 +1,33 @@
+import os
+
+from synthesis_cache import SynthesisCache
+
+TTS_CONFIG = {"tts_engines": [{"name": "StyleTTS2", "parameters": [
+    {"attribute": "stts_voice", "look_for": "folders", "folder_path": "voices"},
+    {"attribute": "stts_reference_audio_file", "relies_on": "stts_voice", "look_for": "files", "folder_path": "voices"},
+    {"attribute": "stts_seed"}
+]}]}
+
+def voice_parameters(**fields):
+    return {"tts_engine": "StyleTTS2", "stts_voice": "narrator", "stts_reference_audio_file": "clip.wav", "stts_seed": 7, **fields}
+
+def test_seed_that_is_not_a_number_is_random(tmp_path):
+    cache = SynthesisCache(str(tmp_path / "cache"), 1024, tts_config=TTS_CONFIG)
+    assert cache.key_for("Hello.", voice_parameters(stts_seed="abc"), False) is None
+    assert cache.key_for("Hello.", voice_parameters(stts_seed=[1]), False) is None
+    assert cache.key_for("Hello.", voice_parameters(stts_seed="0"), False) is None
+    assert cache.key_for("Hello.", voice_parameters(), False) is not None
+
+def test_replacing_the_reference_audio_changes_the_key(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    clip = tmp_path / "voices" / "narrator" / "clip.wav"
+    clip.parent.mkdir(parents=True)
+    clip.write_bytes(b"\0" * 100)
+    os.utime(clip, (1000, 1000))
+    cache = SynthesisCache(str(tmp_path / "cache"), 1024, tts_config=TTS_CONFIG)
+    key = cache.key_for("Hello.", voice_parameters(), False)
+    assert cache.key_for("Hello.", voice_parameters(), False) == key
+    # Re-recorded under the same name
+    clip.write_bytes(b"\1" * 100)
+    os.utime(clip, (2000, 2000))
+    assert cache.key_for("Hello.", voice_parameters(), False) != key
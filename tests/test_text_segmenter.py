@@ -0,0 +1,42 @@
+from text_segmenter import clean_sentences, iter_sentences, read_sentences, split_line
+
+def test_lines_without_splitting():
+    lines = ["First line. Still the first.\n", "\n", "   \n", "***\n", "  Second line  \n"]
+    assert list(iter_sentences(lines)) == ["First line. Still the first.", "Second line"]
+
+def test_read_sentences_streams_the_file(tmp_path):
+    path = tmp_path / "book.txt"
+    path.write_text("One. Two!\n\n12345\nThree?\n", encoding="utf-8")
+    assert list(read_sentences(str(path))) == ["One. Two!", "Three?"]
+    assert list(read_sentences(str(path), split_sentences=True)) == ["One.", "Two!", "Three?"]
+
+def test_split_after_sentence_ends():
+    assert list(split_line("It rained. Then it stopped! Why? Nobody knew… The end.")) == [
+        "It rained.", "Then it stopped!", "Why?", "Nobody knew…", "The end."
+    ]
+
+def test_no_split_after_abbreviations_and_initials():
+    assert list(split_line("Mr. Smith met Dr. Jones. They read J. R. R. Tolkien, e.g. The Hobbit.")) == [
+        "Mr. Smith met Dr. Jones.", "They read J. R. R. Tolkien, e.g. The Hobbit."
+    ]
+
+def test_no_split_before_lowercase():
+    assert list(split_line('"Wait!" she said. He waited.')) == ['"Wait!" she said.', "He waited."]
+
+def test_no_split_inside_brackets():
+    assert list(split_line("He left (it was late. Very late.) and slept. Morning came.")) == [
+        "He left (it was late. Very late.) and slept.", "Morning came."
+    ]
+
+def test_closing_quotes_stay_with_their_sentence():
+    assert list(split_line("She said “Go.” Then she left.")) == ["She said “Go.”", "Then she left."]
+
+def test_quote_aware_keeps_quoted_passages_together():
+    line = '"Stop. Look around. Listen." He did.'
+    assert list(split_line(line)) == ['"Stop.', "Look around.", 'Listen."', "He did."]
+    assert list(split_line(line, quote_aware=True)) == ['"Stop. Look around. Listen."', "He did."]
+
+def test_clean_sentences():
+    assert clean_sentences('Mr. Smith [sic] said "hi".  Dr. Who -- arrived…') == [
+        "Mister Smith sic said hi .", "Doctor Who arrived-"
+    ]
@@ -0,0 +1,40 @@
+import json
+
+from word_replacer import WordReplacer, load_replacements
+
+def test_whole_words_only():
+    replacer = WordReplacer([("cat", "dog")])
+    assert replacer.replace("The cat sat on the category.") == ("The dog sat on the category.", 1)
+
+def test_longest_rule_wins():
+    replacer = WordReplacer([("New", "Old"), ("New York", "NYC")])
+    assert replacer.replace("New York is New.") == ("NYC is Old.", 2)
+
+def test_replaced_text_is_not_matched_again():
+    replacer = WordReplacer([("a", "b"), ("b", "c")])
+    assert replacer.replace("a b") == ("b c", 2)
+
+def test_first_rule_for_a_word_wins():
+    replacer = WordReplacer([("colour", "color"), ("colour", "hue"), ("", "ignored")])
+    assert replacer.replace("colour") == ("color", 1)
+
+def test_replacement_words_are_literal():
+    replacer = WordReplacer([("price", r"\1 $5"), ("a.b", "ab")])
+    assert replacer.replace("price of a.b, not axb") == (r"\1 $5 of ab, not axb", 2)
+
+def test_counts_per_rule():
+    replacer = WordReplacer([("Dr", "Doctor"), ("St", "Saint"), ("Mt", "Mount")])
+    replacer.replace("Dr Who met Dr No on St James")
+    replacer.replace("Dr Jones")
+    assert replacer.counts == {"Dr": 3, "St": 1}
+
+def test_empty_list_changes_nothing():
+    assert WordReplacer([]).replace("Anything.") == ("Anything.", 0)
+
+def test_load_replacements(tmp_path):
+    path = tmp_path / "replacements.json"
+    path.write_text(json.dumps({
+        "0": {"orig_word": "Tolkien", "replacement_word": "Toll keen"},
+        "1": {"orig_word": "Smaug", "replacement_word": "Smowg"}
+    }), encoding="utf-8")
+    assert load_replacements(str(path)) == [("Tolkien", "Toll keen"), ("Smaug", "Smowg")]